@@ -19,7 +19,7 @@ from allauth.account.utils import sync_user_email_addresses
 
 from pootle.core.contextmanagers import keep_data
 from pootle.core.delegate import score_updater
-from pootle.core.models import Revision
+from pootle.core.models import Revision, revision_block
 from pootle.core.signals import update_data, update_revisions
 from pootle_app.models import Directory
 from pootle_statistics.models import SubmissionFields
@@ -174,7 +174,7 @@ class UserPurger(object):
         """
 
         stores = set()
-        with keep_data():
+        with keep_data(), revision_block():
             stores |= self.remove_units_created()
             stores |= self.revert_units_edited()
             stores |= self.revert_units_reviewed()
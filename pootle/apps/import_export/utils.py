@@ -8,9 +8,13 @@
 
 import logging
 import os
+import shutil
+import tempfile
 from io import BytesIO
 from zipfile import ZipFile
 
+from lxml import etree
+
 from translate.storage import tmx
 from translate.storage.factory import getclass
 
@@ -23,7 +27,7 @@ from pootle.i18n.gettext import ugettext_lazy as _
 from pootle_app.models.permissions import check_user_permission
 from pootle_statistics.models import SubmissionTypes
 from pootle_store.constants import TRANSLATED
-from pootle_store.models import Store
+from pootle_store.models import Store, Unit
 
 from .exceptions import (FileImportError, MissingPootlePathError,
                          MissingPootleRevError, UnsupportedFiletypeError)
@@ -77,6 +81,13 @@ def import_file(f, user=None):
 
 
 class TPTMXExporter(object):
+    """Exports the translated units of a TP to a zipped TMX file.
+
+    The TMX for each store is kept as a fragment, and only regenerated
+    when the store's revision changes.
+    """
+
+    chunk_size = 5000
 
     def __init__(self, context):
         self.context = context
@@ -152,25 +163,132 @@ class TPTMXExporter(object):
     def abs_filepath(self):
         return os.path.join(self.directory, self.filename)
 
-    def export(self, rotate=False):
+    @property
+    def fragments_directory(self):
+        # fragments are specific to the source language of the project
+        return os.path.join(
+            settings.POOTLE_TMX_FRAGMENTS_DIRECTORY,
+            self.context.language.code,
+            self.context.project.code,
+            self.context.project.source_language.code)
+
+    @cached_property
+    def store_revisions(self):
+        return list(
+            self.context.stores.live()
+                               .order_by("pootle_path")
+                               .values_list("pk", "data__max_unit_revision"))
+
+    def get_fragment_path(self, store_pk, store_revision):
+        return os.path.join(
+            self.fragments_directory,
+            "%s.%s.tmx" % (store_pk, store_revision or 0))
+
+    @cached_property
+    def tmx_skeleton(self):
+        bs = BytesIO()
+        tmx.tmxfile().serialize(bs)
+        head, tail = bs.getvalue().split(b"<body/>")
+        return head + b"<body>", b"</body>" + tail
+
+    def write_fragment(self, store_pk, units):
+        """Serialize the TMX units for a store to its fragment file"""
         source_language = self.context.project.source_language.code
         target_language = self.context.language.code
+        tmxfile = tmx.tmxfile()
+        for unit in units:
+            tmxfile.addtranslation(
+                unit["source_f"], source_language,
+                unit["target_f"], target_language,
+                unit["developer_comment"])
+        fragment_path = self.get_fragment_path(
+            store_pk, self.stale_stores[store_pk])
+        with open(fragment_path + ".tmp", "wb") as f:
+            for unit in tmxfile.units:
+                f.write(etree.tostring(unit.xmlelement, encoding="UTF-8"))
+        os.rename(fragment_path + ".tmp", fragment_path)
+
+    @cached_property
+    def stale_stores(self):
+        return {
+            store_pk: store_revision
+            for store_pk, store_revision
+            in self.store_revisions
+            if not os.path.exists(
+                self.get_fragment_path(store_pk, store_revision))}
+
+    def update_fragments(self):
+        """Regenerate the fragments for stores with new revisions.
+
+        Units are retrieved with one query ordered by store, in chunks.
+        """
+        if not os.path.exists(self.fragments_directory):
+            os.makedirs(self.fragments_directory)
+        unit_ids = list(
+            Unit.objects.filter(
+                store_id__in=self.stale_stores.keys(),
+                state=TRANSLATED)
+                        .order_by("store_id", "index")
+                        .values_list("pk", flat=True))
+        current_store = None
+        store_units = []
+        written = set()
+        for i in range(0, len(unit_ids), self.chunk_size):
+            units = Unit.objects.filter(
+                pk__in=unit_ids[i:i + self.chunk_size]).order_by(
+                    "store_id", "index").values(
+                        "store_id", "source_f", "target_f",
+                        "developer_comment")
+            for unit in units.iterator():
+                if unit["store_id"] != current_store:
+                    if current_store is not None:
+                        self.write_fragment(current_store, store_units)
+                        written.add(current_store)
+                    current_store = unit["store_id"]
+                    store_units = []
+                store_units.append(unit)
+        if current_store is not None:
+            self.write_fragment(current_store, store_units)
+            written.add(current_store)
+        for store_pk in set(self.stale_stores.keys()) - written:
+            self.write_fragment(store_pk, [])
+
+    def remove_stale_fragments(self):
+        current = set(
+            os.path.basename(self.get_fragment_path(*store))
+            for store
+            in self.store_revisions)
+        for fn in os.listdir(self.fragments_directory):
+            if fn not in current:
+                os.remove(os.path.join(self.fragments_directory, fn))
 
+    def export(self, rotate=False):
         if not os.path.exists(self.directory):
             os.makedirs(self.directory)
-
-        tmxfile = tmx.tmxfile()
-        for store in self.context.stores.live().iterator():
-            for unit in store.units.filter(state=TRANSLATED):
-                tmxfile.addtranslation(unit.source, source_language,
-                                       unit.target, target_language,
-                                       unit.developer_comment)
-
-        bs = BytesIO()
-        tmxfile.serialize(bs)
-        with open(self.abs_filepath, "wb") as f:
-            with ZipFile(f, "w") as zf:
-                zf.writestr(self.filename.rstrip('.zip'), bs.getvalue())
+        for k in ["store_revisions", "stale_stores"]:
+            self.__dict__.pop(k, None)
+        self.update_fragments()
+        head, tail = self.tmx_skeleton
+        tmx_file, tmx_path = tempfile.mkstemp(
+            dir=settings.POOTLE_TMX_FRAGMENTS_DIRECTORY)
+        try:
+            with os.fdopen(tmx_file, "wb") as f:
+                f.write(head)
+                for store in self.store_revisions:
+                    with open(self.get_fragment_path(*store), "rb") as fragment:
+                        shutil.copyfileobj(fragment, f)
+                f.write(tail)
+            with open(self.abs_filepath, "wb") as f:
+                with ZipFile(f, "w") as zf:
+                    zf.write(tmx_path, self.filename.rstrip('.zip'))
+        finally:
+            os.remove(tmx_path)
+        logger.debug(
+            "[tmx] Exported %s, regenerated %s of %s stores",
+            self.context.pootle_path,
+            len(self.stale_stores),
+            len(self.store_revisions))
+        self.remove_stale_fragments()
 
         last_exported_filepath = self.last_exported_file_path
         self.update_exported_revision()
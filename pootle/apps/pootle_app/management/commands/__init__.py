@@ -8,18 +8,62 @@
 
 import datetime
 import logging
+import time
+import traceback
+from multiprocessing import Pool
 
-from django.db import transaction
+from django.db import connections, transaction
 from django.core.management.base import BaseCommand, CommandError
 
 from pootle.runner import set_sync_mode
 from pootle_language.models import Language
 from pootle_project.models import Project
+from pootle_revision.contextmanagers import (
+    CoalescedRevisions, coalesce_revisions)
 from pootle_translationproject.models import TranslationProject
 
 
 logger = logging.getLogger(__name__)
 
+# the command being run by the worker processes of ``PootleCommand``, set
+# before the pool is forked
+_pool_command = None
+
+
+def _init_worker():
+    # connections inherited from the parent process can not be shared
+    connections.close_all()
+
+
+def _do_tp_in_worker(tp_pk, options):
+    command = _pool_command
+    try:
+        tp = command.get_tps().get(pk=tp_pk)
+        if options["atomic"] == "tp":
+            with transaction.atomic():
+                revisions = command.do_translation_project(
+                    tp, flush_revisions=False, **options)
+        else:
+            revisions = command.do_translation_project(
+                tp, flush_revisions=False, **options)
+    except Exception:
+        return tp_pk, None, traceback.format_exc()
+    return tp_pk, revisions, None
+
+
+def _do_tps_in_worker(args):
+    """Runs ``do_translation_project`` for a group of TPs, one after another,
+    in a worker process.
+
+    Returns a list of ``(tp_pk, revisions, error)``, where ``revisions`` are
+    the revision updates that should be flushed by the parent process.
+    """
+    tp_pks, options = args
+    return [
+        _do_tp_in_worker(tp_pk, options)
+        for tp_pk
+        in tp_pks]
+
 
 class SkipChecksMixin(object):
     def check(self, app_configs=None, tags=None, display_num_errors=False,
@@ -41,6 +85,12 @@ class PootleCommand(BaseCommand):
 
     atomic_default = "tp"
     process_disabled_projects = False
+    # whether translation projects can be handled in a pool of processes
+    # with --jobs
+    parallel_tps = True
+    # whether the TPs of a project must be handled by the same process, eg
+    # because they share the project's files on disk
+    parallel_by_project = False
     project_related = (
         "source_language", )
     tp_related = (
@@ -84,13 +134,29 @@ class PootleCommand(BaseCommand):
             help=(
                 u"Run commands using database atomic "
                 u"transactions"))
+        parser.add_argument(
+            "--jobs",
+            type=int,
+            dest="jobs",
+            default=1,
+            help=u"Number of processes to run the command in")
 
     def __init__(self, *args, **kwargs):
         self.languages = []
         self.projects = []
         super(PootleCommand, self).__init__(*args, **kwargs)
 
-    def do_translation_project(self, tp, **options):
+    def do_translation_project(self, tp, flush_revisions=True, **options):
+        with coalesce_revisions(flush=flush_revisions) as revisions:
+            self._do_translation_project(tp, **options)
+        if revisions.coalesced:
+            logging.debug(
+                u"[pootle] Coalesced %s revision updates for %s",
+                revisions.coalesced,
+                tp)
+        return revisions
+
+    def _do_translation_project(self, tp, **options):
         if hasattr(self, "handle_translation_project"):
             logging.info(u"[pootle] Running: %s for %s", self.name, tp)
             if not self.handle_translation_project(tp, **options):
@@ -120,6 +186,9 @@ class PootleCommand(BaseCommand):
                                unrecognized_languages)
 
     def handle(self, **options):
+        if options.get("jobs", 1) > 1 and options["atomic"] == "all":
+            raise CommandError(
+                "The --jobs option can not be used with --atomic=all")
         if options["atomic"] == "all":
             with transaction.atomic():
                 return self._handle(**options)
@@ -161,7 +230,9 @@ class PootleCommand(BaseCommand):
         if options["no_rq"]:
             set_sync_mode(options['noinput'])
 
-        if options["atomic"] == "tp":
+        if self.parallel_tps and options.get("jobs", 1) > 1:
+            self._handle_parallel_tps(**options)
+        elif options["atomic"] == "tp":
             self._handle_atomic_tps(**options)
         else:
             self._handle_tps(**options)
@@ -185,7 +256,7 @@ class PootleCommand(BaseCommand):
             for tp in tps.iterator():
                 self.do_translation_project(tp, **options)
 
-    def _handle_atomic_tps(self, **options):
+    def get_tps(self):
         related = [
             ("project__%s" % project_related)
             for project_related in self.project_related]
@@ -201,7 +272,72 @@ class PootleCommand(BaseCommand):
 
         if self.languages:
             tps = tps.filter(language__code__in=self.languages)
+        return tps
 
-        for tp in tps.iterator():
+    def _handle_atomic_tps(self, **options):
+        for tp in self.get_tps().iterator():
             with transaction.atomic():
                 self.do_translation_project(tp, **options)
+
+    def _handle_parallel_tps(self, **options):
+        """Handle each TP in a pool of processes.
+
+        Each TP is handled in its own transaction if ``--atomic=tp``. The
+        revision updates of all of the TPs are merged, and flushed once all
+        of the TPs have been handled.
+
+        If ``parallel_by_project`` is set, the TPs of each project are
+        handled one after another by the same process.
+        """
+        global _pool_command
+
+        tps = list(self.get_tps().values_list("pk", "project_id"))
+        groups = {}
+        for tp_pk, project_pk in tps:
+            group = project_pk if self.parallel_by_project else tp_pk
+            groups.setdefault(group, []).append(tp_pk)
+        tp_count = len(tps)
+        revisions = CoalescedRevisions()
+        failed = []
+        handled = 0
+        start = time.time()
+        _pool_command = self
+        # workers must open their own db connections
+        connections.close_all()
+        pool = Pool(options["jobs"], initializer=_init_worker)
+        try:
+            results = pool.imap_unordered(
+                _do_tps_in_worker,
+                [(tp_pks, options) for tp_pks in groups.values()])
+            for group_results in results:
+                for tp_pk, tp_revisions, error in group_results:
+                    if error:
+                        failed.append(tp_pk)
+                        logger.error(
+                            u"[pootle] %s failed for TP(%s):\n%s",
+                            self.name,
+                            tp_pk,
+                            error)
+                    else:
+                        revisions.update(tp_revisions)
+                handled += len(group_results)
+                logger.info(
+                    u"[pootle] %s: handled %s/%s TPs in %.2fs",
+                    self.name,
+                    handled,
+                    tp_count,
+                    time.time() - start)
+        finally:
+            pool.close()
+            pool.join()
+            _pool_command = None
+        revisions.flush()
+        if failed:
+            raise CommandError(
+                "%s failed for %s translation projects: %s"
+                % (self.name,
+                   len(failed),
+                   ", ".join(
+                       TranslationProject.objects.filter(
+                           pk__in=failed).values_list(
+                               "pootle_path", flat=True))))
@@ -20,6 +20,8 @@ from . import PootleCommand
 class Command(PootleCommand):
     help = "Allow checks to be recalculated manually."
     process_disabled_projects = True
+    # --jobs is used to check the units of each TP in parallel
+    parallel_tps = False
 
     def add_arguments(self, parser):
         super(Command, self).add_arguments(parser)
@@ -31,22 +33,26 @@ class Command(PootleCommand):
             help='Check to recalculate',
         )
 
-    def update_checks(self, check_names, translation_project=None):
+    def update_checks(self, check_names, translation_project=None, jobs=1):
         update_checks.send(
             TranslationProject,
             check_names=check_names,
             instance=translation_project,
+            jobs=jobs,
             clear_unknown=True,
             update_data_after=True)
 
     def handle_all_stores(self, translation_project, **options):
         self.stdout.write(u"Running %s for %s" %
                           (self.name, translation_project))
-        self.update_checks(options["check_names"], translation_project)
+        self.update_checks(
+            options["check_names"],
+            translation_project,
+            jobs=options["jobs"])
 
     def handle_all(self, **options):
         if not self.projects and not self.languages:
             self.stdout.write(u"Running %s (noargs)" % self.name)
-            self.update_checks(options["check_names"])
+            self.update_checks(options["check_names"], jobs=options["jobs"])
         else:
             super(Command, self).handle_all(**options)
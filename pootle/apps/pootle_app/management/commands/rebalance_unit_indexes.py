@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import logging
+import os
+os.environ['DJANGO_SETTINGS_MODULE'] = 'pootle.settings'
+
+from . import PootleCommand
+
+
+logger = logging.getLogger(__name__)
+
+
+class Command(PootleCommand):
+    help = "Renumber unit indexes, leaving gaps for inserting new units"
+    process_disabled_projects = True
+
+    def handle_all_stores(self, translation_project, **options):
+        renumbered = 0
+        for store in translation_project.stores.all().iterator():
+            updated = store.rebalance_indexes()
+            if updated:
+                logger.debug(
+                    "Renumbered %s units in %s",
+                    updated,
+                    store.pootle_path)
+            renumbered += updated
+        self.stdout.write(
+            u"Renumbered %s units for %s"
+            % (renumbered, translation_project))
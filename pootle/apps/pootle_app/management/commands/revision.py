@@ -13,6 +13,7 @@ os.environ['DJANGO_SETTINGS_MODULE'] = 'pootle.settings'
 from django.core.management.base import BaseCommand
 
 from pootle.core.models import Revision
+from pootle_revision.contextmanagers import get_coalesced_counts
 from . import SkipChecksMixin
 
 
@@ -28,8 +29,22 @@ class Command(SkipChecksMixin, BaseCommand):
             dest='restore',
             help='Restore the current revision number from the DB.',
         )
+        parser.add_argument(
+            '--coalesced',
+            action='store_true',
+            default=False,
+            dest='coalesced',
+            help='Print the number of revision updates that were coalesced.',
+        )
 
     def handle(self, **options):
+        if options['coalesced']:
+            counts = get_coalesced_counts()
+            self.stdout.write(
+                'requested: %(requested)s, flushed: %(flushed)s, '
+                'coalesced: %(coalesced)s' % counts)
+            return
+
         if options['restore']:
             from pootle_store.models import Unit
             Revision.set(Unit.max_revision())
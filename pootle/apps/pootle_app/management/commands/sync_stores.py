@@ -20,6 +20,8 @@ logger = logging.getLogger(__name__)
 class Command(PootleCommand):
     help = "Save new translations to disk manually."
     process_disabled_projects = True
+    # TPs share the project's fs checkout
+    parallel_by_project = True
 
     def __init__(self, *args, **kwargs):
         self.warn_on_conflict = []
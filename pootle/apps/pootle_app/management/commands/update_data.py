@@ -12,6 +12,9 @@ os.environ['DJANGO_SETTINGS_MODULE'] = 'pootle.settings'
 
 from pootle.core.signals import update_data
 from pootle_app.management.commands import PootleCommand
+from pootle_app.models import Directory
+from pootle_data.store_data import StoreDataBulkUpdater
+from pootle_data.utils import DirectoryDataRollup
 from pootle_store.models import Store
 from pootle_translationproject.models import TranslationProject
 
@@ -30,20 +33,35 @@ class Command(PootleCommand):
             dest='stores',
             help='Store to update data')
 
+    def update_directories(self, directories):
+        """Rebuild the rollups of the directories from their store data"""
+        for directory in directories:
+            directory.data_tool.update()
+
     def handle_stores(self, stores):
         stores = Store.objects.filter(pootle_path__in=stores)
-        tps = set()
-        for store in stores:
-            update_data.send(store.__class__, instance=store)
-            logger.debug(
-                "Updated data for store: %s",
-                store.pootle_path)
-            tps.add(store.tp)
+        StoreDataBulkUpdater(stores, update_rollups=False).update()
+        logger.debug(
+            "Updated data for %s stores",
+            stores.count())
+        tps = TranslationProject.objects.filter(
+            pk__in=stores.values("translation_project_id"))
         for tp in tps:
             update_data.send(tp.__class__, instance=tp)
             logger.debug(
                 "Updated data for translation project: %s",
                 tp.pootle_path)
+        parent_paths = set(
+            path
+            for store in stores
+            for path in DirectoryDataRollup(store).parent_paths)
+        self.update_directories(
+            Directory.objects.filter(
+                pootle_path__in=parent_paths,
+                obsolete=False))
+        logger.debug(
+            "Updated data for %s directories",
+            len(parent_paths))
 
     def handle(self, **options):
         projects = options.get("projects")
@@ -57,12 +75,18 @@ class Command(PootleCommand):
         if languages:
             tps = tps.filter(language__code__in=languages)
         for tp in tps:
-            for store in tp.stores.all():
-                update_data.send(store.__class__, instance=store)
-                logger.debug(
-                    "Updated data for store: %s",
-                    store.pootle_path)
+            # the rollups are rebuilt for the whole TP
+            StoreDataBulkUpdater(
+                tp.stores.all(),
+                update_rollups=False).update()
+            logger.debug(
+                "Updated store data for translation project: %s",
+                tp.pootle_path)
             update_data.send(tp.__class__, instance=tp)
             logger.debug(
                 "Updated data for translation project: %s",
                 tp.pootle_path)
+            self.update_directories(tp.dirs.filter(obsolete=False))
+            logger.debug(
+                "Updated directory data for translation project: %s",
+                tp.pootle_path)
@@ -22,6 +22,8 @@ logger = logging.getLogger(__name__)
 class Command(PootleCommand):
     help = "Update database stores from files."
     process_disabled_projects = True
+    # TPs share the project's fs checkout
+    parallel_by_project = True
     log_name = "update"
 
     def add_arguments(self, parser):
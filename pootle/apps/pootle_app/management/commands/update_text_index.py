@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import os
+os.environ['DJANGO_SETTINGS_MODULE'] = 'pootle.settings'
+
+from django.core.management.base import CommandError
+
+from pootle.core.delegate import text_index
+from pootle_store.models import Unit
+
+from . import PootleCommand
+
+
+class Command(PootleCommand):
+    help = "Rebuild the text index used for searching units"
+    process_disabled_projects = True
+
+    def add_arguments(self, parser):
+        super(Command, self).add_arguments(parser)
+        parser.add_argument(
+            '--disable',
+            action='store_true',
+            dest='disable',
+            default=False,
+            help='Stop using and updating the text index',
+        )
+
+    def handle_all_stores(self, translation_project, **options):
+        self.stdout.write(
+            u"Indexing units for %s" % translation_project)
+        self.index.rebuild(
+            Unit.objects.filter(
+                store__translation_project=translation_project))
+
+    def handle_all(self, **options):
+        index = text_index.get(Unit)
+        if index is None:
+            raise CommandError("No text index is configured")
+        self.index = index()
+        if options["disable"]:
+            self.index.set_state(None)
+            return
+        # units saved while the index is building are also indexed
+        self.index.set_state("building")
+        super(Command, self).handle_all(**options)
+        if not self.projects and not self.languages:
+            self.index.set_state("ready")
+        elif not self.index.ready:
+            self.stdout.write(
+                u"Partial index built, run without --project/--language "
+                u"to enable searching with the index")
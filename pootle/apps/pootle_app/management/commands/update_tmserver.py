@@ -7,21 +7,26 @@
 # AUTHORS file for copyright and authorship information.
 
 import os
-from hashlib import md5
+from collections import defaultdict
 
 # This must be run before importing Django.
 os.environ['DJANGO_SETTINGS_MODULE'] = 'pootle.settings'
 
-from elasticsearch import Elasticsearch, helpers
 from translate.storage import factory
 
+try:
+    from elasticsearch import Elasticsearch, helpers
+except ImportError:
+    Elasticsearch = None
+
 from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
-from django.utils import dateparse
-from django.utils.encoding import force_bytes
 
-from pootle.core.utils import dateformat
+from pootle.core.delegate import tm_updater
+from pootle.core.search.backends import LocalTMBackend
+from pootle_misc.util import import_func
 from pootle_store.models import Unit
+from pootle_store.unit.tm import TM_UNIT_FIELDS, get_tm_unit_data
 from pootle_translationproject.models import TranslationProject
 
 
@@ -70,55 +75,19 @@ class DBParser(BaseParser):
                 store__translation_project__project__disabled=True
             ).exclude(store__obsolete=True)
 
-        units_qs = units_qs.values(
-            'id',
-            'revision',
-            'source_f',
-            'target_f',
-            'change__submitted_on',
-            'change__submitted_by__username',
-            'change__submitted_by__full_name',
-            'change__submitted_by__email',
-            'store__translation_project__project__fullname',
-            'store__pootle_path',
-            'store__translation_project__language__code'
-        ).order_by()
+        units_qs = units_qs.values(*TM_UNIT_FIELDS).order_by()
 
         return units_qs.iterator(), units_qs.count()
 
     def get_unit_data(self, unit):
         """Return dict with data to import for a single unit."""
-        fullname = (unit['change__submitted_by__full_name'] or
-                    unit['change__submitted_by__username'])
-
-        email_md5 = None
-        if unit['change__submitted_by__email']:
-            email_md5 = md5(
-                force_bytes(unit['change__submitted_by__email'])).hexdigest()
-
-        iso_submitted_on = unit.get('change__submitted_on', None)
-
-        display_submitted_on = None
-        if iso_submitted_on:
-            display_submitted_on = dateformat.format(
-                dateparse.parse_datetime(str(iso_submitted_on))
-            )
-
-        return {
+        data = get_tm_unit_data(unit)
+        data.update({
             '_index': self.INDEX_NAME,
             '_type': unit['store__translation_project__language__code'],
             '_id': unit['id'],
-            'revision': int(unit['revision']),
-            'project': unit['store__translation_project__project__fullname'],
-            'path': unit['store__pootle_path'],
-            'username': unit['change__submitted_by__username'],
-            'fullname': fullname,
-            'email_md5': email_md5,
-            'source': unit['source_f'],
-            'target': unit['target_f'],
-            'iso_submitted_on': iso_submitted_on,
-            'display_submitted_on': display_submitted_on,
-        }
+        })
+        return data
 
 
 class FileParser(BaseParser):
@@ -216,6 +185,14 @@ class Command(BaseCommand):
             default=False,
             help='Report the number of translations to index and quit'
         )
+        parser.add_argument(
+            '--retry-failed',
+            action='store_true',
+            dest='retry_failed',
+            default=False,
+            help='Queue translations that failed to be indexed in the '
+                 'local TM again and quit'
+        )
 
         # Local TM specific options.
         local = parser.add_argument_group('Local TM', 'Pootle Local '
@@ -302,12 +279,21 @@ class Command(BaseCommand):
         self.INDEX_NAME = self.tm_settings['INDEX_NAME']
         self.is_local_tm = options['tm'] == 'local'
 
-        self.es = Elasticsearch([
-            {
-                'host': self.tm_settings['HOST'],
-                'port': self.tm_settings['PORT'],
-            }], retry_on_timeout=True
-        )
+        self.local_backend = None
+        self.es = None
+        backend_class = import_func(self.tm_settings['ENGINE'])
+        if issubclass(backend_class, LocalTMBackend):
+            self.local_backend = backend_class(options['tm'])
+        elif Elasticsearch is None:
+            raise CommandError('The elasticsearch package is required to '
+                               'update this TM.')
+        else:
+            self.es = Elasticsearch([
+                {
+                    'host': self.tm_settings['HOST'],
+                    'port': self.tm_settings['PORT'],
+                }], retry_on_timeout=True
+            )
 
         # If files to import have been provided.
         if options['files']:
@@ -330,27 +316,62 @@ class Command(BaseCommand):
                 stdout=self.stdout, index=self.INDEX_NAME,
                 disabled_projects=options['disabled_projects'])
 
+    def _index_exists(self):
+        if self.local_backend is not None:
+            return self.local_backend.max_revision() is not None
+        return self.es.indices.exists(self.INDEX_NAME)
+
+    def _delete_index(self):
+        if self.local_backend is not None:
+            self.local_backend.clear()
+        else:
+            self.es.indices.delete(index=self.INDEX_NAME)
+
+    def _create_index(self):
+        # local TM indexes are created as translations are added
+        if self.local_backend is None:
+            self.es.indices.create(index=self.INDEX_NAME)
+
+    def _bulk(self, actions):
+        if self.local_backend is None:
+            helpers.bulk(self.es, actions)
+            return
+        objs = defaultdict(list)
+        for action in actions:
+            language = action.pop('_type')
+            action['id'] = action.pop('_id')
+            action.pop('_index')
+            objs[language].append(action)
+            if len(objs[language]) == BULK_CHUNK_SIZE:
+                self.local_backend.bulk_update(language, objs.pop(language))
+        for language, language_objs in objs.items():
+            self.local_backend.bulk_update(language, language_objs)
+
+    def _get_max_revision(self):
+        if self.local_backend is not None:
+            return self.local_backend.max_revision()
+        result = self.es.search(
+            index=self.INDEX_NAME,
+            body={
+                'aggs': {
+                    'max_revision': {
+                        'max': {
+                            'field': 'revision'
+                        }
+                    }
+                }
+            }
+        )
+        return result['aggregations']['max_revision']['value']
+
     def _set_latest_indexed_revision(self, **options):
         self.last_indexed_revision = -1
 
         if (not options['rebuild'] and
             not options['refresh'] and
-            self.es.indices.exists(self.INDEX_NAME)):
-
-            result = self.es.search(
-                index=self.INDEX_NAME,
-                body={
-                    'aggs': {
-                        'max_revision': {
-                            'max': {
-                                'field': 'revision'
-                            }
-                        }
-                    }
-                }
-            )
-            self.last_indexed_revision = \
-                result['aggregations']['max_revision']['value'] or -1
+            self._index_exists()):
+
+            self.last_indexed_revision = self._get_max_revision() or -1
 
         self.parser.last_indexed_revision = self.last_indexed_revision
 
@@ -358,24 +379,29 @@ class Command(BaseCommand):
                           self.last_indexed_revision)
 
     def handle(self, **options):
+        if options['retry_failed']:
+            retried = tm_updater.get(Unit)().retry_failed()
+            self.stdout.write("%s translations queued for indexing" % retried)
+            return
+
         self._initialize(**options)
 
         if (options['rebuild'] and
             not options['dry_run'] and
-            self.es.indices.exists(self.INDEX_NAME)):
+            self._index_exists()):
 
-            self.es.indices.delete(index=self.INDEX_NAME)
+            self._delete_index()
 
         if (not options['dry_run'] and
-            not self.es.indices.exists(self.INDEX_NAME)):
+            not self._index_exists()):
 
-            self.es.indices.create(index=self.INDEX_NAME)
+            self._create_index()
 
         if self.is_local_tm:
             self._set_latest_indexed_revision(**options)
 
         if isinstance(self.parser, FileParser):
-            helpers.bulk(self.es, self._parse_translations(**options))
+            self._bulk(self._parse_translations(**options))
             return
 
         # If we are parsing from DB.
@@ -386,4 +412,4 @@ class Command(BaseCommand):
 
         for tp in tp_qs:
             self.parser.tp_pk = tp.pk
-            helpers.bulk(self.es, self._parse_translations(**options))
+            self._bulk(self._parse_translations(**options))
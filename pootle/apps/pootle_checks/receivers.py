@@ -72,6 +72,7 @@ def tp_checks_handler(**kwargs):
     check_updater.get(TranslationProject)(
         translation_project=tp,
         stores=kwargs.get("stores"),
-        check_names=kwargs.get("check_names")).update(
+        check_names=kwargs.get("check_names"),
+        jobs=kwargs.get("jobs", 1)).update(
             clear_unknown=kwargs.get("clear_unknown", False),
             update_data_after=kwargs.get("update_data_after", False))
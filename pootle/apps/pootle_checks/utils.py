@@ -7,6 +7,8 @@
 # AUTHORS file for copyright and authorship information.
 
 import logging
+import time
+from multiprocessing import Pool
 
 from translate.filters import checks
 from translate.filters.decorators import Category
@@ -19,6 +21,7 @@ from pootle.core.bulk import BulkCRUD
 from pootle.core.contextmanagers import bulk_operations
 from pootle.core.signals import create, delete, update_data
 from pootle_store.constants import UNTRANSLATED
+from pootle_store.fields import to_db
 from pootle_store.models import QualityCheck, Unit
 from pootle_store.unit import UnitProxy
 from pootle_translationproject.models import TranslationProject
@@ -135,21 +138,45 @@ class UnitQualityCheck(object):
         return updated
 
 
+def check_units(args):
+    """Returns the check failures for a chunk of Unit values dictionaries
+    as a list of ``(unit_id, store_id, failures)``.
+
+    This is run in the process pool of `QualityCheckUpdater`, so it only uses
+    what it is passed, and doesnt touch the db.
+    """
+    tp, check_names, units = args
+    checker = tp.checker
+    results = []
+    for unit in units:
+        unit = CheckableUnit(unit)
+        if check_names is None:
+            failures = checker.run_filters(unit, categorised=True)
+        else:
+            failures = run_given_filters(checker, unit, check_names)
+        results.append((unit.id, unit.store, failures))
+    return results
+
+
 class QualityCheckUpdater(object):
+    chunk_size = 1000
+    jobs = 1
 
     def __init__(self, check_names=None, translation_project=None,
-                 stores=None, units=None):
+                 stores=None, units=None, jobs=1):
         """Refreshes QualityChecks for Units
 
         :param check_names: limit checks to given list of quality check names.
         :param translation_project: an instance of `TranslationProject` to
             restrict the update to.
+        :param jobs: number of processes to check translated units with.
         """
 
         self.check_names = check_names
         self.translation_project = translation_project
         self.stores = stores
         self._units = units
+        self.jobs = jobs or 1
         self._updated_stores = {}
 
     @cached_property
@@ -235,7 +262,12 @@ class QualityCheckUpdater(object):
             self.clear_unknown_checks()
         with bulk_operations(QualityCheck):
             self.update_untranslated()
-            self.update_translated()
+            if self.jobs == 1:
+                self.update_translated()
+        if self.jobs > 1:
+            # checks are written for each chunk as results come in, rather
+            # than being held until the end of the bulk operation
+            self.update_translated_parallel()
         updated = self.updated_stores
         if update_data_after:
             self.update_data(updated)
@@ -305,6 +337,105 @@ class QualityCheckUpdater(object):
         # clear the cache of the remaining Store
         return updated_count
 
+    def get_unit_chunks(self, tp):
+        """Yields chunks of translated Unit values for a TP, to be passed to
+        `check_units`
+        """
+        translated = (
+            self.units.filter(
+                state__gt=UNTRANSLATED,
+                store__translation_project=tp)
+                      .order_by("store", "index"))
+        unit_fields = [
+            "id", "source_f", "target_f", "locations", "store__id",
+            "store__translation_project__language__code"]
+        chunk = []
+        for unit in translated.values(*unit_fields).iterator():
+            unit["store__translation_project__id"] = tp.pk
+            unit["source_f"] = to_db(unit["source_f"])
+            unit["target_f"] = to_db(unit["target_f"])
+            chunk.append(unit)
+            if len(chunk) == self.chunk_size:
+                yield tp, self.check_names, chunk
+                chunk = []
+        if chunk:
+            yield tp, self.check_names, chunk
+
+    def apply_check_failures(self, tp, results):
+        """Bulk create and delete QualityChecks from the results of
+        `check_units`
+        """
+        new_checks = []
+        stale_checks = []
+        updated_count = 0
+        for unit_id, store, failures in results:
+            original_checks = self.checks.get(unit_id, {})
+            new_checks += [
+                QualityCheck(
+                    unit_id=unit_id,
+                    name=name,
+                    message=failure["message"],
+                    category=failure["category"])
+                for name, failure
+                in failures.items()
+                if name not in original_checks]
+            stale = [
+                check["id"]
+                for name, check
+                in original_checks.items()
+                if name not in failures]
+            stale_checks += stale
+            if stale or set(failures) - set(original_checks):
+                self.update_store(tp, store)
+                updated_count += 1
+        if new_checks:
+            create.send(QualityCheck, objects=new_checks)
+        if stale_checks:
+            delete.send(
+                QualityCheck,
+                objects=QualityCheck.objects.filter(id__in=stale_checks))
+        return updated_count
+
+    def update_translated_parallel(self):
+        """Update checks for translated Units, checking the Units of each TP
+        in a pool of processes
+        """
+        tps = self.tp_qs.select_related("project", "language")
+        if self.translation_project is not None:
+            tps = tps.filter(pk=self.translation_project.pk)
+        elif self._units is not None or self.stores is not None:
+            tps = tps.filter(
+                pk__in=self.units.order_by().values(
+                    "store__translation_project").distinct())
+        updated_count = 0
+        pool = Pool(self.jobs)
+        try:
+            for tp in tps.iterator():
+                updated_count += self.update_tp_parallel(pool, tp)
+        finally:
+            pool.close()
+            pool.join()
+        return updated_count
+
+    def update_tp_parallel(self, pool, tp):
+        start = time.time()
+        checked_count = 0
+        updated_count = 0
+        chunks = pool.imap_unordered(check_units, self.get_unit_chunks(tp))
+        for results in chunks:
+            checked_count += len(results)
+            updated_count += self.apply_check_failures(tp.pk, results)
+        timetaken = time.time() - start
+        logger.info(
+            "[checks] Checked %s units for %s in %.2f seconds "
+            "(%.1f units/s), %s updated",
+            checked_count,
+            tp.pootle_path,
+            timetaken,
+            checked_count / timetaken if timetaken else 0,
+            updated_count)
+        return updated_count
+
     def update_store(self, tp, store):
         self._updated_stores[tp] = (
             self._updated_stores.get(tp, set()))
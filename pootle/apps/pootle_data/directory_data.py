@@ -8,12 +8,41 @@
 
 from django.db.models import Max
 
+from pootle.core.bulk import BulkCRUD
+from pootle.core.decorators import persistent_property
 from pootle_translationproject.models import TranslationProject
 
-from .utils import RelatedStoresDataTool
+from .models import DirectoryData, StoreData
+from .tp_data import TPDataUpdater
+from .utils import SUM_FIELDS, DirectoryRollupMixin, RelatedStoresDataTool
 
 
-class DirectoryDataTool(RelatedStoresDataTool):
+class DirectoryDataCRUD(BulkCRUD):
+    model = DirectoryData
+
+
+class DirectoryDataUpdater(TPDataUpdater):
+    """Rebuilds the rollup data for a Directory from the StoreData of all
+    non-obsolete stores beneath it.
+    """
+
+    related_name = "directory"
+    update_fields = SUM_FIELDS + (
+        "last_created_unit",
+        "last_submission")
+
+    @property
+    def store_data_qs(self):
+        return StoreData.objects.filter(
+            store__translation_project_id=self.model.tp_id,
+            store__pootle_path__startswith=self.model.pootle_path,
+            store__obsolete=False)
+
+    def get_store_data(self, **kwargs):
+        return self.get_fields(self.filter_fields(**kwargs))
+
+
+class DirectoryDataTool(DirectoryRollupMixin, RelatedStoresDataTool):
     """Retrieves aggregate stats for a Directory"""
 
     group_by = ("store__parent__tp_path", )
@@ -30,6 +59,18 @@ class DirectoryDataTool(RelatedStoresDataTool):
         except TranslationProject.DoesNotExist:
             return self.all_stat_data.aggregate(rev=Max("max_unit_revision"))["rev"]
 
+    @persistent_property
+    def children_stats(self):
+        if self.context.translation_project.project.disabled:
+            return {}
+        return self.get_rollup_children_stats()
+
+    @persistent_property
+    def object_stats(self):
+        if self.context.translation_project.project.disabled:
+            return self.get_object_stats(self.stat_data)
+        return self.get_rollup_object_stats()
+
     def filter_data(self, qs):
         return (
             qs.filter(
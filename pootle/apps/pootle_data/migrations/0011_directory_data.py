@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pootle_app', '0019_remove_extra_indeces'),
+        ('pootle_statistics', '0023_remove_scorelog'),
+        ('pootle_store', '0055_fill_unit_source_data'),
+        ('pootle_data', '0010_not_null_max_revision_in_store_and_tp_data'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirectoryData',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('critical_checks', models.IntegerField(default=0)),
+                ('pending_suggestions', models.IntegerField(default=0)),
+                ('total_words', models.IntegerField(default=0)),
+                ('translated_words', models.IntegerField(default=0)),
+                ('fuzzy_words', models.IntegerField(default=0)),
+                ('directory', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='data', to='pootle_app.Directory')),
+                ('last_created_unit', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='pootle_store.Unit')),
+                ('last_submission', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='pootle_statistics.Submission')),
+            ],
+            options={
+                'db_table': 'pootle_directory_data',
+            },
+        ),
+    ]
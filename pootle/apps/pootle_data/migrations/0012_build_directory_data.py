@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+from django.db.models import Max, Sum
+
+
+SUM_FIELDS = (
+    "critical_checks",
+    "total_words",
+    "fuzzy_words",
+    "translated_words",
+    "pending_suggestions")
+
+
+def build_directory_data(apps, schema_editor):
+    Directory = apps.get_model("pootle_app.Directory")
+    DirectoryData = apps.get_model("pootle_data.DirectoryData")
+    StoreData = apps.get_model("pootle_data.StoreData")
+    directories = (
+        Directory.objects.filter(obsolete=False, tp__isnull=False)
+                         .exclude(data__isnull=False))
+    aggregates = {k: Sum(k) for k in SUM_FIELDS}
+    aggregates.update(
+        last_created_unit=Max("last_created_unit"),
+        last_submission=Max("last_submission"))
+    rollups = []
+    for directory in directories.iterator():
+        data = StoreData.objects.filter(
+            store__translation_project_id=directory.tp_id,
+            store__pootle_path__startswith=directory.pootle_path,
+            store__obsolete=False).aggregate(**aggregates)
+        rollups.append(
+            DirectoryData(
+                directory_id=directory.pk,
+                last_created_unit_id=data.pop("last_created_unit"),
+                last_submission_id=data.pop("last_submission"),
+                **{k: v or 0 for k, v in data.items()}))
+    DirectoryData.objects.bulk_create(rollups, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pootle_data', '0011_directory_data'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_directory_data, migrations.RunPython.noop),
+    ]
@@ -43,6 +43,63 @@ class StoreChecksData(AbstractPootleChecksData):
         return self.store.pootle_path
 
 
+class DirectoryData(models.Model):
+    """Materialized rollup of the StoreData for all stores beneath a
+    Directory.
+
+    Counters are maintained by applying deltas from StoreData updates to
+    each parent directory of the updated store.
+    """
+
+    class Meta(object):
+        db_table = "pootle_directory_data"
+
+    directory = models.OneToOneField(
+        "pootle_app.Directory",
+        on_delete=models.CASCADE,
+        db_index=True,
+        related_name="data")
+    # the latest unit created beneath the directory
+    last_created_unit = models.ForeignKey(
+        "pootle_store.Unit",
+        db_index=False,
+        null=True,
+        blank=True,
+        related_name="+",
+        on_delete=models.SET_NULL)
+    # the latest submission made beneath the directory
+    last_submission = models.ForeignKey(
+        "pootle_statistics.Submission",
+        db_index=False,
+        null=True,
+        blank=True,
+        related_name="+",
+        on_delete=models.SET_NULL)
+    critical_checks = models.IntegerField(
+        null=False,
+        blank=False,
+        default=0)
+    pending_suggestions = models.IntegerField(
+        null=False,
+        blank=False,
+        default=0)
+    total_words = models.IntegerField(
+        null=False,
+        blank=False,
+        default=0)
+    translated_words = models.IntegerField(
+        null=False,
+        blank=False,
+        default=0)
+    fuzzy_words = models.IntegerField(
+        null=False,
+        blank=False,
+        default=0)
+
+    def __unicode__(self):
+        return self.directory.pootle_path
+
+
 class TPData(AbstractPootleData):
 
     class Meta(object):
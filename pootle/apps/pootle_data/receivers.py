@@ -8,7 +8,7 @@
 
 import logging
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, pre_delete, pre_save
 from django.dispatch import receiver
 
 from pootle.core.delegate import crud, data_tool, data_updater
@@ -16,7 +16,10 @@ from pootle.core.signals import create, delete, update, update_data
 from pootle_store.models import Store
 from pootle_translationproject.models import TranslationProject
 
-from .models import StoreChecksData, StoreData, TPChecksData, TPData
+from .models import (
+    DirectoryData, StoreChecksData, StoreData, TPChecksData, TPData)
+from .store_data import StoreDataUnitDelta
+from .utils import DirectoryDataRollup
 
 
 logger = logging.getLogger(__name__)
@@ -27,6 +30,16 @@ def handle_store_data_obj_create(**kwargs):
     crud.get(StoreData).create(**kwargs)
 
 
+@receiver(create, sender=DirectoryData)
+def handle_directory_data_obj_create(**kwargs):
+    crud.get(DirectoryData).create(**kwargs)
+
+
+@receiver(update, sender=DirectoryData)
+def handle_directory_data_obj_update(**kwargs):
+    crud.get(DirectoryData).update(**kwargs)
+
+
 @receiver(create, sender=TPData)
 def handle_tp_data_obj_create(**kwargs):
     crud.get(TPData).create(**kwargs)
@@ -78,9 +91,37 @@ def handle_storedata_save(**kwargs):
     update_data.send(tp.__class__, instance=tp)
 
 
+@receiver(pre_delete, sender=StoreData)
+def handle_storedata_delete(**kwargs):
+    instance = kwargs["instance"]
+    rollup = DirectoryDataRollup(instance.store)
+    rollup.update(rollup.get_data(instance), rollup.get_data(None))
+
+
+@receiver(pre_save, sender=Store)
+def handle_store_obsolete_change(**kwargs):
+    instance = kwargs["instance"]
+    if instance.pk is None:
+        return
+    changed = Store.objects.filter(
+        pk=instance.pk,
+        obsolete=not instance.obsolete).exists()
+    if not changed:
+        return
+    data = StoreData.objects.filter(store_id=instance.pk).first()
+    rollup = DirectoryDataRollup(instance)
+    if instance.obsolete:
+        rollup.remove(data)
+    else:
+        rollup.restore(data)
+
+
 @receiver(update_data, sender=Store)
 def handle_store_data_update(**kwargs):
     store = kwargs.get("instance")
+    unit = kwargs.get("unit")
+    if unit is not None and StoreDataUnitDelta(store, unit).update():
+        return
     data_tool.get(Store)(store).update()
 
 
@@ -8,17 +8,22 @@
 
 from translate.filters.decorators import Category
 
-from django.db import models
-from django.db.models import Case, Count, Max, Q, When
+from django.db import models, transaction
+from django.db.models import (
+    Case, Count, F, Max, OuterRef, Q, Subquery, When)
+from django.utils.functional import cached_property
 
 from pootle.core.bulk import BulkCRUD
-from pootle.core.signals import update_data, update_revisions
+from pootle.core.contextmanagers import keep_data
+from pootle.core.signals import (
+    create, delete, update, update_data, update_revisions)
 from pootle_statistics.models import Submission
 from pootle_store.constants import FUZZY, OBSOLETE, TRANSLATED
-from pootle_store.models import QualityCheck
+from pootle_store.models import QualityCheck, Suggestion, Unit
+from pootle_translationproject.models import TranslationProject
 
-from .models import StoreChecksData, StoreData
-from .utils import DataTool, DataUpdater
+from .models import StoreChecksData, StoreData, TPChecksData, TPData
+from .utils import DataTool, DataUpdater, DirectoryDataRollup
 
 
 class StoreDataCRUD(BulkCRUD):
@@ -40,7 +45,7 @@ class StoreDataCRUD(BulkCRUD):
 
     def post_create(self, instance=None, objects=None, pre=None, result=None):
         if objects:
-            self.update_tps_and_revisions(set(result.store for data in objects))
+            self.update_tps_and_revisions(set(data.store for data in objects))
 
     def post_update(self, instance=None, objects=None, pre=None, result=None):
         if objects:
@@ -82,6 +87,10 @@ class StoreDataUpdater(DataUpdater):
         "max_unit_revision",
         "max_unit_mtime")
 
+    @property
+    def rollup(self):
+        return DirectoryDataRollup(self.store)
+
     @property
     def store(self):
         return self.model
@@ -179,3 +188,399 @@ class StoreDataUpdater(DataUpdater):
             data.update(self.aggregate_defaults)
 
         return data
+
+    def update(self, **kwargs):
+        previous = self.rollup.get_data(
+            self.data if self.data.pk else None)
+        super(StoreDataUpdater, self).update(**kwargs)
+        self.rollup.update(previous, self.rollup.get_data(self.data))
+
+
+class StoreDataBulkUpdater(object):
+    """Recalculates the StoreData and StoreChecksData for many stores at
+    once, using queries grouped by store rather than querying each store.
+
+    The parent directory rollups of updated stores are updated in the same
+    transaction, unless ``update_rollups`` is ``False`` and the caller
+    rebuilds them. Updating the data for their TPs is left to the caller.
+    """
+
+    update_fields = StoreDataUpdater.update_fields
+    fk_fields = StoreDataUpdater.fk_fields
+    aggregate_defaults = StoreDataUpdater.aggregate_defaults
+
+    def __init__(self, stores, update_rollups=True):
+        self.stores = stores
+        self.update_rollups = update_rollups
+
+    @property
+    def store_ids(self):
+        return self.stores.values("pk")
+
+    @property
+    def unit_aggregation(self):
+        # the same aggregates that are used to update a single store
+        return StoreDataUpdater(None).get_aggregation(
+            StoreDataUpdater.aggregate_fields)
+
+    @property
+    def last_created_unit_qs(self):
+        return (
+            Unit.objects.filter(
+                store_id=OuterRef("pk"),
+                state__gt=OBSOLETE,
+                creation_time__isnull=False)
+                        .order_by("-creation_time", "-revision", "-id")
+                        .values("id")[:1])
+
+    @property
+    def last_submission_qs(self):
+        return (
+            Submission.objects.filter(unit__store_id=OuterRef("pk"))
+                              .order_by("-creation_time", "-pk")
+                              .values("pk")[:1])
+
+    def get_stores(self):
+        return (
+            self.stores.select_related("translation_project")
+                       .annotate(
+                           latest_unit=Subquery(self.last_created_unit_qs),
+                           latest_submission=Subquery(
+                               self.last_submission_qs)))
+
+    def get_unit_data(self):
+        units = (
+            Unit.objects.filter(store_id__in=self.store_ids)
+                        .order_by()
+                        .values("store_id")
+                        .annotate(**self.unit_aggregation))
+        return {
+            data.pop("store_id"): data
+            for data
+            in units.iterator()}
+
+    def get_pending_suggestions(self):
+        suggestions = (
+            Suggestion.objects.filter(
+                unit__store_id__in=self.store_ids,
+                unit__state__gt=OBSOLETE,
+                state__name="pending")
+                              .order_by()
+                              .values("unit__store_id")
+                              .annotate(count=Count("id")))
+        return {
+            data["unit__store_id"]: data["count"]
+            for data
+            in suggestions.iterator()}
+
+    def get_checks(self):
+        checks = (
+            QualityCheck.objects.exclude(false_positive=True)
+                        .filter(unit__store_id__in=self.store_ids)
+                        .filter(unit__state__gt=OBSOLETE)
+                        .order_by()
+                        .values("unit__store_id", "category", "name")
+                        .annotate(count=Count("id")))
+        store_checks = {}
+        for check in checks.iterator():
+            store_checks.setdefault(
+                check.pop("unit__store_id"), []).append(check)
+        return store_checks
+
+    def get_store_data(self):
+        """Returns a dictionary of ``store -> data`` for each of the stores,
+        where ``data`` has the same fields as are calculated by
+        ``StoreDataUpdater.get_store_data``
+        """
+        unit_data = self.get_unit_data()
+        pending_suggestions = self.get_pending_suggestions()
+        checks = self.get_checks()
+        store_data = {}
+        for store in self.get_stores().iterator():
+            data = dict(
+                last_created_unit=store.latest_unit,
+                last_submission=store.latest_submission,
+                max_unit_revision=None,
+                max_unit_mtime=None)
+            data.update(unit_data.get(store.pk, {}))
+            data["max_unit_revision"] = data["max_unit_revision"] or 0
+            if store.obsolete:
+                data.update(self.aggregate_defaults)
+                data["checks"] = []
+            else:
+                for k, v in self.aggregate_defaults.items():
+                    if data.get(k) is None:
+                        data[k] = v
+                data["checks"] = checks.get(store.pk, [])
+                data["pending_suggestions"] = pending_suggestions.get(
+                    store.pk, 0)
+                data["critical_checks"] = sum(
+                    check["count"]
+                    for check
+                    in data["checks"]
+                    if check["category"] == Category.CRITICAL)
+            store_data[store] = data
+        return store_data
+
+    def set_data(self, store_data, data):
+        changed = set()
+        for k in self.update_fields:
+            if k == "checks":
+                continue
+            v = data[k]
+            if k in self.fk_fields:
+                k = "%s_id" % k
+            if getattr(store_data, k) != v:
+                setattr(store_data, k, v)
+                changed.add(k)
+        return changed
+
+    def update_check_data(self, store_data):
+        """Bulk create, update and delete StoreChecksData, and return the
+        ids of the stores with changed checks
+        """
+        existing = {}
+        check_data = StoreChecksData.objects.filter(
+            store_id__in=[store.pk for store in store_data])
+        for pk, store, category, name, count in check_data.values_list(
+                "pk", "store_id", "category", "name", "count").iterator():
+            existing[(store, category, name)] = (pk, count)
+        to_add = []
+        to_update = {}
+        for store, data in store_data.items():
+            for check in data["checks"]:
+                key = (store.pk, check["category"], check["name"])
+                if key not in existing:
+                    to_add.append(
+                        StoreChecksData(
+                            store=store,
+                            category=check["category"],
+                            name=check["name"],
+                            count=check["count"]))
+                    continue
+                pk, count = existing.pop(key)
+                if count != check["count"]:
+                    to_update[pk] = dict(count=check["count"])
+        if existing:
+            delete.send(
+                StoreChecksData,
+                objects=StoreChecksData.objects.filter(
+                    pk__in=[pk for pk, __ in existing.values()]))
+        if to_update:
+            update.send(StoreChecksData, updates=to_update)
+        if to_add:
+            create.send(StoreChecksData, objects=to_add)
+        return set(
+            [store for store, __, __ in existing]
+            + list(to_update)
+            + [check_data.store_id for check_data in to_add])
+
+    def update(self):
+        """Update the data for all of the stores, and return the ids of the
+        TPs with changed data
+        """
+        store_data = self.get_store_data()
+        existing = {
+            data.store_id: data
+            for data
+            in StoreData.objects.filter(
+                store_id__in=[store.pk for store in store_data])}
+        to_add = []
+        to_update = []
+        rollups = []
+        update_fields = set()
+        changed_tps = set()
+        for store, data in store_data.items():
+            rollup = DirectoryDataRollup(store)
+            previous = existing.get(store.pk)
+            previous_data = rollup.get_data(previous)
+            if previous is None:
+                current = StoreData(store=store)
+                self.set_data(current, data)
+                to_add.append(current)
+            else:
+                previous.store = store
+                current = previous
+                changed = self.set_data(current, data)
+                if not changed:
+                    continue
+                update_fields |= changed
+                to_update.append(current)
+            rollups.append(
+                (rollup, previous_data, rollup.get_data(current)))
+            changed_tps.add(store.translation_project_id)
+        with transaction.atomic():
+            with keep_data(signals=(update_data, ),
+                           suppress=(TranslationProject, )):
+                changed_stores = self.update_check_data(store_data)
+                changed_tps |= set(
+                    store.translation_project_id
+                    for store in store_data
+                    if store.pk in changed_stores)
+                if to_update:
+                    update.send(
+                        StoreData,
+                        objects=to_update,
+                        update_fields=list(update_fields))
+                if to_add:
+                    create.send(StoreData, objects=to_add)
+            if self.update_rollups:
+                for rollup, previous_data, current_data in rollups:
+                    rollup.update(previous_data, current_data)
+        return changed_tps
+
+
+class StoreDataUnitDelta(object):
+    """Applies the changes made by saving a single unit to the data of its
+    store, TP and parent directories, rather than recalculating the data
+    of the whole store.
+
+    Created units, and units becoming or ceasing to be obsolete, are not
+    handled, and ``update`` returns ``False`` for them. The update_data
+    command can be used to recalculate data that has drifted.
+    """
+
+    sum_fields = (
+        "total_words",
+        "translated_words",
+        "fuzzy_words",
+        "critical_checks")
+
+    def __init__(self, store, unit):
+        self.store = store
+        self.unit = unit
+
+    @property
+    def can_update(self):
+        return (
+            not self.store.obsolete
+            and self.unit._frozen.pk is not None
+            and self.previous["state"] > OBSOLETE
+            and self.unit.state > OBSOLETE
+            and StoreData.objects.filter(store_id=self.store.pk).exists())
+
+    @cached_property
+    def previous(self):
+        # the state of the unit that the store data last accounted for
+        previous = getattr(self.unit, "_store_data_state", None)
+        if previous is not None:
+            return previous
+        frozen = self.unit._frozen
+        wordcount = (
+            self.unit.counter.count_words(frozen.source.strings)
+            if self.unit.source_updated
+            else self.unit.unit_source.source_wordcount)
+        return dict(state=frozen.state, wordcount=wordcount or 0)
+
+    @cached_property
+    def current(self):
+        return dict(
+            state=self.unit.state,
+            wordcount=self.unit.unit_source.source_wordcount or 0)
+
+    def get_words(self, state, wordcount):
+        return dict(
+            total_words=wordcount,
+            translated_words=wordcount if state == TRANSLATED else 0,
+            fuzzy_words=wordcount if state == FUZZY else 0)
+
+    @cached_property
+    def check_changes(self):
+        return {
+            check: count
+            for check, count
+            in (getattr(self.unit, "_check_changes", None) or {}).items()
+            if count}
+
+    @cached_property
+    def last_submission(self):
+        return (
+            Submission.objects.filter(unit_id=self.unit.pk)
+                              .order_by("-pk")
+                              .values_list("pk", flat=True)
+                              .first())
+
+    @cached_property
+    def delta(self):
+        previous = self.get_words(**self.previous)
+        current = self.get_words(**self.current)
+        delta = {
+            k: current[k] - previous[k]
+            for k in current}
+        delta["critical_checks"] = sum(
+            count
+            for (category, name), count
+            in self.check_changes.items()
+            if category == Category.CRITICAL)
+        return delta
+
+    @cached_property
+    def rollup(self):
+        return DirectoryDataRollup(self.store)
+
+    def get_updates(self):
+        updates = {
+            k: F(k) + v
+            for k, v
+            in self.delta.items()
+            if v}
+        updates["max_unit_revision"] = self.rollup.get_max_update(
+            "max_unit_revision", self.unit.revision)
+        if self.unit.mtime:
+            updates["max_unit_mtime"] = self.rollup.get_max_update(
+                "max_unit_mtime", self.unit.mtime)
+        if self.last_submission:
+            updates["last_submission"] = self.rollup.get_max_update(
+                "last_submission", self.last_submission)
+        return updates
+
+    def update_check_data(self, check_data, **kwargs):
+        for (category, name), count in self.check_changes.items():
+            updated = check_data.filter(
+                category=category,
+                name=name,
+                **kwargs).update(count=F("count") + count)
+            if not updated and count > 0:
+                check_data.create(
+                    category=category,
+                    name=name,
+                    count=count,
+                    **kwargs)
+        check_data.filter(count__lte=0, **kwargs).delete()
+
+    def update_rollups(self):
+        previous = self.rollup.get_data(None)
+        current = dict(previous)
+        current.update(
+            {k: v
+             for k, v
+             in self.delta.items()
+             if k in current})
+        current["last_submission"] = self.last_submission
+        self.rollup.update(previous, current)
+
+    def update(self):
+        """Apply the changes to the data, returns ``False`` if the data
+        should be recalculated instead
+        """
+        if not self.can_update:
+            return False
+        updates = self.get_updates()
+        with transaction.atomic():
+            StoreData.objects.filter(store_id=self.store.pk).update(**updates)
+            TPData.objects.filter(
+                tp_id=self.store.translation_project_id).update(**updates)
+            if self.check_changes:
+                self.update_check_data(
+                    StoreChecksData.objects, store_id=self.store.pk)
+                self.update_check_data(
+                    TPChecksData.objects,
+                    tp_id=self.store.translation_project_id)
+            self.update_rollups()
+        self.unit._store_data_state = self.current
+        self.store.data.refresh_from_db()
+        update_revisions.send(
+            self.store.__class__,
+            instance=self.store,
+            keys=["stats", "checks"])
+        return True
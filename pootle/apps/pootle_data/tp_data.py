@@ -16,7 +16,8 @@ from pootle.core.signals import update_data
 from pootle_data.models import StoreChecksData, StoreData
 
 from .models import TPChecksData, TPData
-from .utils import DataUpdater, RelatedStoresDataTool
+from .store_data import StoreDataBulkUpdater
+from .utils import DataUpdater, DirectoryRollupMixin, RelatedStoresDataTool
 
 
 class TPDataCRUD(BulkCRUD):
@@ -102,7 +103,7 @@ class TPDataUpdater(DataUpdater):
             "category", "name").annotate(count=Sum("count"))
 
 
-class TPDataTool(RelatedStoresDataTool):
+class TPDataTool(DirectoryRollupMixin, RelatedStoresDataTool):
     """Retrieves aggregate stats for a TP"""
 
     group_by = ("store__tp_path", )
@@ -122,6 +123,14 @@ class TPDataTool(RelatedStoresDataTool):
     def context_name(self):
         return self.context.pootle_path.strip("/").replace("/", ".")
 
+    @property
+    def rollup_directory(self):
+        return self.context.directory
+
+    @persistent_property
+    def children_stats(self):
+        return self.get_rollup_children_stats()
+
     @property
     def object_stats(self):
         stats = {
@@ -171,5 +180,5 @@ class TPUpdater(object):
         self.object_list = object_list
 
     def update(self):
-        for store in self.object_list:
-            update_data.send(store.__class__, instance=store)
+        if StoreDataBulkUpdater(self.object_list).update():
+            update_data.send(self.tp.__class__, instance=self.tp)
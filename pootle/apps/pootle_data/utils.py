@@ -7,7 +7,7 @@
 # AUTHORS file for copyright and authorship information.
 
 from django.db import models
-from django.db.models import Sum
+from django.db.models import Case, F, Q, Sum, Value, When
 from django.utils.functional import cached_property
 
 from pootle.core.decorators import persistent_property
@@ -19,7 +19,8 @@ from pootle_statistics.proxy import SubmissionProxy
 from pootle_store.models import Unit
 
 from .apps import PootleDataConfig
-from .models import StoreChecksData, StoreData, TPChecksData, TPData
+from .models import (
+    DirectoryData, StoreChecksData, StoreData, TPChecksData, TPData)
 
 
 SUM_FIELDS = (
@@ -340,6 +341,10 @@ class RelatedStoresDataTool(DataTool):
                self.context_name,
                self.rev_cache_key))
 
+    @property
+    def stale_cache_key(self):
+        return '%s.%s' % (self.cache_key_name, self.context_name)
+
     @property
     def child_stats_qs(self):
         """Aggregates grouped sum/max fields"""
@@ -593,6 +598,154 @@ class RelatedStoresDataTool(DataTool):
         return user and user.is_superuser
 
 
+class DirectoryDataRollup(object):
+    """Applies changes in a store's StoreData to the materialized
+    DirectoryData of each of its parent directories.
+    """
+
+    sum_fields = SUM_FIELDS
+    max_fields = (
+        "last_created_unit",
+        "last_submission")
+
+    def __init__(self, store):
+        self.store = store
+
+    @property
+    def parent_paths(self):
+        parts = self.store.pootle_path.split("/")
+        return [
+            "%s/" % "/".join(parts[:i])
+            for i
+            in range(3, len(parts))]
+
+    @property
+    def rollup_qs(self):
+        return DirectoryData.objects.filter(
+            directory__pootle_path__in=self.parent_paths)
+
+    def get_data(self, data):
+        values = {
+            k: (getattr(data, k) or 0) if data is not None else 0
+            for k
+            in self.sum_fields}
+        values.update(
+            {k: getattr(data, "%s_id" % k) if data is not None else None
+             for k
+             in self.max_fields})
+        return values
+
+    def get_max_update(self, field, value):
+        return Case(
+            When(Q(**{"%s__isnull" % field: True})
+                 | Q(**{"%s__lt" % field: value}),
+                 then=Value(value)),
+            default=F(field))
+
+    def get_updates(self, previous, current):
+        updates = {}
+        for field in self.sum_fields:
+            delta = current[field] - previous[field]
+            if delta:
+                updates[field] = F(field) + delta
+        for field in self.max_fields:
+            changed = (
+                current[field]
+                and current[field] != previous[field])
+            if changed:
+                updates[field] = self.get_max_update(field, current[field])
+        return updates
+
+    def apply(self, previous, current):
+        updates = self.get_updates(previous, current)
+        if updates:
+            self.rollup_qs.update(**updates)
+        return updates
+
+    def update(self, previous, current):
+        """Apply the difference between 2 snapshots of a store's data, as
+        returned by ``get_data``, to its parent directory rollups.
+
+        Obsolete stores are not counted in the rollups, their data is
+        removed and restored as they are made obsolete or resurrected.
+        """
+        if self.store.obsolete:
+            return {}
+        return self.apply(previous, current)
+
+    def remove(self, data):
+        return self.apply(self.get_data(data), self.get_data(None))
+
+    def restore(self, data):
+        return self.apply(self.get_data(None), self.get_data(data))
+
+
+class DirectoryRollupMixin(object):
+    """Reads child stats from the materialized DirectoryData rollups, rather
+    than aggregating all of the StoreData beneath the directory.
+    """
+
+    @property
+    def rollup_directory(self):
+        return self.context
+
+    def get_child_rollups(self):
+        """Rollups of the child directories, or ``None`` if any of them has
+        not been built yet.
+        """
+        child_dirs = self.rollup_directory.child_dirs.filter(obsolete=False)
+        rollups = DirectoryData.objects.filter(directory__in=child_dirs)
+        if rollups.count() < child_dirs.count():
+            return None
+        return rollups.values(
+            *("directory__name", ) + self.max_fields + self.sum_fields)
+
+    def get_rollup(self):
+        try:
+            return self.rollup_directory.data
+        except DirectoryData.DoesNotExist:
+            return None
+
+    def get_rollup_object_stats(self):
+        rollup = self.get_rollup()
+        if rollup is None:
+            # rollups are built by migration and `update_data`, until then
+            # aggregate the store data
+            return self.get_object_stats(self.stat_data)
+        stats = {
+            self.stats_mapping.get(k, k): getattr(rollup, k)
+            for k
+            in self.sum_fields}
+        stats["last_submission"] = None
+        stats["last_created_unit"] = None
+        stats["suggestions"] = None
+        return stats
+
+    def get_rollup_children_stats(self):
+        child_rollups = self.get_child_rollups()
+        if child_rollups is None:
+            return self.get_children_stats(self.child_stats_qs)
+        children = {}
+        for child in child_rollups:
+            self.add_child_stats(
+                children,
+                child,
+                root=child["directory__name"],
+                use_aggregates=False)
+        child_stores = self.data_model.filter(
+            store__parent=self.rollup_directory)
+        for child in child_stores.values(
+                *("store__name", ) + self.max_fields + self.sum_fields):
+            self.add_child_stats(
+                children,
+                child,
+                root=child["store__name"],
+                use_aggregates=False)
+        self.add_submission_info(None, children)
+        self.add_last_created_info(None, children)
+        return children
+
+
 class RelatedTPsDataTool(RelatedStoresDataTool):
 
     group_by = (
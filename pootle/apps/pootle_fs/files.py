@@ -20,6 +20,7 @@ from pootle_statistics.models import SubmissionTypes
 from pootle_store.constants import POOTLE_WINS, SOURCE_WINS
 from pootle_store.models import Store
 
+from .fingerprint import FileFingerprints
 
 logger = logging.getLogger(__name__)
 
@@ -75,14 +76,24 @@ class FSFile(object):
 
     @property
     def fs_changed(self):
+        # sync hashes were previously the file mtime
         return (
-            self.latest_hash
-            != self.store_fs.last_sync_hash)
+            self.store_fs.last_sync_hash
+            not in [self.latest_hash, self.latest_mtime])
+
+    @property
+    def latest_mtime(self):
+        if self.file_exists:
+            try:
+                return str(os.stat(self.file_path).st_mtime)
+            except OSError:
+                return
 
     @property
     def latest_hash(self):
         if self.file_exists:
-            return str(os.stat(self.file_path).st_mtime)
+            return FileFingerprints(
+                self.store_fs.project).get_hash(self.path)
 
     @property
     def latest_author(self):
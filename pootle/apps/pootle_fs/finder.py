@@ -7,20 +7,28 @@
 # AUTHORS file for copyright and authorship information.
 
 import fnmatch
+import hashlib
+import logging
 import os
 import re
+import time
+from collections import OrderedDict
 
 import scandir
 
 from django.core.exceptions import ValidationError
+from django.utils.encoding import force_bytes
 from django.utils.functional import cached_property
 from django.utils.lru_cache import lru_cache
 
+from pootle.core.cache import get_cache
 from pootle.core.decorators import persistent_property
 
 from .apps import PootleFSConfig
 
 
+logger = logging.getLogger(__name__)
+
 PATH_MAPPING = (
     (".", "\."),
     ("<language_code>", "(?P<language_code>[\w\@\-\.]*)"),
@@ -35,6 +43,7 @@ class TranslationFileFinder(object):
     ns = "pootle.fs.finder"
     sw_version = PootleFSConfig.version
     extensions = DEFAULT_EXTENSIONS
+    mtime_resolution = 2
     path_mapping = PATH_MAPPING
 
     def __init__(self, translation_mapping, path_filters=None,
@@ -46,6 +55,7 @@ class TranslationFileFinder(object):
             self.extensions = extensions
         self.path_filters = path_filters
         self.exclude_languages = exclude_languages or []
+        self.stats = dict(found=0, skipped=0, cached=0, listed=0)
 
     @cached_property
     def regex(self):
@@ -77,18 +87,130 @@ class TranslationFileFinder(object):
                 os.path.basename(file_path))[0]
         return file_path, matched
 
+    @cached_property
+    def dir_patterns(self):
+        """Regexes for each directory level beneath the file_root that can
+        contain matching files. Levels after a <dir_path> can match
+        anything and are ``None``.
+        """
+        parts = self.translation_mapping[len(self.file_root):].strip("/")
+        patterns = []
+        for part in parts.split("/")[:-1]:
+            if "<dir_path>" in part:
+                patterns.append(None)
+                break
+            for k, v in self.path_mapping:
+                part = part.replace(k, v)
+            patterns.append(re.compile(r"^%s$" % part))
+        return patterns
+
+    def can_match_dir(self, dir_path):
+        """Whether files beneath ``dir_path`` could match the
+        translation_mapping
+        """
+        parts = dir_path[len(self.file_root):].strip("/").split("/")
+        for i, part in enumerate(parts):
+            if i >= len(self.dir_patterns):
+                return False
+            if self.dir_patterns[i] is None:
+                return True
+            match = self.dir_patterns[i].match(part)
+            if not match:
+                return False
+            language_code = match.groupdict().get("language_code")
+            if language_code in self.exclude_languages:
+                return False
+        return True
+
+    def get_listing_cache_key(self, dir_path, mtime):
+        return (
+            "%s.%s.listing.%s"
+            % (self.ns,
+               self.sw_version,
+               hashlib.md5(
+                   force_bytes(u"%s:%r" % (dir_path, mtime))).hexdigest()))
+
+    def list_dir(self, dir_path):
+        dirs = []
+        files = []
+        for entry in scandir.scandir(dir_path):
+            if not entry.is_dir():
+                files.append(entry.name)
+            elif not entry.is_symlink():
+                dirs.append(entry.name)
+        return sorted(dirs), sorted(files)
+
+    def list_dirs(self, dir_paths):
+        """Returns the ``(dirs, files)`` listing of each of ``dir_paths``
+        that exists.
+
+        Listings are cached for each directory against its mtime, so
+        unchanged directories are not listed again. Listings of directories
+        changed within ``mtime_resolution`` seconds are not cached, as files
+        added in the same tick would not change the mtime.
+        """
+        cache = get_cache("lru")
+        cache_keys = OrderedDict()
+        for dir_path in dir_paths:
+            try:
+                mtime = os.stat(dir_path).st_mtime
+            except OSError:
+                continue
+            cache_keys[dir_path] = (
+                mtime, self.get_listing_cache_key(dir_path, mtime))
+        cached = cache.get_many([key for mtime_, key in cache_keys.values()])
+        listings = OrderedDict()
+        to_cache = {}
+        now = time.time()
+        for dir_path, (mtime, cache_key) in cache_keys.items():
+            if cache_key in cached:
+                self.stats["cached"] += 1
+                listings[dir_path] = cached[cache_key]
+                continue
+            try:
+                listings[dir_path] = self.list_dir(dir_path)
+            except OSError:
+                continue
+            self.stats["listed"] += 1
+            if now - mtime > self.mtime_resolution:
+                to_cache[cache_key] = listings[dir_path]
+        if to_cache:
+            cache.set_many(to_cache)
+        return listings
+
     def walk(self):
-        """Walk a filesystem"""
-        for root, dirs_, files in scandir.walk(self.file_root):
-            for filename in files:
-                yield os.path.join(root, filename)
+        """Walk a filesystem, skipping directories that cannot contain
+        matching files.
+
+        Each level of directories is listed together, using cached listings
+        for unchanged directories.
+        """
+        self.stats = dict(found=0, skipped=0, cached=0, listed=0)
+        to_walk = [self.file_root]
+        while to_walk:
+            listings = self.list_dirs(to_walk)
+            to_walk = []
+            for root, (dirs, files) in listings.items():
+                for filename in files:
+                    yield os.path.join(root, filename)
+                for dirname in dirs:
+                    dir_path = os.path.join(root, dirname)
+                    if self.can_match_dir(dir_path):
+                        to_walk.append(dir_path)
+                    else:
+                        self.stats["skipped"] += 1
 
     def find(self):
         """Find matching files anywhere in file_root"""
         for filepath in self.walk():
             match = self.match(filepath)
             if match:
+                self.stats["found"] += 1
                 yield match
+        logger.debug(
+            "[FS] Finder walked %s: %s",
+            self.file_root,
+            ", ".join("%s=%s" % (k, v) for k, v in sorted(self.stats.items())))
 
     @property
     def cache_key(self):
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import hashlib
+import logging
+import os
+from multiprocessing.pool import ThreadPool
+
+from django.utils.encoding import force_bytes
+
+from pootle.core.cache import get_cache
+
+
+logger = logging.getLogger(__name__)
+
+
+class FileFingerprints(object):
+    """Content fingerprints for the files in a project's local checkout.
+
+    The size and mtime of each file are cached with its digest, so that only
+    files with a changed stat are read again. Touched files with unchanged
+    content keep the same fingerprint.
+
+    Each file is cached under its own key, and the keys for a set of files are
+    read and written in bulk.
+    """
+
+    ns = "pootle.fs.fingerprints"
+    block_size = 65536
+    max_workers = 8
+    # dont start a thread pool for fewer files than this
+    pool_threshold = 16
+
+    def __init__(self, project):
+        self.project = project
+        self.stats = dict(found=0, cached=0, digested=0, missing=0)
+
+    @property
+    def cache(self):
+        return get_cache("lru")
+
+    def get_cache_key(self, path):
+        return "%s.%s.%s" % (
+            self.ns,
+            self.project.code,
+            hashlib.md5(force_bytes(path)).hexdigest())
+
+    def get_file_path(self, path):
+        return os.path.join(
+            self.project.local_fs_path,
+            path.strip("/"))
+
+    def digest(self, file_path):
+        content_hash = hashlib.sha1()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(self.block_size), b""):
+                content_hash.update(block)
+        return content_hash.hexdigest()
+
+    def fingerprint(self, path, cached=None):
+        """Returns a ``[size, mtime, digest]`` list for the file at ``path``
+        or ``None`` if it does not exist.
+        """
+        file_path = self.get_file_path(path)
+        try:
+            file_stat = os.stat(file_path)
+        except OSError:
+            return
+        fingerprint = [file_stat.st_size, str(file_stat.st_mtime)]
+        if cached and list(cached[:2]) == fingerprint:
+            return list(cached)
+        return fingerprint + [self.digest(file_path)]
+
+    def map(self, func, items):
+        if len(items) < self.pool_threshold:
+            return [func(item) for item in items]
+        pool = ThreadPool(min(self.max_workers, len(items)))
+        try:
+            return pool.map(func, items)
+        finally:
+            pool.close()
+            pool.join()
+
+    def get_fingerprints(self, paths):
+        """Returns a dictionary of path: ``[size, mtime, digest]`` for all
+        existing files in ``paths``.
+        """
+        keys = {
+            path: self.get_cache_key(path)
+            for path
+            in paths}
+        paths = list(keys)
+        cached = self.cache.get_many(keys.values())
+        results = self.map(
+            lambda path: self.fingerprint(path, cached.get(keys[path])),
+            paths)
+        fingerprints = {}
+        to_set = {}
+        to_delete = []
+        for path, fingerprint in zip(paths, results):
+            if fingerprint is None:
+                self.stats["missing"] += 1
+                if keys[path] in cached:
+                    to_delete.append(keys[path])
+                continue
+            self.stats["found"] += 1
+            if cached.get(keys[path]) == fingerprint:
+                self.stats["cached"] += 1
+            else:
+                self.stats["digested"] += 1
+                to_set[keys[path]] = fingerprint
+            fingerprints[path] = fingerprint
+        if to_set:
+            self.cache.set_many(to_set)
+        if to_delete:
+            self.cache.delete_many(to_delete)
+        logger.debug(
+            "[FS] Fingerprinted files for %s: %s",
+            self.project.code,
+            ", ".join("%s=%s" % (k, v) for k, v in sorted(self.stats.items())))
+        return fingerprints
+
+    def get_hash(self, path):
+        fingerprint = self.get_fingerprints([path]).get(path)
+        if fingerprint:
+            return fingerprint[2]
@@ -30,6 +30,7 @@ from .apps import PootleFSConfig
 from .decorators import emits_state, responds_to_state
 from .delegate import fs_finder, fs_matcher, fs_resources
 from .exceptions import FSStateError
+from .fingerprint import FileFingerprints
 from .models import StoreFS
 from .signals import fs_post_pull, fs_post_push, fs_pre_pull, fs_pre_push
 
@@ -436,8 +437,8 @@ class Plugin(object):
                 update_revision = store_fs.file.push()
             state.resources.pootle_revisions[
                 store_fs.store_id] = update_revision
-            state.resources.file_hashes[
-                store_fs.pootle_path] = store_fs.file.latest_hash
+            # the file may have changed, it is fingerprinted again on sync
+            state.resources.file_hashes.pop(store_fs.pootle_path, None)
             if pootle_wins:
                 response.add("merged_from_pootle", fs_state=fs_state)
             else:
@@ -466,8 +467,6 @@ class Plugin(object):
             if store_fs.store and store_fs.store.data:
                 state.resources.pootle_revisions[
                     store_fs.store_id] = store_fs.store.data.max_unit_revision
-            state.resources.file_hashes[
-                store_fs.pootle_path] = store_fs.file.latest_hash
             fs_state = sfs[store_fs.id]
             fs_state.store_fs = store_fs
             response.add("pulled_to_pootle", fs_state=fs_state)
@@ -496,8 +495,7 @@ class Plugin(object):
             store_fs.file.push()
             state.resources.pootle_revisions[
                 store_fs.store_id] = store_fs.store.data.max_unit_revision
-            state.resources.file_hashes[
-                store_fs.pootle_path] = store_fs.file.latest_hash
+            state.resources.file_hashes.pop(store_fs.pootle_path, None)
             response.add('pushed_to_fs', fs_state=fs_state)
         return response
 
@@ -554,20 +552,31 @@ class Plugin(object):
         fs_to_update = {}
         file_hashes = state.resources.file_hashes
         pootle_revisions = state.resources.pootle_revisions
-        for sync_type in sync_types:
-            if sync_type in response:
-                for response_item in response.completed(sync_type):
-                    store_fs = response_item.store_fs
-                    last_sync_revision = None
-                    if store_fs.store_id in pootle_revisions:
-                        last_sync_revision = pootle_revisions[store_fs.store_id]
-                    file_hash = file_hashes.get(
-                        store_fs.pootle_path, store_fs.file.latest_hash)
-                    store_fs.file.on_sync(
-                        file_hash,
-                        last_sync_revision,
-                        save=False)
-                    fs_to_update[store_fs.id] = store_fs
+        synced = [
+            response_item.store_fs
+            for sync_type in sync_types
+            if sync_type in response
+            for response_item in response.completed(sync_type)]
+        # fingerprint the files that were not hashed in the state together
+        unhashed = {
+            store_fs.path: store_fs.pootle_path
+            for store_fs in synced
+            if store_fs.pootle_path not in file_hashes}
+        if unhashed:
+            fingerprints = FileFingerprints(self.project).get_fingerprints(
+                unhashed.keys())
+            for path, pootle_path in unhashed.items():
+                fingerprint = fingerprints.get(path)
+                file_hashes[pootle_path] = fingerprint and fingerprint[2]
+        for store_fs in synced:
+            last_sync_revision = None
+            if store_fs.store_id in pootle_revisions:
+                last_sync_revision = pootle_revisions[store_fs.store_id]
+            store_fs.file.on_sync(
+                file_hashes.get(store_fs.pootle_path),
+                last_sync_revision,
+                save=False)
+            fs_to_update[store_fs.id] = store_fs
         if fs_to_update:
             bulk_update(
                 fs_to_update.values(),
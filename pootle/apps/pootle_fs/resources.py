@@ -6,7 +6,6 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
-import os
 from fnmatch import fnmatch
 
 from django.db.models import F, Max
@@ -16,6 +15,7 @@ from pootle.core.decorators import persistent_property
 from pootle_store.models import Store
 
 from .apps import PootleFSConfig
+from .fingerprint import FileFingerprints
 from .models import StoreFS
 from .utils import StoreFSPathFilter, StorePathFilter
 
@@ -193,29 +193,47 @@ class FSProjectStateResources(object):
                        .exclude(store__obsolete=True)
                        .values_list("store_id", "store__data__max_unit_revision"))
 
+    @cached_property
+    def file_fingerprints(self):
+        """Dictionary of pootle_path, ``[size, mtime, digest]`` for found
+        files
+        """
+        fingerprints = FileFingerprints(self.context.project).get_fingerprints(
+            path for _pootle_path, path in self.found_file_matches)
+        return {
+            pootle_path: fingerprints.get(path)
+            for pootle_path, path
+            in self.found_file_matches}
+
     @cached_property
     def file_hashes(self):
-        hashes = {}
+        return {
+            pootle_path: fingerprint and fingerprint[2]
+            for pootle_path, fingerprint
+            in self.file_fingerprints.items()}
 
-        def _get_file_hash(path):
-            file_path = os.path.join(
-                self.context.project.local_fs_path,
-                path.strip("/"))
-            if os.path.exists(file_path):
-                return str(os.stat(file_path).st_mtime)
-        for pootle_path, path in self.found_file_matches:
-            hashes[pootle_path] = _get_file_hash(path)
-        return hashes
+    @cached_property
+    def file_mtimes(self):
+        return {
+            pootle_path: fingerprint and fingerprint[1]
+            for pootle_path, fingerprint
+            in self.file_fingerprints.items()}
 
     @cached_property
     def fs_changed(self):
         """StoreFS queryset of tracked resources where the Store has changed
         since it was last synced.
         """
-        hashes = self.file_hashes
+        file_hashes = self.file_hashes
+        file_mtimes = self.file_mtimes
         tracked_files = []
         for store_fs in self.synced.iterator():
-            if store_fs.last_sync_hash == hashes.get(store_fs.pootle_path):
+            # sync hashes were previously the file mtime
+            unchanged = (
+                store_fs.last_sync_hash
+                in [file_hashes.get(store_fs.pootle_path),
+                    file_mtimes.get(store_fs.pootle_path)])
+            if unchanged:
                 continue
             tracked_files.append(store_fs.pk)
         return tracked_files
@@ -31,7 +31,7 @@ def comparable_event_getter(**kwargs_):
     return ComparableLogEvent
 
 
-@getter(grouped_events, sender=(Log, StoreLog, UnitLog))
+@getter(grouped_events, sender=(Log, StoreLog, UnitLog, UserLog))
 def grouped_log_events_getter(**kwargs_):
     return GroupedEvents
 
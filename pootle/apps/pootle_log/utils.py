@@ -6,7 +6,11 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
+import heapq
+from itertools import groupby, islice
+
 from django.contrib.auth import get_user_model
+from django.db.models import F
 from django.utils.functional import cached_property
 
 from pootle.core.delegate import comparable_event
@@ -224,77 +228,105 @@ class Log(object):
             field="unit__creation_time")
         return created_units
 
+    def order_events(self, qs, fields, reverse=False, limit=None):
+        # events without a timestamp are sorted before any others
+        qs = qs.order_by(
+            *[(F(field).desc(nulls_last=True)
+               if reverse
+               else F(field).asc(nulls_first=True))
+              for field in fields])
+        if limit is not None:
+            qs = qs[:limit]
+        return qs
+
+    def created_unit_event(self, created_unit):
+        return self.event(
+            created_unit.unit,
+            created_unit.created_by,
+            created_unit.unit.creation_time,
+            "unit_created",
+            created_unit)
+
+    def submission_event(self, submission):
+        event_name = "state_changed"
+        if submission.field == SubmissionFields.CHECK:
+            event_name = (
+                "check_muted"
+                if submission.new_value == "0"
+                else "check_unmuted")
+        elif submission.field == SubmissionFields.TARGET:
+            event_name = "target_updated"
+        elif submission.field == SubmissionFields.SOURCE:
+            event_name = "source_updated"
+        elif submission.field == SubmissionFields.COMMENT:
+            event_name = "comment_updated"
+        return self.event(
+            submission.unit,
+            submission.submitter,
+            submission.creation_time,
+            event_name,
+            submission,
+            revision=submission.revision)
+
+    def suggestion_added_event(self, suggestion):
+        return self.event(
+            suggestion.unit,
+            suggestion.user,
+            suggestion.creation_time,
+            "suggestion_created",
+            suggestion)
+
+    def suggestion_reviewed_event(self, suggestion):
+        event_name = (
+            "suggestion_accepted"
+            if suggestion.is_accepted
+            else "suggestion_rejected")
+        return self.event(
+            suggestion.unit,
+            suggestion.reviewer,
+            suggestion.review_time,
+            event_name,
+            suggestion)
+
+    def is_suggestion_added(self, suggestion, **kwargs):
+        users = kwargs.get("users")
+        return (
+            (not kwargs.get("start")
+             or (suggestion.creation_time
+                 and suggestion.creation_time >= kwargs.get("start")))
+            and (not kwargs.get("end")
+                 or (suggestion.creation_time
+                     and suggestion.creation_time < kwargs.get("end")))
+            and (not users
+                 or (suggestion.user_id in users)))
+
+    def is_suggestion_reviewed(self, suggestion, **kwargs):
+        users = kwargs.get("users")
+        return (
+            not suggestion.is_pending
+            and ((not kwargs.get("start")
+                  or (suggestion.review_time
+                      and suggestion.review_time >= kwargs.get("start")))
+                 and (not kwargs.get("end")
+                      or (suggestion.review_time
+                          and suggestion.review_time < kwargs.get("end")))
+                 and (not users
+                      or (suggestion.reviewer_id in users))))
+
     def get_created_unit_events(self, **kwargs):
         for created_unit in self.filtered_created_units(**kwargs):
-            yield self.event(
-                created_unit.unit,
-                created_unit.created_by,
-                created_unit.unit.creation_time,
-                "unit_created",
-                created_unit)
+            yield self.created_unit_event(created_unit)
 
     def get_submission_events(self, **kwargs):
         for submission in self.filtered_submissions(**kwargs):
-            event_name = "state_changed"
-            if submission.field == SubmissionFields.CHECK:
-                event_name = (
-                    "check_muted"
-                    if submission.new_value == "0"
-                    else "check_unmuted")
-            elif submission.field == SubmissionFields.TARGET:
-                event_name = "target_updated"
-            elif submission.field == SubmissionFields.SOURCE:
-                event_name = "source_updated"
-            elif submission.field == SubmissionFields.COMMENT:
-                event_name = "comment_updated"
-            yield self.event(
-                submission.unit,
-                submission.submitter,
-                submission.creation_time,
-                event_name,
-                submission,
-                revision=submission.revision)
+            yield self.submission_event(submission)
 
     def get_suggestion_events(self, **kwargs):
-        users = kwargs.get("users")
         for suggestion in self.filtered_suggestions(**kwargs):
-            add_event = (
-                ((not kwargs.get("start")
-                  or (suggestion.creation_time
-                      and suggestion.creation_time >= kwargs.get("start")))
-                 and (not kwargs.get("end")
-                      or (suggestion.creation_time
-                          and suggestion.creation_time < kwargs.get("end")))
-                 and (not users
-                      or (suggestion.user_id in users))))
-            review_event = (
-                not suggestion.is_pending
-                and ((not kwargs.get("start")
-                      or (suggestion.review_time
-                          and suggestion.review_time >= kwargs.get("start")))
-                     and (not kwargs.get("end")
-                          or (suggestion.review_time
-                              and suggestion.review_time < kwargs.get("end")))
-                     and (not users
-                          or (suggestion.reviewer_id in users))))
-            if add_event:
-                yield self.event(
-                    suggestion.unit,
-                    suggestion.user,
-                    suggestion.creation_time,
-                    "suggestion_created",
-                    suggestion)
-            if review_event:
-                event_name = (
-                    "suggestion_accepted"
-                    if suggestion.is_accepted
-                    else "suggestion_rejected")
-                yield self.event(
-                    suggestion.unit,
-                    suggestion.reviewer,
-                    suggestion.review_time,
-                    event_name,
-                    suggestion)
+            if self.is_suggestion_added(suggestion, **kwargs):
+                yield self.suggestion_added_event(suggestion)
+            if self.is_suggestion_reviewed(suggestion, **kwargs):
+                yield self.suggestion_reviewed_event(suggestion)
 
     def get_events(self, **kwargs):
         event_sources = kwargs.pop("event_sources",
@@ -309,6 +341,85 @@ class Log(object):
             for event in self.get_submission_events(**kwargs):
                 yield event
 
+    def stream_created_unit_events(self, reverse=False, limit=None,
+                                   **kwargs):
+        created_units = self.order_events(
+            self.filtered_created_units(**kwargs),
+            ("unit__creation_time", "unit_id"),
+            reverse=reverse,
+            limit=limit)
+        for created_unit in created_units.iterator():
+            yield self.created_unit_event(created_unit)
+
+    def stream_submission_events(self, reverse=False, limit=None, **kwargs):
+        submissions = self.order_events(
+            self.filtered_submissions(**kwargs),
+            ("revision", "creation_time", "unit_id", "pk"),
+            reverse=reverse,
+            limit=limit)
+        for submission in submissions.iterator():
+            yield self.submission_event(submission)
+
+    def stream_suggestion_added_events(self, reverse=False, limit=None,
+                                       **kwargs):
+        suggestions = self.filter_users(
+            self.filter_timestamps(
+                self.filtered_suggestions(**kwargs),
+                start=kwargs.get("start"),
+                end=kwargs.get("end")),
+            kwargs.get("users"),
+            field="user_id",
+            include_meta=True)
+        suggestions = self.order_events(
+            suggestions,
+            ("creation_time", "pk"),
+            reverse=reverse,
+            limit=limit)
+        for suggestion in suggestions.iterator():
+            if self.is_suggestion_added(suggestion, **kwargs):
+                yield self.suggestion_added_event(suggestion)
+
+    def stream_suggestion_reviewed_events(self, reverse=False, limit=None,
+                                          **kwargs):
+        suggestions = self.filter_users(
+            self.filter_timestamps(
+                self.filtered_suggestions(**kwargs),
+                start=kwargs.get("start"),
+                end=kwargs.get("end"),
+                field="review_time"),
+            kwargs.get("users"),
+            field="reviewer_id",
+            include_meta=True).exclude(state__name="pending")
+        suggestions = self.order_events(
+            suggestions,
+            ("review_time", "unit_id", "pk"),
+            reverse=reverse,
+            limit=limit)
+        for suggestion in suggestions.iterator():
+            if self.is_suggestion_reviewed(suggestion, **kwargs):
+                yield self.suggestion_reviewed_event(suggestion)
+
+    def get_event_streams(self, **kwargs):
+        """Returns a list of event iterators for each event source.
+
+        Each source is ordered by the db, by revision and/or timestamp, so
+        the streams can be merged without loading all of the events.
+
+        :param reverse: order the events from the most recent.
+        :param limit: fetch no more than ``limit`` events from each source.
+        """
+        event_sources = kwargs.pop("event_sources",
+                                   ("submission", "suggestion", "unit_source"))
+        streams = []
+        if "unit_source" in event_sources:
+            streams.append(self.stream_created_unit_events(**kwargs))
+        if "suggestion" in event_sources:
+            streams.append(self.stream_suggestion_added_events(**kwargs))
+            streams.append(self.stream_suggestion_reviewed_events(**kwargs))
+        if "submission" in event_sources:
+            streams.append(self.stream_submission_events(**kwargs))
+        return streams
+
 
 class StoreLog(Log):
     include_meta = True
@@ -360,17 +471,72 @@ class UnitLog(Log):
         return qs
 
 
+class MergedEvent(object):
+    """Orders the next event of each stream in a heap merge"""
+
+    def __init__(self, event, stream, position, reverse=False):
+        self.event = event
+        self.stream = stream
+        self.position = position
+        self.reverse = reverse
+
+    def __lt__(self, other):
+        if self.event < other.event:
+            return not self.reverse
+        if other.event < self.event:
+            return self.reverse
+        # keep the order of the sources for equal events
+        return self.position < other.position
+
+
 class GroupedEvents(object):
     def __init__(self, log):
         self.log = log
 
-    def sorted_events(self, start=None, end=None, users=None, reverse=False):
+    def sort_runs(self, events, comparable_event_class, reverse=False):
+        # events that share a revision and timestamp are only ordered by
+        # the comparable event class
+        runs = groupby(
+            events,
+            key=lambda event: (event.revision, event.timestamp))
+        for __, run in runs:
+            for event in sorted((comparable_event_class(event)
+                                 for event in run), reverse=reverse):
+                yield event
+
+    def merge(self, streams, reverse=False):
+        heap = []
+        for position, stream in enumerate(streams):
+            stream = iter(stream)
+            for event in stream:
+                heap.append(MergedEvent(event, stream, position, reverse))
+                break
+        heapq.heapify(heap)
+        while heap:
+            merged = heap[0]
+            yield merged.event
+            for event in merged.stream:
+                merged.event = event
+                heapq.heapreplace(heap, merged)
+                break
+            else:
+                heapq.heappop(heap)
+
+    def sorted_events(self, start=None, end=None, users=None, reverse=False,
+                      limit=None):
         comparable_event_class = comparable_event.get(self.log.__class__)
-        events = sorted(
-            (comparable_event_class(x)
-             for x in self.log.get_events(start=start,
-                                          end=end,
-                                          users=users)), reverse=reverse)
+        streams = self.log.get_event_streams(
+            start=start,
+            end=end,
+            users=users,
+            reverse=reverse,
+            limit=limit)
+        events = self.merge(
+            [self.sort_runs(stream, comparable_event_class, reverse=reverse)
+             for stream in streams],
+            reverse=reverse)
+        if limit is not None:
+            events = islice(events, limit)
         for event in events:
             yield event
 
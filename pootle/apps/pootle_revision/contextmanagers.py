@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import logging
+from contextlib import contextmanager
+
+from django.dispatch import receiver
+
+from pootle.core.cache import get_cache
+from pootle.core.contextmanagers import keep_data
+from pootle.core.signals import update_revisions
+from pootle_app.models import Directory
+from pootle_project.models import Project
+from pootle_store.models import Store
+
+
+logger = logging.getLogger(__name__)
+
+COUNTS_CACHE_KEY = "pootle:revisions:%s"
+
+
+class CoalescedRevisions(object):
+    """Dirty paths and counters collected while revision bumps are
+    coalesced.
+    """
+
+    def __init__(self):
+        # map of keys -> set of directory paths
+        self.paths = {}
+        # map of keys -> {project.id: project}
+        self.projects = {}
+        self.requested = 0
+        self.flushed = 0
+
+    @property
+    def coalesced(self):
+        return max(self.requested - self.flushed, 0)
+
+    def add_paths(self, keys, paths):
+        keys = tuple(sorted(keys or [""]))
+        self.paths[keys] = self.paths.get(keys, set()) | set(paths)
+
+    def add_project(self, keys, project):
+        keys = tuple(sorted(keys or [""]))
+        self.projects[keys] = self.projects.get(keys, {})
+        self.projects[keys][project.id] = project
+
+    def update(self, other):
+        """Merge the dirty paths and projects of another
+        ``CoalescedRevisions``
+        """
+        self.requested += other.requested
+        for keys, paths in other.paths.items():
+            self.paths[keys] = self.paths.get(keys, set()) | paths
+        for keys, projects in other.projects.items():
+            self.projects[keys] = self.projects.get(keys, {})
+            self.projects[keys].update(projects)
+
+    def flush(self):
+        _flush_revisions(self)
+
+
+def _add_revisions(revisions, sender, **kwargs):
+    revisions.requested += 1
+    keys = kwargs.get("keys")
+    instance = kwargs.get("instance")
+    if sender is Project:
+        revisions.add_project(keys, instance)
+    elif isinstance(instance, Store):
+        revisions.add_paths(keys, [instance.parent.pootle_path])
+    elif isinstance(instance, Directory):
+        revisions.add_paths(keys, [instance.pootle_path])
+    else:
+        if kwargs.get("object_list") is not None:
+            revisions.add_paths(
+                keys,
+                kwargs["object_list"].values_list("pootle_path", flat=True))
+        if kwargs.get("paths"):
+            revisions.add_paths(keys, kwargs["paths"])
+
+
+def _flush_revisions(revisions):
+    for keys, paths in revisions.paths.items():
+        if not paths:
+            continue
+        revisions.flushed += 1
+        update_revisions.send(
+            Directory,
+            paths=paths,
+            keys=[k for k in keys if k] or None)
+    for keys, projects in revisions.projects.items():
+        for project in projects.values():
+            revisions.flushed += 1
+            update_revisions.send(
+                Project,
+                instance=project,
+                keys=[k for k in keys if k] or None)
+    _count_revisions(revisions)
+    logger.debug(
+        "[revision] Coalesced %s revision bumps into %s updates",
+        revisions.requested,
+        revisions.flushed)
+
+
+def _count_revisions(revisions):
+    cache = get_cache("redis")
+    for counter in ["requested", "flushed"]:
+        count = getattr(revisions, counter)
+        if count:
+            cache.add(COUNTS_CACHE_KEY % counter, 0, timeout=None)
+            cache.incr(COUNTS_CACHE_KEY % counter, count)
+
+
+def get_coalesced_counts():
+    """Returns the total ``requested``, ``flushed`` and ``coalesced``
+    revision updates of all of the coalesced revisions that have been
+    flushed.
+    """
+    counts = get_cache("redis").get_many(
+        [COUNTS_CACHE_KEY % counter
+         for counter
+         in ["requested", "flushed"]])
+    requested = counts.get(COUNTS_CACHE_KEY % "requested") or 0
+    flushed = counts.get(COUNTS_CACHE_KEY % "flushed") or 0
+    return dict(
+        requested=requested,
+        flushed=flushed,
+        coalesced=max(requested - flushed, 0))
+
+
+@contextmanager
+def coalesce_revisions(flush=True):
+    """Collect all revision bumps made inside the context, and update the
+    revisions for each dirty path once when the context exits.
+
+    Yields a ``CoalescedRevisions`` object with ``requested``, ``flushed``
+    and ``coalesced`` counters.
+
+    :param flush: if ``False`` the revisions are not updated on exit, and
+        the caller is responsible for calling ``flush`` on the yielded
+        object.
+    """
+    revisions = CoalescedRevisions()
+    with keep_data(signals=(update_revisions, )):
+
+        @receiver(update_revisions)
+        def handle_update_revisions(**kwargs):
+            _add_revisions(revisions, **kwargs)
+        yield revisions
+    if flush:
+        _flush_revisions(revisions)
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from django.utils.functional import cached_property
+
+from pootle.core.delegate import states
+from pootle.core.utils.timezone import localdate
+from pootle_statistics.models import SubmissionFields
+from pootle_store.models import Suggestion
+
+from . import scores
+
+
+class EventScoreAggregator(object):
+    """Calculates the scores of log events with grouped queries.
+
+    Events are grouped by action, user and date, and the word counts of each
+    group are summed by the db. Only actions scored with the default score
+    classes can be aggregated, as their scores are proportional to the
+    source word count of the unit.
+    """
+
+    wordcount_field = "unit__unit_source__source_wordcount"
+    scorers = dict(
+        suggestion_created=scores.SuggestionCreatedScore,
+        suggestion_accepted=scores.SuggestionAcceptedScore,
+        suggestion_rejected=scores.SuggestionRejectedScore,
+        target_updated=scores.TargetUpdatedScore,
+        comment_updated=scores.CommentUpdatedScore)
+    # score field that is credited with the word count for an action
+    wordcount_scores = dict(
+        suggestion_created="suggested",
+        suggestion_accepted="reviewed",
+        suggestion_rejected="reviewed",
+        target_updated="translated")
+    submission_actions = {
+        SubmissionFields.TARGET: "target_updated",
+        SubmissionFields.COMMENT: "comment_updated"}
+
+    def __init__(self, logs):
+        self.logs = logs
+
+    @cached_property
+    def suggestion_states(self):
+        return states.get(Suggestion)
+
+    def get_score(self, action, wordcount):
+        score = dict(
+            score=self.scorers[action].score_setting * wordcount,
+            translated=0,
+            reviewed=0,
+            suggested=0)
+        if action in self.wordcount_scores:
+            score[self.wordcount_scores[action]] = wordcount
+        return score
+
+    def group(self, qs, user_field, time_field, *fields):
+        grouped = (
+            qs.filter(**{"%s__gt" % self.wordcount_field: 0})
+              .annotate(event_date=TruncDate(time_field))
+              .order_by()
+              .values(user_field, "event_date", *fields)
+              .annotate(wordcount=Sum(self.wordcount_field)))
+        for group in grouped.iterator():
+            # events without a timestamp are scored for today
+            yield (
+                group[user_field],
+                group["event_date"] or localdate(),
+                group)
+
+    def suggestions(self, **kwargs):
+        return self.logs.filtered_suggestions(
+            include_meta=False,
+            **kwargs)
+
+    def get_created_suggestions(self, users=None, start=None, end=None):
+        suggestions = self.logs.filter_timestamps(
+            self.suggestions(users=users, start=start, end=end),
+            start=start,
+            end=end)
+        if users:
+            suggestions = suggestions.filter(user_id__in=users)
+        for user, event_date, group_ in self.group(
+                suggestions, "user_id", "creation_time"):
+            yield "suggestion_created", user, event_date, group_["wordcount"]
+
+    def get_reviewed_suggestions(self, users=None, start=None, end=None):
+        suggestions = self.logs.filter_timestamps(
+            self.suggestions(users=users, start=start, end=end),
+            start=start,
+            end=end,
+            field="review_time").exclude(
+                state_id=self.suggestion_states["pending"])
+        if users:
+            suggestions = suggestions.filter(reviewer_id__in=users)
+        grouped = self.group(
+            suggestions, "reviewer_id", "review_time", "state_id")
+        for user, event_date, group in grouped:
+            action = (
+                "suggestion_accepted"
+                if group["state_id"] == self.suggestion_states["accepted"]
+                else "suggestion_rejected")
+            yield action, user, event_date, group["wordcount"]
+
+    def get_submissions(self, users=None, start=None, end=None):
+        submissions = self.logs.filtered_submissions(
+            users=users,
+            start=start,
+            end=end,
+            include_meta=False,
+            ordered=False).filter(field__in=list(self.submission_actions))
+        grouped = self.group(
+            submissions, "submitter_id", "creation_time", "field")
+        for user, event_date, group in grouped:
+            yield (
+                self.submission_actions[group["field"]],
+                user,
+                event_date,
+                group["wordcount"])
+
+    def get_aggregates(self, actions=None, **kwargs):
+        """Yields ``(action, user_id, date, wordcount)`` for each group of
+        events with one of ``actions``.
+        """
+        actions = set(self.scorers if actions is None else actions)
+        sources = [
+            (("suggestion_created", ), self.get_created_suggestions),
+            (("suggestion_accepted", "suggestion_rejected"),
+             self.get_reviewed_suggestions),
+            (tuple(self.submission_actions.values()), self.get_submissions)]
+        for source_actions, get_source in sources:
+            if not actions.intersection(source_actions):
+                continue
+            for aggregate in get_source(**kwargs):
+                if aggregate[0] in actions:
+                    yield aggregate
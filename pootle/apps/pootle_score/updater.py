@@ -21,6 +21,7 @@ from pootle_log.utils import LogEvent
 from pootle_score.models import UserStoreScore, UserTPScore
 from pootle_translationproject.models import TranslationProject
 
+from .aggregate import EventScoreAggregator
 from .utils import to_datetime
 
 
@@ -238,30 +239,49 @@ class StoreScoreUpdater(ScoreUpdater):
     def store(self):
         return self.context
 
-    def score_event(self, event, calculated_scores):
-        if event.action not in self.scoring:
-            return
-        scores = self.scoring[event.action](event).get_score()
+    @cached_property
+    def aggregator(self):
+        return EventScoreAggregator(self.logs)
+
+    @cached_property
+    def aggregated_actions(self):
+        """Actions scored with the default score classes, which are
+        calculated with grouped queries rather than event by event.
+        """
+        return set(
+            action
+            for action, scorer
+            in self.scoring.items()
+            if self.aggregator.scorers.get(action) is scorer)
+
+    def add_score(self, calculated_scores, event_date, user, scores):
         if not scores or not any(x > 0 for x in scores.values()):
             return
-        event_date = localdate(event.timestamp)
         calculated_scores[event_date] = (
             calculated_scores.get(event_date, {}))
-        calculated_scores[event_date][event.user.id] = (
-            calculated_scores[event_date].get(event.user.id, {}))
+        calculated_scores[event_date][user] = (
+            calculated_scores[event_date].get(user, {}))
         for k, score in scores.items():
             if not score:
                 continue
-            calculated_scores[event_date][event.user.id][k] = (
-                calculated_scores[event_date][event.user.id].get(k, 0)
+            calculated_scores[event_date][user][k] = (
+                calculated_scores[event_date][user].get(k, 0)
                 + score)
 
-    def calculate(self, start=None, end=None, users=None):
-        calculated_scores = {}
-        scored_events = self.logs.get_events(
+    def score_event(self, event, calculated_scores):
+        if event.action not in self.scoring:
+            return
+        self.add_score(
+            calculated_scores,
+            localdate(event.timestamp),
+            event.user.id,
+            self.scoring[event.action](event).get_score())
+
+    def get_scored_events(self, start=None, end=None, users=None):
+        return self.logs.get_events(
             users=users,
-            start=to_datetime(start),
-            end=to_datetime(end),
+            start=start,
+            end=end,
             include_meta=False,
             ordered=False,
             only=dict(
@@ -281,8 +301,33 @@ class StoreScoreUpdater(ScoreUpdater):
                     "revision",
                     "field")),
             event_sources=("suggestion", "submission"))
-        for event in scored_events:
-            self.score_event(event, calculated_scores)
+
+    def calculate(self, start=None, end=None, users=None):
+        calculated_scores = {}
+        start = to_datetime(start)
+        end = to_datetime(end)
+        aggregated = self.aggregated_actions
+        if aggregated:
+            aggregates = self.aggregator.get_aggregates(
+                actions=aggregated,
+                users=users,
+                start=start,
+                end=end)
+            for action, user, event_date, wordcount in aggregates:
+                self.add_score(
+                    calculated_scores,
+                    event_date,
+                    user,
+                    self.aggregator.get_score(action, wordcount))
+        if set(self.scoring) - aggregated:
+            # custom score classes are applied to each event
+            scored_events = self.get_scored_events(
+                users=users,
+                start=start,
+                end=end)
+            for event in scored_events:
+                if event.action not in aggregated:
+                    self.score_event(event, calculated_scores)
         return calculated_scores
 
     def iterate_scores(self, scores):
@@ -60,6 +60,10 @@ FUZZY = 50
 #: Unit is fully translated
 TRANSLATED = 200
 
+#: Spacing between the indexes of consecutive units, so that units can be
+#: inserted without renumbering the units that follow
+UNIT_INDEX_GAP = 100
+
 # Map for retrieving natural names for unit states
 STATES_MAP = {
     OBSOLETE: _("Obsolete"),
@@ -6,16 +6,17 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
-import difflib
 import logging
-from collections import OrderedDict
+from bisect import bisect_left
+from collections import Counter, OrderedDict
 
 from django.db import models
 from django.utils.functional import cached_property
 
 from pootle.core.delegate import format_diffs
 
-from .constants import FUZZY, OBSOLETE, TRANSLATED, UNTRANSLATED
+from .constants import (
+    FUZZY, OBSOLETE, TRANSLATED, UNIT_INDEX_GAP, UNTRANSLATED)
 from .fields import to_python as multistring_to_python
 from .unit import UnitProxy
 
@@ -80,6 +81,216 @@ class FileUnit(UnitDiffProxy):
         return self.unit["hasplural"]
 
 
+class UnitSequenceMatcher(object):
+    """Diffs 2 sequences of unit ids, anchoring on the ids that appear exactly
+    once in each (as patience diff does).
+
+    The longest run of anchors that keeps its order in both sequences is
+    found in ``O(n log n)``, and is then extended over any neighbouring
+    ids that match. Opcodes are compatible with
+    ``difflib.SequenceMatcher.get_opcodes``.
+    """
+
+    def __init__(self, a, b):
+        self.a = list(a)
+        self.b = list(b)
+
+    def get_anchors(self):
+        a_counts = Counter(self.a)
+        b_counts = Counter(self.b)
+        b_positions = {
+            uid: j
+            for j, uid
+            in enumerate(self.b)
+            if b_counts[uid] == 1 and a_counts[uid] == 1}
+        return [
+            (i, b_positions[uid])
+            for i, uid
+            in enumerate(self.a)
+            if uid in b_positions]
+
+    def longest_ordered_anchors(self, anchors):
+        # patience sorting - ``tails[n]`` is the smallest ``b`` position that
+        # ends an ordered run of ``n + 1`` anchors
+        tails = []
+        tail_anchors = []
+        previous = [None] * len(anchors)
+        for k, (i_, j) in enumerate(anchors):
+            pos = bisect_left(tails, j)
+            if pos:
+                previous[k] = tail_anchors[pos - 1]
+            if pos == len(tails):
+                tails.append(j)
+                tail_anchors.append(k)
+            else:
+                tails[pos] = j
+                tail_anchors[pos] = k
+        run = []
+        k = tail_anchors[-1] if tail_anchors else None
+        while k is not None:
+            run.append(anchors[k])
+            k = previous[k]
+        return run[::-1]
+
+    def get_matches(self):
+        """Returns a list of matching ``(i, j)`` positions, ordered in both
+        sequences.
+        """
+        a_len, b_len = len(self.a), len(self.b)
+        anchors = self.longest_ordered_anchors(self.get_anchors())
+        matches = []
+        i = j = 0
+        for anchor_i, anchor_j in anchors + [(a_len, b_len)]:
+            while (i < anchor_i and j < anchor_j
+                   and self.a[i] == self.b[j]):
+                matches.append((i, j))
+                i += 1
+                j += 1
+            tail = []
+            end_i, end_j = anchor_i, anchor_j
+            while (end_i > i and end_j > j
+                   and self.a[end_i - 1] == self.b[end_j - 1]):
+                end_i -= 1
+                end_j -= 1
+                tail.append((end_i, end_j))
+            matches += tail[::-1]
+            if anchor_i < a_len:
+                matches.append((anchor_i, anchor_j))
+            i, j = anchor_i + 1, anchor_j + 1
+        return matches
+
+    def get_matching_blocks(self):
+        blocks = []
+        for i, j in self.get_matches():
+            if blocks:
+                last_i, last_j, size = blocks[-1]
+                if last_i + size == i and last_j + size == j:
+                    blocks[-1] = (last_i, last_j, size + 1)
+                    continue
+            blocks.append((i, j, 1))
+        blocks.append((len(self.a), len(self.b), 0))
+        return blocks
+
+    def get_opcodes(self):
+        opcodes = []
+        i = j = 0
+        for block_i, block_j, size in self.get_matching_blocks():
+            tag = None
+            if i < block_i and j < block_j:
+                tag = "replace"
+            elif i < block_i:
+                tag = "delete"
+            elif j < block_j:
+                tag = "insert"
+            if tag:
+                opcodes.append((tag, i, block_i, j, block_j))
+            i, j = block_i + size, block_j + size
+            if size:
+                opcodes.append(("equal", block_i, i, block_j, j))
+        return opcodes
+
+
+class UnitIndexPlan(object):
+    """Allocates indexes for units inserted into a store, using the gaps
+    left between the indexes of the existing units.
+
+    Existing units are only shifted when a gap is too small, and then only as
+    far as the next gap that is big enough to absorb the shift.
+    """
+
+    gap = UNIT_INDEX_GAP
+    # give up looking for a gap after this many units, and shift the rest
+    # of the store instead
+    max_shift_scan = 1000
+
+    def __init__(self, indexes):
+        self.indexes = sorted(indexes)
+        self.shifts = []
+        self.new_indexes = {}
+        self._bounded_shifts = []
+        self._tail_delta = 0
+
+    def shifted(self, index):
+        """Index of an existing unit after the shifts planned so far.
+
+        Only valid for indexes at or after the start of the last shift.
+        """
+        return (
+            index
+            + self._tail_delta
+            + sum(delta
+                  for end, delta
+                  in self._bounded_shifts
+                  if index < end))
+
+    def allocate(self, uids, insert_at, next_index=None):
+        """Allocate indexes for ``uids`` between the existing units at
+        ``insert_at`` and ``next_index``.
+
+        Insert points must be allocated in ascending order.
+        """
+        self._bounded_shifts = [
+            (end, delta)
+            for end, delta
+            in self._bounded_shifts
+            if end > insert_at]
+        lower = self.shifted(insert_at)
+        if next_index is None:
+            step = self.gap
+        else:
+            upper = self.shifted(next_index)
+            delta = len(uids) - (upper - lower - 1)
+            if delta > 0:
+                self.shift(next_index, delta)
+                upper += delta
+            step = (upper - lower) // (len(uids) + 1)
+        for i, uid in enumerate(uids):
+            self.new_indexes[uid] = lower + step * (i + 1)
+
+    def find_shift_end(self, start, delta):
+        previous = None
+        pos = bisect_left(self.indexes, start)
+        for index in self.indexes[pos:pos + self.max_shift_scan]:
+            if previous is not None and index != previous:
+                free = self.shifted(index) - self.shifted(previous) - 1
+                if free >= delta:
+                    return index
+            previous = index
+
+    def shift(self, start, delta):
+        end = self.find_shift_end(start, delta)
+        self.shifts.append((start, end, delta))
+        if end is None:
+            self._tail_delta += delta
+        else:
+            self._bounded_shifts.append((end, delta))
+
+    @property
+    def index_updates(self):
+        """Returns a list of ``(start, end, delta)`` tuples for existing units
+        with ``start <= index < end`` (``end`` of ``None`` being unbounded).
+
+        The ranges do not overlap, and are ordered so that they can be
+        applied one after the other.
+        """
+        bounds = sorted(
+            set(start for start, end_, delta_ in self.shifts)
+            | set(end for start_, end, delta_ in self.shifts
+                  if end is not None))
+        updates = []
+        for i, start in enumerate(bounds):
+            end = bounds[i + 1] if i + 1 < len(bounds) else None
+            delta = sum(
+                shift_delta
+                for shift_start, shift_end, shift_delta
+                in self.shifts
+                if (shift_start <= start
+                    and (shift_end is None or start < shift_end)))
+            if delta:
+                updates.append((start, end, delta))
+        return updates[::-1]
+
+
 class DiffableStore(object):
     """Default Store representation for diffing
 
@@ -201,48 +412,40 @@ class StoreDiff(object):
         """All of the db units regardless of state or revision"""
         return self.diffable.source_units
 
+    @cached_property
+    def index_plan(self):
+        plan = UnitIndexPlan(
+            unit["index"] for unit in self.target_units.values())
+        for insert_at, uids_add, next_index in self.insert_points:
+            plan.allocate(uids_add, insert_at, next_index)
+        return plan
+
     @cached_property
     def insert_points(self):
-        """Returns a list of insert points with update index info.
+        """Returns a list of insert points.
         :return: a list of tuples
-            ``(insert_at, uids_to_add, next_index, update_index_delta)`` where
-            ``insert_at`` is the point for inserting
+            ``(insert_at, uids_to_add, next_index)`` where
+            ``insert_at`` is the index of the unit to insert after
             ``uids_to_add`` are the units to be inserted
-            ``update_index_delta`` is the offset for index updating
-            ``next_index`` is the starting point after which
-            ``update_index_delta`` should be applied.
+            ``next_index`` is the index of the unit to insert before, or
+            ``None`` when inserting at the end of the store.
         """
         inserts = []
         new_unitid_list = self.new_unit_list
         for (tag, i1, i2, j1, j2) in self.opcodes:
-            if tag == 'insert':
-                update_index_delta = 0
-                insert_at = 0
-                if i1 > 0:
-                    insert_at = (
-                        self.target_units[
-                            self.active_target_units[i1 - 1]]['index'])
-                next_index = insert_at + 1
-                if i1 < len(self.active_target_units):
-                    next_index = self.target_units[
-                        self.active_target_units[i1]]["index"]
-                    update_index_delta = (
-                        j2 - j1 - next_index + insert_at + 1)
-
-                inserts.append((insert_at,
-                                new_unitid_list[j1:j2],
-                                next_index,
-                                update_index_delta))
-
-            elif tag == 'replace':
+            if tag not in ['insert', 'replace']:
+                continue
+            insert_at = 0
+            if i1 > 0:
                 insert_at = self.target_units[
-                    self.active_target_units[max(i1 - 1, 0)]]['index']
+                    self.active_target_units[i1 - 1]]['index']
+            next_index = None
+            if i2 < len(self.active_target_units):
                 next_index = self.target_units[
-                    self.active_target_units[i2 - 1]]['index']
-                inserts.append((insert_at,
-                                new_unitid_list[j1:j2],
-                                next_index,
-                                j2 - j1 - insert_at + next_index))
+                    self.active_target_units[i2]]['index']
+            inserts.append((insert_at,
+                            new_unitid_list[j1:j2],
+                            next_index))
         return inserts
 
     @cached_property
@@ -250,7 +453,7 @@ class StoreDiff(object):
         # If source_revision is gte than the target_revision then new unit list
         # will be exactly what is in the file
         if self.source_revision >= self.target_revision:
-            return self.source_units.keys()
+            return list(self.source_units.keys())
 
         # These units are kept as they have been updated since source_revision
         # but do not appear in the file
@@ -259,8 +462,9 @@ class StoreDiff(object):
 
         # These unit are either present in both or only in the file so are
         # kept in the file order
+        obsoleted = set(self.obsoleted_target_units)
         new_units += [u for u in self.source_units.keys()
-                      if u not in self.obsoleted_target_units]
+                      if u not in obsoleted]
 
         return new_units
 
@@ -272,10 +476,9 @@ class StoreDiff(object):
 
     @cached_property
     def opcodes(self):
-        sm = difflib.SequenceMatcher(None,
-                                     self.active_target_units,
-                                     self.new_unit_list)
-        return sm.get_opcodes()
+        return UnitSequenceMatcher(
+            self.active_target_units,
+            self.new_unit_list).get_opcodes()
 
     @cached_property
     def updated_target_units(self):
@@ -296,50 +499,39 @@ class StoreDiff(object):
         return None
 
     def get_indexes_to_update(self):
-        offset = 0
-        index_updates = []
-        for (insert_at_, uids_add_, next_index, delta) in self.insert_points:
-            if delta > 0:
-                index_updates += [(next_index + offset, delta)]
-                offset += delta
-        return index_updates
+        return self.index_plan.index_updates
 
     def get_units_to_add(self):
-        offset = 0
         to_add = []
+        new_indexes = self.index_plan.new_indexes
         proxy = (
             isinstance(self.source_store, models.Model)
             and DBUnit or FileUnit)
 
-        for (insert_at, uids_add, next_index_, delta) in self.insert_points:
-            for index, uid in enumerate(uids_add):
+        for (insert_at_, uids_add, next_index_) in self.insert_points:
+            for uid in uids_add:
                 source_unit = self.source_units.get(uid)
                 if source_unit and uid not in self.target_units:
-                    new_unit_index = insert_at + index + 1 + offset
-                    to_add += [(proxy(source_unit), new_unit_index)]
-            if delta > 0:
-                offset += delta
+                    to_add += [(proxy(source_unit), new_indexes[uid])]
         return to_add
 
     def get_units_to_obsolete(self):
+        active = set(self.active_target_units)
         return [unit['id'] for unitid, unit in self.target_units.items()
                 if ((unitid not in self.source_units
                      or self.source_units[unitid]['state'] == OBSOLETE)
-                    and unitid in self.active_target_units)]
+                    and unitid in active)]
 
     def get_units_to_update(self):
         uid_index_map = {}
-        offset = 0
+        new_indexes = self.index_plan.new_indexes
 
-        for (insert_at, uids_add, next_index_, delta) in self.insert_points:
-            for index, uid in enumerate(uids_add):
-                new_unit_index = insert_at + index + 1 + offset
+        for (insert_at_, uids_add, next_index_) in self.insert_points:
+            for uid in uids_add:
                 if uid in self.target_units:
                     uid_index_map[uid] = {
                         'dbid': self.target_units[uid]['id'],
-                        'index': new_unit_index}
-            if delta > 0:
-                offset += delta
+                        'index': new_indexes[uid]}
         update_ids = self.get_updated_sourceids()
         update_ids.update({x['dbid'] for x in uid_index_map.values()})
         return (update_ids, uid_index_map)
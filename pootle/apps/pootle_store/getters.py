@@ -11,7 +11,8 @@ from django.core.exceptions import ValidationError
 
 from pootle.core.delegate import (
     comparable_event, deserializers, frozen, grouped_events, lifecycle, review,
-    search_backend, serializers, states, uniqueid, versioned, wordcount)
+    search_backend, serializers, states, text_index, tm_updater, uniqueid,
+    versioned, wordcount)
 from pootle.core.plugin import getter
 from pootle_config.delegate import (
     config_should_not_be_appended, config_should_not_be_set)
@@ -19,6 +20,8 @@ from pootle_misc.util import import_func
 
 from .models import Store, Suggestion, SuggestionState, Unit
 from .unit.search import DBSearchBackend
+from .unit.textindex import UnitTrigramIndex
+from .unit.tm import UnitTMQueue
 from .unit.timeline import (
     ComparableUnitTimelineLogEvent, UnitTimelineGroupedEvents, UnitTimelineLog)
 from .utils import (
@@ -60,6 +63,16 @@ def get_search_backend(**kwargs_):
     return DBSearchBackend
 
 
+@getter(text_index, sender=Unit)
+def get_text_index(**kwargs_):
+    return UnitTrigramIndex
+
+
+@getter(tm_updater, sender=Unit)
+def get_tm_updater(**kwargs_):
+    return UnitTMQueue
+
+
 @getter(review, sender=Suggestion)
 def get_suggestions_review(**kwargs_):
     return SuggestionsReview
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pootle_store', '0055_fill_unit_source_data'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnitTrigram',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.PositiveSmallIntegerField()),
+                ('trigram', models.CharField(max_length=3)),
+                ('unit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trigrams', to='pootle_store.Unit')),
+            ],
+            options={
+                'db_table': 'pootle_store_unit_trigram',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='unittrigram',
+            unique_together=set([('trigram', 'field', 'unit')]),
+        ),
+    ]
@@ -14,7 +14,7 @@ from translate.filters.decorators import Category
 
 from django.contrib.auth import get_user_model
 from django.db import models
-from django.db.models import F
+from django.db.models import Case, F, IntegerField, Value, When
 from django.template.defaultfilters import truncatechars
 from django.urls import reverse
 from django.utils.encoding import force_bytes
@@ -23,7 +23,7 @@ from django.utils.http import urlquote
 
 from pootle.core.delegate import (
     data_tool, format_syncers, format_updaters, frozen, states,
-    terminology_matcher, wordcount)
+    terminology_matcher, tm_updater, wordcount)
 from pootle.core.log import STORE_DELETED, STORE_OBSOLETE, store_log
 from pootle.core.models import Revision
 from pootle.core.search import SearchBroker
@@ -42,7 +42,8 @@ from .abstracts import (
     AbstractSuggestionState, AbstractUnit, AbstractUnitChange,
     AbstractUnitSource)
 from .constants import (
-    DEFAULT_PRIORITY, FUZZY, OBSOLETE, POOTLE_WINS, TRANSLATED, UNTRANSLATED)
+    DEFAULT_PRIORITY, FUZZY, OBSOLETE, POOTLE_WINS, TRANSLATED,
+    UNIT_INDEX_GAP, UNTRANSLATED)
 from .managers import SuggestionManager, UnitManager
 from .store.deserialize import StoreDeserialization
 from .store.serialize import StoreSerialization
@@ -169,6 +170,29 @@ class UnitSource(AbstractUnitSource):
         db_table = "pootle_store_unit_source"
 
 
+class UnitTrigram(models.Model):
+    """Trigrams of the normalized text of a Unit's searchable fields, used
+    to narrow text searches to candidate units.
+    """
+
+    class Meta(object):
+        db_table = "pootle_store_unit_trigram"
+        unique_together = ["trigram", "field", "unit"]
+
+    unit = models.ForeignKey(
+        "pootle_store.Unit",
+        on_delete=models.CASCADE,
+        db_index=True,
+        related_name="trigrams")
+    field = models.PositiveSmallIntegerField(
+        null=False,
+        db_index=False)
+    trigram = models.CharField(
+        max_length=3,
+        null=False,
+        db_index=False)
+
+
 class Unit(AbstractUnit):
 
     objects = UnitManager()
@@ -294,6 +318,8 @@ class Unit(AbstractUnit):
             or get_user_model().objects.get_system_user())
         reviewed_by = kwargs.pop("reviewed_by", None) or user
         changed_with = kwargs.pop("changed_with", None) or SubmissionTypes.SYSTEM
+        # active checks changed while saving, see update_qualitychecks
+        self._check_changes = {}
         super(Unit, self).save(*args, **kwargs)
         timestamp = self.mtime
         if created:
@@ -331,7 +357,7 @@ class Unit(AbstractUnit):
                 self.change.reviewed_on = timestamp
             self.change.save()
         update_data.send(
-            self.store.__class__, instance=self.store)
+            self.store.__class__, instance=self.store, unit=self)
 
     def get_absolute_url(self):
         return self.store.get_absolute_url()
@@ -523,8 +549,11 @@ class Unit(AbstractUnit):
         checks = self.qualitycheck_set.all()
 
         existing = {}
-        for check in checks.values('name', 'false_positive', 'id'):
+        check_values = checks.values(
+            'name', 'category', 'false_positive', 'id')
+        for check in check_values:
             existing[check['name']] = {
+                'category': check['category'],
                 'false_positive': check['false_positive'],
                 'id': check['id'],
             }
@@ -533,6 +562,7 @@ class Unit(AbstractUnit):
         if not self.target:
             if existing:
                 self.qualitycheck_set.all().delete()
+                self._add_check_changes(existing.values(), -1)
                 return True
 
             return False
@@ -561,18 +591,40 @@ class Unit(AbstractUnit):
 
         if checks_to_add:
             self.qualitycheck_set.bulk_create(checks_to_add)
+            self._add_check_changes(
+                [dict(name=check.name, category=check.category)
+                 for check in checks_to_add],
+                1)
 
         if not keep_false_positives and unmute_list:
             self.qualitycheck_set.filter(name__in=unmute_list) \
                                  .update(false_positive=False)
+            self._add_check_changes(
+                [dict(name=name, category=qc_failures[name]['category'])
+                 for name in unmute_list],
+                1)
 
         # delete inactive checks
         if existing:
             self.qualitycheck_set.filter(name__in=existing).delete()
+            self._add_check_changes(existing.values(), -1)
 
         changed = result or bool(unmute_list) or bool(existing)
         return changed
 
+    def _add_check_changes(self, checks, count):
+        """Keep count of the active checks added and removed while the unit
+        is saved, so that store data can be updated without recounting
+        """
+        changes = getattr(self, "_check_changes", None)
+        if changes is None:
+            return
+        for check in checks:
+            if check.get("false_positive"):
+                continue
+            key = (check["category"], check["name"])
+            changes[key] = changes.get(key, 0) + count
+
     def get_qualitychecks(self):
         return self.qualitycheck_set.all()
 
@@ -603,34 +655,9 @@ class Unit(AbstractUnit):
 # # # # # # # # # # # TranslationUnit # # # # # # # # # # # # # #
 
     def update_tmserver(self):
-        obj = {
-            'id': self.id,
-            # 'revision' must be an integer for statistical queries to work
-            'revision': self.revision,
-            'project': self.store.translation_project.project.fullname,
-            'path': self.store.pootle_path,
-            'source': self.source,
-            'target': self.target,
-            'username': '',
-            'fullname': '',
-            'email_md5': '',
-        }
-        if self.changed and self.change.submitted_on:
-            obj.update({
-                'iso_submitted_on': self.change.submitted_on.isoformat(),
-                'display_submitted_on': dateformat.format(self.change.submitted_on),
-            })
-
-        if self.changed and self.change.submitted_by:
-            obj.update({
-                'username': self.change.submitted_by.username,
-                'fullname': self.change.submitted_by.full_name,
-                'email_md5': md5(
-                    force_bytes(self.change.submitted_by.email)).hexdigest(),
-            })
-
-        get_tm_broker().update(self.store.translation_project.language.code,
-                               obj)
+        tm_queue = tm_updater.get(self.__class__)()
+        if tm_queue.enabled and not tm_queue.enqueue([self.pk]):
+            tm_queue.index([self.pk])
 
     def get_tm_suggestions(self):
         return get_tm_broker().search(self)
@@ -726,7 +753,7 @@ class Unit(AbstractUnit):
 
         update_checks.send(self.__class__, instance=self,
                            keep_false_positives=True)
-        self.index = self.store.max_index() + 1
+        self.index = self.store.next_index()
 
     def istranslated(self):
         return self.state >= TRANSLATED
@@ -918,9 +945,33 @@ class Store(AbstractStore):
             for unit in units.iterator():
                 yield unit
 
-    def update_index(self, start, delta):
-        Unit.objects.filter(store_id=self.id, index__gte=start).update(
-            index=operator.add(F('index'), delta))
+    def update_index(self, start, delta, end=None):
+        units = Unit.objects.filter(store_id=self.id, index__gte=start)
+        if end is not None:
+            units = units.filter(index__lt=end)
+        units.update(index=operator.add(F('index'), delta))
+
+    def rebalance_indexes(self, chunk_size=1000):
+        """Renumber the live units, leaving a gap of ``UNIT_INDEX_GAP``
+        between consecutive units.
+
+        :return: the number of units that were renumbered
+        """
+        units = self.unit_set.filter(state__gt=OBSOLETE).order_by(
+            "index", "pk").values_list("pk", "index")
+        renumbered = [
+            (pk, (i + 1) * UNIT_INDEX_GAP)
+            for i, (pk, index)
+            in enumerate(units.iterator())
+            if index != (i + 1) * UNIT_INDEX_GAP]
+        for i in range(0, len(renumbered), chunk_size):
+            chunk = renumbered[i:i + chunk_size]
+            Unit.objects.filter(pk__in=[pk for pk, index_ in chunk]).update(
+                index=Case(
+                    *[When(pk=pk, then=Value(index))
+                      for pk, index in chunk],
+                    output_field=IntegerField()))
+        return len(renumbered)
 
     @cached_property
     def data_tool(self):
@@ -976,10 +1027,15 @@ class Store(AbstractStore):
 
         return max_column(self.unit_set.all(), 'index', -1)
 
+    def next_index(self):
+        """Index for a unit added at the end of the store"""
+
+        return max(self.max_index(), 0) + UNIT_INDEX_GAP
+
     def addunit(self, unit, index=None, user=None, update_revision=None,
                 changed_with=None):
         if index is None:
-            index = self.max_index() + 1
+            index = self.next_index()
 
         newunit = self.UnitClass(
             store=self,
@@ -12,7 +12,7 @@ from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
 from django.utils.encoding import force_bytes
 
-from pootle.core.delegate import lifecycle, uniqueid
+from pootle.core.delegate import lifecycle, text_index, uniqueid
 from pootle.core.models import Revision
 from pootle.core.signals import update_checks, update_data
 
@@ -93,12 +93,28 @@ def handle_unit_pre_save(**kwargs):
         unit.revision = Revision.incr()
 
     if unit.index is None:
-        unit.index = unit.store.max_index() + 1
+        unit.index = unit.store.next_index()
     unitid = uniqueid.get(unit.__class__)(unit)
     if unitid.changed:
         unit.setid(unitid.getid())
 
 
+@receiver(post_save, sender=Unit)
+def handle_unit_text_index(**kwargs):
+    index = text_index.get(Unit)
+    if index is None:
+        return
+    update_fields = kwargs.get("update_fields")
+    skip_index = (
+        update_fields
+        and not set(update_fields) & set(index.fields))
+    if skip_index:
+        return
+    index = index()
+    if index.writable:
+        index.update_units([kwargs["instance"]])
+
+
 @receiver(post_save, sender=UnitChange)
 def handle_unit_change(**kwargs):
     unit_change = kwargs["instance"]
@@ -6,17 +6,55 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
+import hashlib
+
+from django.db.models import BigIntegerField, Count, F, Max, Sum
+from django.db.models.functions import Cast
+from django.utils.encoding import force_bytes
 from django.utils.functional import cached_property
 
+from pootle.core.cache import get_cache
 from pootle.core.delegate import config, serializers
 
 
 class StoreSerialization(object):
     """Calls configured deserializers for Store"""
 
+    ns = "pootle.store.serialized"
+
     def __init__(self, store):
         self.store = store
 
+    @property
+    def cache(self):
+        return get_cache("exports")
+
+    @property
+    def units_state(self):
+        """Summary of the store's units, that changes when units are
+        changed, added, removed or reordered
+        """
+        return self.store.unit_set.aggregate(
+            revision=Max("revision"),
+            count=Count("id"),
+            order=Sum(Cast("index", BigIntegerField()) * F("id")))
+
+    def get_cache_key(self, include_obsolete=False, raw=False):
+        units_state = self.units_state
+        key = u":".join(
+            u"%s" % part
+            for part
+            in [self.pootle_path,
+                self.store.filetype_id,
+                self.max_unit_revision,
+                units_state["revision"],
+                units_state["count"],
+                units_state["order"],
+                ",".join(self.project_serializers),
+                include_obsolete,
+                raw])
+        return "%s.%s" % (self.ns, hashlib.md5(force_bytes(key)).hexdigest())
+
     @cached_property
     def project_serializers(self):
         project = self.store.translation_project.project
@@ -65,5 +103,14 @@ class StoreSerialization(object):
         return data
 
     def serialize(self, include_obsolete=False, raw=False):
-        return self.pipeline(
-            self.tostring(include_obsolete=include_obsolete, raw=raw))
+        """Serialize the store, the serialized data is cached until the units
+        or the serializers of the store change
+        """
+        cache_key = self.get_cache_key(
+            include_obsolete=include_obsolete, raw=raw)
+        data = self.cache.get(cache_key)
+        if data is None:
+            data = self.pipeline(
+                self.tostring(include_obsolete=include_obsolete, raw=raw))
+            self.cache.set(cache_key, data)
+        return data
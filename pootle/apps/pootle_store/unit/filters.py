@@ -158,8 +158,9 @@ class UnitTextSearch(object):
         "source": ["source_f"],
         "target": ["target_f"]}
 
-    def __init__(self, qs):
+    def __init__(self, qs, text_index=None):
         self.qs = qs
+        self.text_index = text_index
 
     def get_search_fields(self, sfields):
         search_fields = set()
@@ -185,6 +186,11 @@ class UnitTextSearch(object):
 
     def search_field(self, k, words, exact=False, case=False):
         subresult = self.qs
+        if self.text_index is not None:
+            candidates = self.text_index.filter_candidates(
+                subresult, k, words, case=case)
+            if candidates is not None:
+                subresult = candidates
         contains = (
             "contains"
             if case
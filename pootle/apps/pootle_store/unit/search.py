@@ -6,9 +6,15 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
-from django.db.models import Max
+from hashlib import md5
+
+from django.db.models import Max, Q
+from django.utils.encoding import force_bytes
 from django.utils.functional import cached_property
 
+from pootle.core.cache import get_cache
+from pootle.core.delegate import revision, text_index
+from pootle_app.models import Directory
 from pootle_store.constants import SIMPLY_SORTED
 from pootle_store.models import Unit
 from pootle_store.unit.filters import UnitSearchFilter, UnitTextSearch
@@ -17,7 +23,13 @@ from pootle_store.unit.filters import UnitSearchFilter, UnitTextSearch
 class DBSearchBackend(object):
 
     default_chunk_size = None
-    default_order = "store__pootle_path", "index"
+    default_order = "store__pootle_path", "index", "pk"
+    # cached result counts are keyed to the stats/checks revisions of the
+    # searched directory, the timeout only limits staleness for filters
+    # that are not tracked by revisions (eg modified-since)
+    count_cache_timeout = 300
+    count_cache_ignore = (
+        "count", "offset", "previous_uids", "uids")
     select_related = (
         'store__translation_project__project',
         'store__translation_project__language')
@@ -136,16 +148,138 @@ class DBSearchBackend(object):
                     change__submitted_on__lte=month[1]).distinct()
 
         if sfields and search:
-            qs = UnitTextSearch(qs).search(
+            qs = UnitTextSearch(qs, text_index=self.text_index).search(
                 search, sfields, exact=exact, case=case)
         return qs
 
+    @cached_property
+    def text_index(self):
+        index = text_index.get(Unit)
+        if index is not None:
+            index = index()
+            if index.ready:
+                return index
+
     @cached_property
     def results(self):
         return self.sort_qs(self.filter_qs(self.units_qs))
 
+    @property
+    def keyset_ordered(self):
+        """Whether results are in the default (store pootle_path, index, pk)
+        order, allowing them to be paged with a keyset cursor.
+        """
+        return not (self.unit_filter and self.sort_by is not None)
+
+    @cached_property
+    def count_cache_key(self):
+        pootle_path = self.kwargs.get("path")
+        if not pootle_path:
+            return
+        try:
+            directory = Directory.objects.get(
+                pootle_path=pootle_path[:pootle_path.rfind("/") + 1])
+        except Directory.DoesNotExist:
+            return
+        revisions = revision.get(Directory)(directory)
+        stats_revision = revisions.get(key="stats")
+        if not stats_revision:
+            return
+        return (
+            "pootle.search.count.%s.%s.%s"
+            % (stats_revision,
+               revisions.get(key="checks"),
+               md5(force_bytes(
+                   repr(sorted(self.count_cache_params.items())))).hexdigest()))
+
+    @property
+    def count_cache_params(self):
+        params = {
+            k: v
+            for k, v
+            in self.kwargs.items()
+            if k not in self.count_cache_ignore}
+        params["user"] = getattr(params.get("user"), "pk", None)
+        params["request_user"] = getattr(self.request_user, "pk", None)
+        return params
+
+    @cached_property
+    def total(self):
+        """Total number of results, cached until the stats or checks
+        revision of the searched path changes.
+        """
+        cache_key = self.count_cache_key
+        if cache_key is None:
+            return self.results.count()
+        cache = get_cache("lru")
+        total = cache.get(cache_key)
+        if total is None:
+            total = self.results.count()
+            cache.set(cache_key, total, self.count_cache_timeout)
+        return total
+
+    def get_keyset(self, uids, last=False):
+        """Returns the (store pootle_path, index, pk) of the first or last of
+        the given units, in result order.
+        """
+        order = (
+            ["-%s" % field for field in self.default_order]
+            if last
+            else self.default_order)
+        return (
+            Unit.objects.filter(pk__in=uids)
+                        .order_by(*order)
+                        .values_list(*self.default_order)
+                        .first())
+
+    def filter_keyset_after(self, qs, keyset):
+        pootle_path, index, pk = keyset
+        return qs.filter(
+            Q(store__pootle_path__gt=pootle_path)
+            | Q(store__pootle_path=pootle_path, index__gt=index)
+            | Q(store__pootle_path=pootle_path, index=index, pk__gt=pk))
+
+    def filter_keyset_before(self, qs, keyset):
+        pootle_path, index, pk = keyset
+        return qs.filter(
+            Q(store__pootle_path__lt=pootle_path)
+            | Q(store__pootle_path=pootle_path, index__lt=index)
+            | Q(store__pootle_path=pootle_path, index=index, pk__lt=pk))
+
+    def find_unit_position(self, uid):
+        """Returns the position of a unit in the results, or ``None`` if
+        it is not found.
+        """
+        if not self.keyset_ordered:
+            uid_list = list(self.results.values_list("pk", flat=True))
+            if uid in uid_list:
+                return uid_list.index(uid)
+            return
+        if not self.results.filter(pk=uid).exists():
+            return
+        return self.filter_keyset_before(
+            self.results,
+            self.get_keyset([uid])).count()
+
+    def get_next_slice(self, total, start):
+        """Returns the next chunk of results following the last of
+        ``previous_uids``, using a keyset cursor.
+        """
+        keyset = self.get_keyset(self.previous_uids, last=True)
+        if keyset is None:
+            return
+        uid_list = list(
+            self.filter_keyset_after(self.results, keyset)[
+                :2 * self.chunk_size].values_list("pk", flat=True))
+        start = min(start, total)
+        return (
+            total,
+            start,
+            min(start + len(uid_list), total),
+            uid_list)
+
     def search(self):
-        total = self.results.count()
+        total = self.total
         start = self.offset
 
         if start > (total + len(self.previous_uids)):
@@ -160,6 +294,15 @@ class DBSearchBackend(object):
             self.previous_uids
             and self.offset)
 
+        use_keyset = (
+            not find_unit
+            and find_next_slice
+            and self.chunk_size
+            and self.keyset_ordered)
+        if use_keyset:
+            next_slice = self.get_next_slice(total, start)
+            if next_slice is not None:
+                return next_slice
         if not find_unit and find_next_slice:
             # if both previous_uids and offset are set then try to ensure
             # that the results we are returning start from the end of previous
@@ -179,11 +322,10 @@ class DBSearchBackend(object):
                 start,
                 end,
                 uid_list[offset:offset + (2 * self.chunk_size)])
-        if find_unit:
+        if find_unit and self.chunk_size:
             # find the uid in the Store
-            uid_list = list(self.results.values_list("pk", flat=True))
-            if self.chunk_size and self.uids[0] in uid_list:
-                unit_index = uid_list.index(self.uids[0])
+            unit_index = self.find_unit_position(self.uids[0])
+            if unit_index is not None:
                 start = (
                     int(unit_index / (2 * self.chunk_size))
                     * (2 * self.chunk_size))
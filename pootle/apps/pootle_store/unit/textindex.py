@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import logging
+import unicodedata
+
+from django.db.models import Count
+from django.utils.encoding import force_text
+
+from pootle_config.utils import SiteConfig
+from pootle_store.models import Unit, UnitTrigram
+
+
+logger = logging.getLogger(__name__)
+
+
+class UnitTextIndex(object):
+    """Base class for text indexes used to narrow Unit text searches.
+
+    An index only ever needs to return a superset of the matching units, as
+    the search filters are still applied to the candidates.
+    """
+
+    fields = (
+        "source_f", "target_f", "locations",
+        "translator_comment", "developer_comment")
+
+    @property
+    def ready(self):
+        """Whether the index can be used for searching"""
+        return False
+
+    @property
+    def writable(self):
+        """Whether the index should be updated when units change"""
+        return False
+
+    def filter_candidates(self, qs, field, words, case=False):
+        """Narrow ``qs`` to units that may contain all of ``words`` in
+        ``field``, returns ``None`` if the index can not be used.
+        """
+        return None
+
+    def update_units(self, units):
+        pass
+
+    def rebuild(self, units):
+        pass
+
+
+class UnitTrigramIndex(UnitTextIndex):
+    """Inverted index of the trigrams in each searchable Unit field.
+
+    Text is lower-cased and stripped of accents before being split into
+    trigrams, so that candidates are a superset of the case- and accent-
+    insensitive matches of the database.
+
+    Only the trigrams of the units being searched are looked up. If the
+    searched trigrams are too common, matching more than ``max_rows`` rows,
+    the index is not used.
+    """
+
+    config_key = "pootle.search.text_index"
+    chunk_size = 2000
+    max_rows = 20000
+    min_length = 3
+
+    @property
+    def state(self):
+        return SiteConfig().get(self.config_key)
+
+    @property
+    def ready(self):
+        return self.state == "ready"
+
+    @property
+    def writable(self):
+        return self.state in ["building", "ready"]
+
+    def set_state(self, state):
+        SiteConfig()[self.config_key] = state
+
+    def normalize(self, text):
+        text = unicodedata.normalize("NFKD", force_text(text or ""))
+        return u"".join(
+            c for c
+            in text
+            if not unicodedata.combining(c)).lower()
+
+    def get_trigrams(self, text):
+        text = self.normalize(text)
+        return set(
+            text[i:i + self.min_length]
+            for i
+            in range(len(text) - self.min_length + 1))
+
+    def get_field_text(self, field, value):
+        return Unit._meta.get_field(field).get_prep_value(value)
+
+    def get_unit_trigrams(self, unit_id, values):
+        for i, field in enumerate(self.fields):
+            trigrams = self.get_trigrams(
+                self.get_field_text(field, values[field]))
+            for trigram in trigrams:
+                yield UnitTrigram(
+                    unit_id=unit_id,
+                    field=i,
+                    trigram=trigram)
+
+    def filter_candidates(self, qs, field, words, case=False):
+        if field not in self.fields:
+            return
+        trigrams = set()
+        for word in words:
+            trigrams |= self.get_trigrams(word)
+        if not trigrams:
+            # search words are too short to use the index
+            return
+        rows = UnitTrigram.objects.filter(
+            unit_id__in=qs.order_by().values("pk"),
+            field=self.fields.index(field),
+            trigram__in=trigrams).order_by()
+        if rows[:self.max_rows].count() == self.max_rows:
+            # the trigrams are too common to narrow the search
+            return
+        candidates = (
+            rows.values("unit_id")
+                .annotate(matched=Count("trigram"))
+                .filter(matched=len(trigrams))
+                .values("unit_id"))
+        return qs.filter(pk__in=candidates)
+
+    def update_units(self, units):
+        units = list(units)
+        UnitTrigram.objects.filter(
+            unit_id__in=[unit.pk for unit in units]).delete()
+        UnitTrigram.objects.bulk_create(
+            trigram
+            for unit in units
+            for trigram in self.get_unit_trigrams(
+                unit.pk,
+                {field: getattr(unit, field) for field in self.fields}))
+
+    def rebuild(self, units):
+        """Rebuild the index for a qs of units, in chunks"""
+        unit_ids = list(units.order_by("pk").values_list("pk", flat=True))
+        for i in range(0, len(unit_ids), self.chunk_size):
+            chunk = unit_ids[i:i + self.chunk_size]
+            UnitTrigram.objects.filter(unit_id__in=chunk).delete()
+            UnitTrigram.objects.bulk_create(
+                trigram
+                for values
+                in Unit.objects.filter(pk__in=chunk).values(
+                    "pk", *self.fields).iterator()
+                for trigram
+                in self.get_unit_trigrams(values["pk"], values))
+        logger.debug(
+            "[text_index] Indexed %s units",
+            len(unit_ids))
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import logging
+from collections import defaultdict
+from hashlib import md5
+
+from django.db import transaction
+from django.utils import dateparse
+from django.utils.encoding import force_bytes
+
+from django_redis import get_redis_connection
+from django_rq.queues import get_queue
+
+from pootle.core.delegate import tm_updater
+from pootle.core.utils import dateformat
+from pootle_store.models import Unit, get_tm_broker
+
+
+logger = logging.getLogger(__name__)
+
+
+TM_UNIT_FIELDS = (
+    'id',
+    'revision',
+    'source_f',
+    'target_f',
+    'change__submitted_on',
+    'change__submitted_by__username',
+    'change__submitted_by__full_name',
+    'change__submitted_by__email',
+    'store__translation_project__project__fullname',
+    'store__pootle_path',
+    'store__translation_project__language__code')
+
+
+def get_tm_unit_data(unit):
+    """Return the TM document for a dict of ``TM_UNIT_FIELDS`` values of a
+    unit.
+    """
+    fullname = (unit['change__submitted_by__full_name'] or
+                unit['change__submitted_by__username'])
+
+    email_md5 = None
+    if unit['change__submitted_by__email']:
+        email_md5 = md5(
+            force_bytes(unit['change__submitted_by__email'])).hexdigest()
+
+    iso_submitted_on = unit.get('change__submitted_on', None)
+
+    display_submitted_on = None
+    if iso_submitted_on:
+        display_submitted_on = dateformat.format(
+            dateparse.parse_datetime(str(iso_submitted_on))
+        )
+
+    return {
+        'id': unit['id'],
+        'revision': int(unit['revision']),
+        'project': unit['store__translation_project__project__fullname'],
+        'path': unit['store__pootle_path'],
+        'username': unit['change__submitted_by__username'],
+        'fullname': fullname,
+        'email_md5': email_md5,
+        'source': unit['source_f'],
+        'target': unit['target_f'],
+        'iso_submitted_on': iso_submitted_on,
+        'display_submitted_on': display_submitted_on,
+    }
+
+
+def flush_tm_queue():
+    tm_updater.get(Unit)().flush()
+
+
+class UnitTMQueue(object):
+    """Queue of units to be indexed in the TM servers, in batches.
+
+    Unit ids are pushed to a redis list and a job is queued with rq to index
+    them with bulk requests. Only one flush job is scheduled at a time, if a
+    job is lost the schedule expires after ``flush_timeout`` seconds.
+
+    If the queue grows to ``max_size`` units, ``enqueue`` refuses more units
+    and the caller is expected to index them itself. Batches that fail to
+    index are moved to a failed list, and can be retried with
+    ``retry_failed``.
+    """
+
+    ns = "pootle:tm:queue"
+    batch_size = 500
+    max_size = 10000
+    flush_timeout = 300
+
+    def __init__(self, broker=None):
+        self.broker = broker or get_tm_broker()
+
+    @property
+    def connection(self):
+        return get_redis_connection('redis')
+
+    @property
+    def queue_key(self):
+        return "%s.units" % self.ns
+
+    @property
+    def failed_key(self):
+        return "%s.failed" % self.ns
+
+    @property
+    def flush_key(self):
+        return "%s.flush" % self.ns
+
+    @property
+    def enabled(self):
+        return bool(self.broker.updatable_servers)
+
+    def __len__(self):
+        return self.connection.llen(self.queue_key)
+
+    def enqueue(self, unit_ids):
+        """Queue units to be indexed once the current transaction commits.
+
+        :return: ``False`` if the queue is full and the units should be
+            indexed by the caller.
+        """
+        unit_ids = list(unit_ids)
+        if not unit_ids:
+            return True
+        if len(self) >= self.max_size:
+            logger.warning(
+                "[tm] Queue is full, indexing %s units directly",
+                len(unit_ids))
+            return False
+        transaction.on_commit(lambda: self.push(unit_ids))
+        return True
+
+    def push(self, unit_ids):
+        self.connection.rpush(self.queue_key, *unit_ids)
+        self.schedule()
+
+    def schedule(self):
+        scheduled = self.connection.set(
+            self.flush_key, 1, nx=True, ex=self.flush_timeout)
+        if scheduled:
+            get_queue('default').enqueue(flush_tm_queue)
+
+    def pop(self):
+        pipe = self.connection.pipeline()
+        pipe.lrange(self.queue_key, 0, self.batch_size - 1)
+        pipe.ltrim(self.queue_key, self.batch_size, -1)
+        return sorted(set(int(pk) for pk in pipe.execute()[0]))
+
+    def get_documents(self, unit_ids):
+        units = (
+            Unit.objects.filter(pk__in=unit_ids)
+                        .exclude(target_f__isnull=True)
+                        .exclude(target_f__exact='')
+                        .values(*TM_UNIT_FIELDS)
+                        .order_by())
+        documents = defaultdict(list)
+        for unit in units.iterator():
+            language = unit['store__translation_project__language__code']
+            documents[language].append(get_tm_unit_data(unit))
+        return documents
+
+    def index(self, unit_ids):
+        """Index units with one bulk request per language and server.
+
+        :return: ``True`` if all of the units were indexed.
+        """
+        indexed = True
+        for language, documents in self.get_documents(unit_ids).items():
+            indexed = (
+                self.broker.bulk_update(language, documents)
+                and indexed)
+        return indexed
+
+    def flush(self):
+        """Index the queued units in batches until the queue is empty"""
+        total = 0
+        while True:
+            unit_ids = self.pop()
+            if not unit_ids:
+                break
+            if not self.index(unit_ids):
+                logger.error(
+                    "[tm] Failed to index %s units, moving them to %s",
+                    len(unit_ids),
+                    self.failed_key)
+                self.connection.rpush(self.failed_key, *unit_ids)
+            total += len(unit_ids)
+        self.connection.delete(self.flush_key)
+        # units pushed while the last batch was being indexed
+        if len(self):
+            self.schedule()
+        logger.debug("[tm] Indexed %s queued units", total)
+        return total
+
+    def retry_failed(self):
+        """Move units that failed to index back to the queue"""
+        pipe = self.connection.pipeline()
+        pipe.lrange(self.failed_key, 0, -1)
+        pipe.delete(self.failed_key)
+        unit_ids = pipe.execute()[0]
+        if unit_ids:
+            self.push(unit_ids)
+        return len(unit_ids)
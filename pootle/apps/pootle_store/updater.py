@@ -9,15 +9,19 @@
 import logging
 
 from django.contrib.auth import get_user_model
+from django.db.models.signals import pre_save
 from django.utils.functional import cached_property
 
-from pootle.core.delegate import frozen, review, versioned
-from pootle.core.models import Revision
+from pootle.core.delegate import (
+    frozen, review, text_index, tm_updater, versioned)
+from pootle.core.models import Revision, revision_block
+from pootle.core.signals import update_checks, update_data
+from pootle_statistics.models import SubmissionTypes
 from pootle_store.contextmanagers import update_store_after
 
-from .constants import OBSOLETE, PARSED, POOTLE_WINS
+from .constants import OBSOLETE, PARSED, POOTLE_WINS, UNTRANSLATED
 from .diff import StoreDiff
-from .models import Suggestion
+from .models import Suggestion, UnitChange, UnitSource
 from .util import get_change_str
 
 
@@ -293,10 +297,148 @@ class UnitUpdater(object):
 class StoreUpdater(object):
 
     unit_updater_class = UnitUpdater
+    # add units with bulk_create when adding at least this many
+    bulk_add_threshold = 100
+    bulk_add_chunk_size = 1000
 
     def __init__(self, target_store):
         self.target_store = target_store
 
+    @property
+    def can_bulk_add(self):
+        # terminology units are stemmed as they are saved
+        return (
+            self.target_store.id
+            and not self.target_store.name.startswith("pootle-terminology")
+            and (self.target_store.translation_project.project.code
+                 != "terminology"))
+
+    def add_units(self, to_add, user, submission_type, update_revision):
+        if len(to_add) < self.bulk_add_threshold or not self.can_bulk_add:
+            for unit, new_unit_index in to_add:
+                self.target_store.addunit(
+                    unit,
+                    new_unit_index,
+                    user=user,
+                    changed_with=submission_type,
+                    update_revision=update_revision)
+            return
+        for i in range(0, len(to_add), self.bulk_add_chunk_size):
+            self.bulk_add_units(
+                to_add[i:i + self.bulk_add_chunk_size],
+                user,
+                submission_type or SubmissionTypes.SYSTEM,
+                update_revision)
+        update_data.send(
+            self.target_store.__class__,
+            instance=self.target_store)
+
+    def build_unit(self, unit, index, user, update_revision):
+        """Creates an unsaved Unit as `Store.addunit` would, and runs the
+        Unit pre_save handlers for it.
+        """
+        newunit = self.target_store.UnitClass(
+            store=self.target_store,
+            index=index)
+        newunit.update(unit, user=user)
+        newunit.revision = update_revision
+        pre_save.send(
+            sender=newunit.__class__,
+            instance=newunit,
+            raw=False,
+            using=newunit.__class__.objects.db,
+            update_fields=None)
+        return newunit
+
+    def build_unit_source(self, unit, user, changed_with):
+        unit_source = UnitSource(
+            unit=unit,
+            created_by=user,
+            created_with=changed_with)
+        pre_save.send(
+            sender=UnitSource,
+            instance=unit_source,
+            raw=False,
+            using=UnitSource.objects.db,
+            update_fields=None)
+        return unit_source
+
+    def build_unit_change(self, unit, user, changed_with):
+        """Creates an unsaved UnitChange for a new Unit as `Unit.save`
+        would
+        """
+        change = UnitChange(unit=unit, changed_with=changed_with)
+        timestamp = unit.creation_time
+        if unit.comment_updated:
+            change.commented_by = user
+            change.commented_on = timestamp
+        change.submitted_by = user
+        change.submitted_on = timestamp
+        is_review = (
+            (unit.state_updated and not unit.target_updated)
+            or (unit.state_updated
+                and unit.state == UNTRANSLATED))
+        if is_review:
+            change.reviewed_by = user
+            change.reviewed_on = timestamp
+        return change
+
+    def set_unit_ids(self, units):
+        """Set ids of bulk created units on backends that dont return them"""
+        missing = {
+            unit.unitid_hash: unit
+            for unit
+            in units
+            if unit.pk is None}
+        if not missing:
+            return
+        created = self.target_store.unit_set.filter(
+            unitid_hash__in=missing.keys()).values_list("unitid_hash", "id")
+        for unitid_hash, unit_id in created:
+            missing[unitid_hash].pk = unit_id
+
+    def bulk_add_units(self, to_add, user, changed_with, update_revision):
+        """Add units with bulk_create, creating the same Unit, UnitSource and
+        UnitChange rows as `Store.addunit`.
+        """
+        newunits = [
+            self.build_unit(unit, index, user, update_revision)
+            for unit, index
+            in to_add]
+        unit_model = self.target_store.UnitClass
+        unit_model.objects.bulk_create(newunits)
+        self.set_unit_ids(newunits)
+        sources = []
+        changed = []
+        for newunit in newunits:
+            newunit._state.adding = False
+            newunit._state.db = unit_model.objects.db
+            sources.append(
+                self.build_unit_source(newunit, user, changed_with))
+            if newunit.updated:
+                newunit.change = self.build_unit_change(
+                    newunit, user, changed_with)
+                changed.append(newunit)
+        UnitSource.objects.bulk_create(sources)
+        UnitChange.objects.bulk_create(
+            newunit.change for newunit in changed)
+        translated = []
+        for newunit in changed:
+            if not (newunit.source_updated or newunit.target_updated):
+                continue
+            if newunit.state != UNTRANSLATED:
+                update_checks.send(newunit.__class__, instance=newunit)
+            if newunit.istranslated():
+                translated.append(newunit.pk)
+        tm_queue = tm_updater.get(unit_model)()
+        if tm_queue.enabled and not tm_queue.enqueue(translated):
+            tm_queue.index(translated)
+        index = text_index.get(unit_model)
+        if index is not None:
+            index = index()
+            if index.writable:
+                index.update_units(newunits)
+
     def increment_unsynced_unit_revision(self, store_revision, update_revision):
         filter_by = {
             'revision__gt': store_revision or 0,
@@ -314,7 +456,7 @@ class StoreUpdater(object):
             yield unit
 
     def update(self, *args, **kwargs):
-        with update_store_after(self.target_store):
+        with update_store_after(self.target_store), revision_block():
             return self._update(*args, **kwargs)
 
     def _update(self, store, user=None, store_revision=None,
@@ -404,17 +546,16 @@ class StoreUpdater(object):
 
         if allow_add_and_obsolete:
             # Update indexes
-            for start, delta in to_change["index"]:
-                self.target_store.update_index(start=start, delta=delta)
+            for start, end, delta in to_change["index"]:
+                self.target_store.update_index(
+                    start=start, delta=delta, end=end)
 
             # Add new units
-            for unit, new_unit_index in to_change["add"]:
-                self.target_store.addunit(
-                    unit,
-                    new_unit_index,
-                    user=user,
-                    changed_with=submission_type,
-                    update_revision=update_revision)
+            self.add_units(
+                to_change["add"],
+                user,
+                submission_type,
+                update_revision)
             changes["added"] = len(to_change["add"])
 
             # Obsolete units
@@ -1,17 +1,93 @@
+import logging
+import zlib
+from bisect import bisect_left, insort
 
+from django.db.models import Max
+
+from pootle.core.cache import get_cache
 from pootle.core.proxy import BaseProxy
 from pootle_statistics.models import Submission, SubmissionFields
 
+from .store.deserialize import StoreDeserialization
+
+
+logger = logging.getLogger(__name__)
+
 
 class StoreVersion(BaseProxy):
     pass
 
 
+class StoreSnapshots(object):
+    """Compressed snapshots of the state of a store at given revisions.
+
+    Snapshots are history, so they dont need to be invalidated when the store
+    changes. Only the ``max_snapshots`` latest revisions are kept.
+    """
+
+    ns = "pootle.store.snapshots"
+    max_snapshots = 5
+
+    def __init__(self, store):
+        self.store = store
+
+    @property
+    def cache(self):
+        return get_cache("lru")
+
+    @property
+    def cache_key(self):
+        return "%s.%s" % (self.ns, self.store.pk)
+
+    def get_snapshot_key(self, revision):
+        return "%s.%s" % (self.cache_key, revision)
+
+    @property
+    def revisions(self):
+        return self.cache.get(self.cache_key) or []
+
+    def nearest(self, revision):
+        """Returns the lowest snapshot revision that is not lower than
+        ``revision``, or ``None``
+        """
+        revisions = self.revisions
+        i = bisect_left(revisions, revision)
+        if i < len(revisions):
+            return revisions[i]
+
+    def get(self, revision):
+        data = self.cache.get(self.get_snapshot_key(revision))
+        if data is not None:
+            return zlib.decompress(data)
+
+    def add(self, revision, data):
+        revisions = self.revisions
+        if revision in revisions:
+            return
+        insort(revisions, revision)
+        self.cache.set(
+            self.get_snapshot_key(revision),
+            zlib.compress(data))
+        for evicted in revisions[:-self.max_snapshots]:
+            self.cache.delete(self.get_snapshot_key(evicted))
+        self.cache.set(self.cache_key, revisions[-self.max_snapshots:])
+
+    def clear(self):
+        for revision in self.revisions:
+            self.cache.delete(self.get_snapshot_key(revision))
+        self.cache.delete(self.cache_key)
+
+
 class VersionedStore(object):
     version_class = StoreVersion
+    snapshots_class = StoreSnapshots
+    # snapshot the current store if the latest snapshot is more than this
+    # number of revisions behind it
+    snapshot_interval = 100
 
     def __init__(self, store):
         self.store = store
+        self.snapshots = self.snapshots_class(store)
 
     @property
     def current_store(self):
@@ -21,6 +97,11 @@ class VersionedStore(object):
                     include_obsolete=True,
                     raw=True)))
 
+    @property
+    def current_revision(self):
+        return self.store.unit_set.aggregate(
+            revision=Max("revision"))["revision"] or 0
+
     def _revert_state(self, unit, sub):
         if sub.old_value == "50":
             unit.markfuzzy()
@@ -32,32 +113,82 @@ class VersionedStore(object):
             if sub.new_value == "-100":
                 unit.resurrect()
 
-    def at_revision(self, revision):
+    def load_snapshot(self, revision):
+        data = self.snapshots.get(revision)
+        if data is not None:
+            return StoreVersion(
+                StoreDeserialization(self.store).fromstring(data))
+
+    def save_snapshot(self, revision, store):
+        self.snapshots.add(revision, str(store))
+
+    def get_base_store(self, revision):
+        """Returns ``(base_revision, store)`` for the nearest known state of
+        the store at or after ``revision``.
+        """
+        snapshot_revision = self.snapshots.nearest(revision)
+        if snapshot_revision is not None:
+            store = self.load_snapshot(snapshot_revision)
+            if store is not None:
+                return snapshot_revision, store
+        # the revision is read before serializing, and the current store is
+        # only snapshotted if no units were saved while it was serialized
+        current_revision = self.current_revision
         store = self.current_store
+        latest = self.snapshots.revisions[-1:]
+        snapshot_current = (
+            not latest
+            or current_revision - latest[0] >= self.snapshot_interval)
+        if snapshot_current and self.current_revision == current_revision:
+            self.save_snapshot(current_revision, store)
+        return None, store
+
+    def at_revision(self, revision):
+        """Returns the store as it was at ``revision``.
+
+        Reconstruction starts from the nearest snapshot taken at or after
+        ``revision`` if there is one, and otherwise from the current store.
+        Submissions made since ``revision`` are then reverted.
+        """
+        base_revision, store = self.get_base_store(revision)
+        if base_revision == revision:
+            return store
         subs = Submission.objects.filter(
             unit__store=self.store).filter(
                 revision__gt=revision).order_by(
                     "revision", "creation_time")
-        checking = dict(target=[], state=[])
         unit_creation = self.store.unit_set.filter(
-            unit_source__creation_revision__gt=revision).values_list(
-                "unitid", flat=True)
-        for unit in unit_creation:
-            del store.units[store.units.index(store.findid(unit))]
-            del store.id_index[unit]
+            unit_source__creation_revision__gt=revision)
+        if base_revision is not None:
+            subs = subs.filter(revision__lte=base_revision)
+            unit_creation = unit_creation.filter(
+                unit_source__creation_revision__lte=base_revision)
+        checking = dict(target=set(), state=set())
+        for unitid in unit_creation.values_list("unitid", flat=True):
+            unit = store.findid(unitid)
+            if unit is None:
+                continue
+            del store.units[store.units.index(unit)]
+            del store.id_index[unitid]
 
-        for sub in subs.iterator():
+        for sub in subs.select_related("unit").iterator():
             unit = store.findid(sub.unit.getid())
             if not unit:
                 continue
             if sub.field == SubmissionFields.TARGET:
                 if sub.unit.pk in checking["target"]:
                     continue
-                checking["target"].append(sub.unit.pk)
+                checking["target"].add(sub.unit.pk)
                 unit.target = sub.old_value
             if sub.field == SubmissionFields.STATE:
                 if sub.unit.pk in checking["state"]:
                     continue
-                checking["state"].append(sub.unit.pk)
+                checking["state"].add(sub.unit.pk)
                 self._revert_state(unit, sub)
+        self.save_snapshot(revision, store)
+        logger.debug(
+            "[versioned] Reconstructed %s at revision %s from revision %s",
+            self.store.pootle_path,
+            revision,
+            base_revision if base_revision is not None else "current")
         return store
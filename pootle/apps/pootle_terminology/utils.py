@@ -6,6 +6,8 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
+from collections import namedtuple
+
 from django.utils.functional import cached_property
 
 from pootle.core.decorators import persistent_property
@@ -87,12 +89,26 @@ class UnitTerminology(TextStemmer):
             self.associate_stems(stems - existing_stems)
 
 
-class UnitTerminologyMatcher(TextStemmer):
+IndexedTerm = namedtuple("IndexedTerm", "text target tokens stems")
 
-    ns = "pootle.terminology.matcher"
+
+class TerminologyIndex(object):
+    """Index of the stems of translated terminology units for a language.
+
+    Term sources are tokenised and stemmed when the index is built, and the
+    index is rebuilt when the terminology TP's stats revision changes.
+
+    Each process keeps the last index it loaded for a language, so that it
+    is only unpickled again when the revision changes.
+    """
+
+    ns = "pootle.terminology.index"
     sw_version = PootleTerminologyConfig.version
-    similarity_threshold = .2
-    max_matches = 10
+    # language_id: (cache_key, index)
+    loaded = {}
+
+    def __init__(self, language_id):
+        self.language_id = language_id
 
     @property
     def revision_context(self):
@@ -110,6 +126,80 @@ class UnitTerminologyMatcher(TextStemmer):
             if rev_context
             else "")
 
+    @property
+    def cache_key(self):
+        return "%s.%s" % (self.language_id, self.rev_cache_key)
+
+    @property
+    def terminology_units(self):
+        return Unit.objects.filter(
+            state=TRANSLATED,
+            store__translation_project__project__code="terminology",
+            store__translation_project__language_id=self.language_id)
+
+    @property
+    def index(self):
+        """Returns a tuple of ``stem: [unit ids]`` and
+        ``unit id: (text, target, tokens, stems)``
+        """
+        cache_key = self.cache_key
+        loaded = self.loaded.get(self.language_id)
+        if loaded is not None and loaded[0] == cache_key:
+            return loaded[1]
+        index = self.stored_index
+        self.loaded[self.language_id] = (cache_key, index)
+        return index
+
+    @persistent_property
+    def stored_index(self):
+        stems = {}
+        stemmed = self.terminology_units.filter(
+            stems__isnull=False).values_list("id", "stems__root")
+        for unit_id, root in stemmed.iterator():
+            stems.setdefault(root, []).append(unit_id)
+        comparison = text_comparison.get()
+        terms = {}
+        units = self.terminology_units.filter(
+            id__in=set(unit_id for ids in stems.values() for unit_id in ids))
+        for unit_id, source, target in units.values_list(
+                "id", "source_f", "target_f").iterator():
+            term = comparison(source)
+            terms[unit_id] = (source, target, term.tokens, term.stems)
+        return stems, terms
+
+    def get_candidates(self, stems):
+        """Returns ``(unit_id, IndexedTerm)`` for units with any of
+        ``stems``
+        """
+        index_stems, terms = self.index
+        unit_ids = set()
+        for stem in stems:
+            unit_ids.update(index_stems.get(stem, []))
+        return [
+            (unit_id, IndexedTerm(*terms[unit_id]))
+            for unit_id
+            in sorted(unit_ids)]
+
+
+class UnitTerminologyMatcher(TextStemmer):
+
+    ns = "pootle.terminology.matcher"
+    sw_version = PootleTerminologyConfig.version
+    similarity_threshold = .2
+    max_matches = 10
+
+    @cached_property
+    def terminology_index(self):
+        return TerminologyIndex(self.language_id)
+
+    @property
+    def revision_context(self):
+        return self.terminology_index.revision_context
+
+    @property
+    def rev_cache_key(self):
+        return self.terminology_index.rev_cache_key
+
     @property
     def cache_key(self):
         return (
@@ -124,10 +214,7 @@ class UnitTerminologyMatcher(TextStemmer):
 
     @property
     def terminology_units(self):
-        return Unit.objects.filter(
-            state=TRANSLATED,
-            store__translation_project__project__code="terminology",
-            store__translation_project__language_id=self.language_id)
+        return self.terminology_index.terminology_units
 
     @cached_property
     def comparison(self):
@@ -136,20 +223,44 @@ class UnitTerminologyMatcher(TextStemmer):
     def similar(self, results):
         matches = []
         matched = []
-        for result in results:
+        results = list(results)
+        similarities = self.comparison.similarity_many(
+            result.source_f for result in results)
+        for result, similarity in zip(results, similarities):
             target_pair = (
                 result.source_f.lower().strip(),
                 result.target_f.lower().strip())
             if target_pair in matched:
                 continue
-            similarity = self.comparison.similarity(result.source_f)
             if similarity > self.similarity_threshold:
                 matches.append((similarity, result))
                 matched.append(target_pair)
         return sorted(matches, key=lambda x: -x[0])[:self.max_matches]
 
+    def similar_terms(self, terms):
+        """Returns sorted ``(similarity, unit_id)`` for indexed terms"""
+        matches = []
+        matched = []
+        for unit_id, term in terms:
+            target_pair = (
+                term.text.lower().strip(),
+                term.target.lower().strip())
+            if target_pair in matched:
+                continue
+            similarity = self.comparison.compare(term)
+            if similarity > self.similarity_threshold:
+                matches.append((similarity, unit_id))
+                matched.append(target_pair)
+        return sorted(matches, key=lambda x: -x[0])[:self.max_matches]
+
     @persistent_property
     def matches(self):
-        return self.similar(
-            self.terminology_units.filter(
-                stems__root__in=self.stems).distinct())
+        matches = self.similar_terms(
+            self.terminology_index.get_candidates(self.stems))
+        units = self.terminology_units.in_bulk(
+            [unit_id for similarity_, unit_id in matches])
+        return [
+            (similarity, units[unit_id])
+            for similarity, unit_id
+            in matches
+            if unit_id in units]
@@ -9,7 +9,7 @@
 from django.contrib.auth import get_user_model
 
 from pootle.core.contextmanagers import keep_data
-from pootle.core.models import Revision
+from pootle.core.models import Revision, revision_block
 from pootle.core.paths import Paths
 from pootle.core.signals import create, update_checks
 from pootle_statistics.models import SubmissionTypes
@@ -269,13 +269,14 @@ class TPTool(object):
         if diff is None:
             return
         system = User.objects.get_system_user()
-        update_revision = Revision.incr()
-        return target.updater.update_from_diff(
-            source,
-            source_revision,
-            diff,
-            update_revision,
-            system,
-            SubmissionTypes.SYSTEM,
-            SOURCE_WINS,
-            True)
+        with revision_block():
+            update_revision = Revision.incr()
+            return target.updater.update_from_diff(
+                source,
+                source_revision,
+                diff,
+                update_revision,
+                system,
+                SubmissionTypes.SYSTEM,
+                SOURCE_WINS,
+                True)
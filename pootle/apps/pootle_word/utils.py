@@ -8,10 +8,13 @@
 
 import os
 import re
+import threading
+from collections import OrderedDict
 
 import Levenshtein
 import translate
 
+from django.utils.encoding import force_text
 from django.utils.functional import cached_property
 
 from pootle.core.delegate import stemmer, stopwords
@@ -36,6 +39,41 @@ class Stopwords(object):
         return words
 
 
+class TextAnalysisCache(object):
+    """Bounded LRU cache of the tokens and stems of texts, shared by all
+    TextStemmers.
+    """
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, func):
+        with self.lock:
+            if key in self.data:
+                self.hits += 1
+                value = self.data[key] = self.data.pop(key)
+                return value
+        value = func()
+        with self.lock:
+            self.misses += 1
+            self.data[key] = value
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+            self.hits = self.misses = 0
+
+
+text_analysis_cache = TextAnalysisCache()
+
+
 class TextStemmer(object):
 
     def __init__(self, context):
@@ -49,13 +87,26 @@ class TextStemmer(object):
         return stopwords.get().words
 
     @property
-    def tokens(self):
-        return [
+    def analysis(self):
+        """Returns a tuple of the tokens and a frozenset of the stems of the
+        text, cached by stemmer and text.
+        """
+        return text_analysis_cache.get(
+            (self.stemmer, force_text(self.text)),
+            self.analyse)
+
+    def analyse(self):
+        tokens = tuple(
             t.lower()
             for t
             in self.split(self.text)
             if (len(t) > 2
-                and t.lower() not in self.stopwords)]
+                and t.lower() not in self.stopwords))
+        return tokens, frozenset(self.get_stems(tokens))
+
+    @property
+    def tokens(self):
+        return list(self.analysis[0])
 
     @property
     def text(self):
@@ -67,7 +118,7 @@ class TextStemmer(object):
 
     @property
     def stems(self):
-        return self.get_stems(self.tokens)
+        return self.analysis[1]
 
     def get_stems(self, tokens):
         return set(self.stemmer(t) for t in tokens)
@@ -79,28 +130,58 @@ class TextComparison(TextStemmer):
     def text(self):
         return self.context
 
+    @property
+    def token_set(self):
+        return frozenset(self.analysis[0])
+
     def jaccard_similarity(self, other):
+        union = self.stems.union(other.stems)
+        if not union:
+            return 0
         return (
-            len(other.stems.intersection(self.stems))
-            / float(len(set(other.stems).union(self.stems))))
+            len(self.stems.intersection(other.stems))
+            / float(len(union)))
 
     def levenshtein_distance(self, other):
-        return (
-            Levenshtein.distance(self.text, other.text)
-            / max(len(self.text), len(other.text)))
+        length = max(len(self.text), len(other.text))
+        if not length:
+            return 0
+        return Levenshtein.distance(self.text, other.text) / length
 
     def tokens_present(self, other):
+        if not other.tokens:
+            return 0
         return (
-            len(set(self.tokens).intersection(other.tokens))
+            len(self.token_set.intersection(other.tokens))
             / float(len(other.tokens)))
 
     def stems_present(self, other):
+        if not other.stems:
+            return 0
         return (
-            len(set(self.stems).intersection(other.stems))
+            len(self.stems.intersection(other.stems))
             / float(len(other.stems)))
 
     def similarity(self, other):
-        other = self.__class__(other)
+        return self.compare(self.__class__(other))
+
+    def similarity_many(self, candidates):
+        """Returns the similarity to each text in ``candidates``, comparing
+        identical texts only once.
+        """
+        similarities = {}
+        results = []
+        for candidate in candidates:
+            key = force_text(candidate)
+            if key not in similarities:
+                similarities[key] = self.similarity(candidate)
+            results.append(similarities[key])
+        return results
+
+    def compare(self, other):
+        """Similarity to another comparison, or any object with ``text``,
+        ``tokens`` and ``stems``
+        """
         return (
             (self.jaccard_similarity(other)
              + self.levenshtein_distance(other)
@@ -19,3 +19,9 @@ class VFolderDBSearchBackend(DBSearchBackend):
     def filter_qs(self, qs):
         filtered = super(VFolderDBSearchBackend, self).filter_qs(qs)
         return filtered.filter(store__vfolders=self.vfolder)
+
+    @property
+    def count_cache_params(self):
+        params = super(VFolderDBSearchBackend, self).count_cache_params
+        params["vfolder"] = self.vfolder.pk
+        return params
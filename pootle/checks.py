@@ -294,7 +294,12 @@ def check_settings(app_configs=None, **kwargs):
                     id="pootle.C010",
                 ))
 
-            if 'HOST' not in settings.POOTLE_TM_SERVER[server]:
+            # the local TM backend doesnt connect to a server
+            is_local_engine = settings.POOTLE_TM_SERVER[server].get(
+                'ENGINE', '').endswith('.LocalTMBackend')
+
+            if ('HOST' not in settings.POOTLE_TM_SERVER[server] and
+                not is_local_engine):
                 errors.append(checks.Critical(
                     _("POOTLE_TM_SERVER['%s'] has no HOST.", server),
                     hint=_("Set a HOST for POOTLE_TM_SERVER['%s'].",
@@ -302,7 +307,8 @@ def check_settings(app_configs=None, **kwargs):
                     id="pootle.C011",
                 ))
 
-            if 'PORT' not in settings.POOTLE_TM_SERVER[server]:
+            if ('PORT' not in settings.POOTLE_TM_SERVER[server] and
+                not is_local_engine):
                 errors.append(checks.Critical(
                     _("POOTLE_TM_SERVER['%s'] has no PORT.", server),
                     hint=_("Set a PORT for POOTLE_TM_SERVER['%s'].",
@@ -6,6 +6,9 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
+import threading
+import time
+from collections import OrderedDict
 
 from django.conf import settings
 from django.core.cache import cache as default_cache, caches
@@ -64,3 +67,57 @@ def get_cache(cache=None):
         return caches[cache]
     except InvalidCacheBackendError:
         return default_cache
+
+
+class LocalLRUCache(object):
+    """A bounded, thread safe in-process LRU cache.
+
+    Values are expired after ``timeout`` seconds, so that keys that are
+    deleted from, or flushed in, a shared cache are not served for long.
+    """
+
+    def __init__(self, maxsize=None, timeout=None):
+        self._maxsize = maxsize
+        self._timeout = timeout
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    @property
+    def maxsize(self):
+        if self._maxsize is not None:
+            return self._maxsize
+        return getattr(settings, "POOTLE_LOCAL_CACHE_SIZE", 1000)
+
+    @property
+    def timeout(self):
+        if self._timeout is not None:
+            return self._timeout
+        return getattr(settings, "POOTLE_LOCAL_CACHE_TIMEOUT", 60)
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key not in self.data:
+                return default
+            expires, value = self.data.pop(key)
+            if expires < time.time():
+                return default
+            self.data[key] = (expires, value)
+            return value
+
+    def set(self, key, value):
+        maxsize = self.maxsize
+        if not maxsize:
+            return
+        with self.lock:
+            self.data.pop(key, None)
+            self.data[key] = (time.time() + self.timeout, value)
+            while len(self.data) > maxsize:
+                self.data.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
@@ -14,13 +14,14 @@ from django.core.exceptions import PermissionDenied
 from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse
+from django.utils.six.moves import cPickle as pickle
 
 from pootle.i18n.gettext import ugettext as _
 from pootle_app.models.permissions import (check_permission,
                                            get_matching_permissions)
 from pootle_project.models import Project, ProjectSet
 
-from .cache import get_cache
+from .cache import LocalLRUCache, get_cache
 from .exceptions import Http400
 from .url_helpers import split_pootle_path
 
@@ -178,46 +179,128 @@ class persistent_property(object):
     If no cache_key attribute is present or returns None, it will use instance
     caching by default. This behaviour can be switched off by setting
     `always_cache` to False in the decorator.
+
+    Values are also kept in a small in-process cache in front of the memory
+    cache. On a miss, only one process computes the value while others
+    serve the last computed value if the instance has a `stale_cache_key`
+    (set with `stale_key_attr`) that doesnt change with revisions. Otherwise
+    they wait for the value for up to `wait_timeout` seconds, and then
+    compute it themselves.
     """
 
+    local_cache = LocalLRUCache()
+    # hits/misses/compute time for each ns.name
+    counters = {}
+    lease_timeout = 30
+    wait_timeout = 2
+    wait_interval = .05
+
     def __init__(self, func, name=None, key_attr=None, always_cache=True,
-                 ns_attr=None, version_attr=None):
+                 ns_attr=None, version_attr=None, stale_key_attr=None):
         self.func = func
         self.__doc__ = getattr(func, '__doc__')
         self.name = name or func.__name__
         self.ns_attr = ns_attr or "ns"
         self.key_attr = key_attr or "cache_key"
         self.version_attr = version_attr or "sw_version"
+        self.stale_key_attr = stale_key_attr or "stale_cache_key"
         self.always_cache = always_cache
 
-    def _get_cache_key(self, instance):
+    def _get_cache_key(self, instance, key_attr=None):
         ns = getattr(instance, self.ns_attr, "pootle.core")
         sw_version = getattr(instance, self.version_attr, "")
-        cache_key = getattr(instance, self.key_attr, None)
+        cache_key = getattr(instance, key_attr or self.key_attr, None)
         if cache_key:
             return (
                 "%s.%s.%s.%s"
                 % (ns, sw_version, cache_key, self.name))
 
+    def _get_counters(self, instance):
+        name = "%s.%s" % (
+            getattr(instance, self.ns_attr, "pootle.core"), self.name)
+        if name not in self.counters:
+            self.counters[name] = dict(
+                local_hits=0, hits=0, misses=0, stale=0, compute_time=0)
+        return self.counters[name]
+
+    def _get_local(self, cache_key):
+        cached = self.local_cache.get(cache_key)
+        if cached is not None:
+            return pickle.loads(cached)
+
+    def _set_local(self, cache_key, value):
+        # values are pickled so that callers cant mutate the cached value
+        self.local_cache.set(
+            cache_key,
+            pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+
+    def _wait(self, cache, cache_key):
+        """Wait for another process to compute the value"""
+        waited = 0
+        while waited < self.wait_timeout:
+            time.sleep(self.wait_interval)
+            waited += self.wait_interval
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+    def _compute(self, instance, cache, cache_key, stale_key, counters):
+        start = time.time()
+        res = self.func(instance)
+        timetaken = time.time() - start
+        counters["compute_time"] += timetaken
+        cache.set(cache_key, res)
+        if stale_key:
+            cache.set(stale_key, res)
+        logger.debug(
+            "[cache] generated %s in %s seconds",
+            cache_key, timetaken)
+        return res
+
+    def _get_cached(self, instance, cache_key):
+        counters = self._get_counters(instance)
+        cached = self._get_local(cache_key)
+        if cached is not None:
+            counters["local_hits"] += 1
+            return cached
+        cache = get_cache('lru')
+        cached = cache.get(cache_key)
+        if cached is not None:
+            # cache hit
+            counters["hits"] += 1
+            self._set_local(cache_key, cached)
+            return cached
+        # cache miss
+        counters["misses"] += 1
+        stale_key = self._get_cache_key(instance, self.stale_key_attr)
+        if stale_key:
+            stale_key = "%s.stale" % stale_key
+        lock_key = "%s.lock" % cache_key
+        locked = cache.add(lock_key, 1, self.lease_timeout)
+        if not locked:
+            # another process is computing the value
+            cached = cache.get(stale_key) if stale_key else None
+            if cached is None:
+                cached = self._wait(cache, cache_key)
+            else:
+                counters["stale"] += 1
+            if cached is not None:
+                return cached
+        try:
+            res = self._compute(
+                instance, cache, cache_key, stale_key, counters)
+        finally:
+            if locked:
+                cache.delete(lock_key)
+        self._set_local(cache_key, res)
+        return res
+
     def __get__(self, instance, cls=None):
         if instance is None:
             return self
         cache_key = self._get_cache_key(instance)
         if cache_key:
-            cache = get_cache('lru')
-            cached = cache.get(cache_key)
-            if cached is not None:
-                # cache hit
-                return cached
-            # cache miss
-            start = time.time()
-            res = self.func(instance)
-            timetaken = time.time() - start
-            cache.set(cache_key, res)
-            logger.debug(
-                "[cache] generated %s in %s seconds",
-                cache_key, timetaken)
-            return res
+            return self._get_cached(instance, cache_key)
         elif self.always_cache:
             res = instance.__dict__[self.name] = self.func(instance)
             return res
@@ -54,6 +54,8 @@ site = Getter()
 states = Getter()
 stopwords = Getter()
 text_comparison = Getter()
+text_index = Getter()
+tm_updater = Getter()
 panels = Provider()
 
 serializers = Provider(providing_args=["instance"])
@@ -6,8 +6,8 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
-from .revision import Revision
+from .revision import Revision, revision_block
 from .virtualresource import VirtualResource
 
 
-__all__ = ('Revision', 'VirtualResource')
+__all__ = ('Revision', 'VirtualResource', 'revision_block')
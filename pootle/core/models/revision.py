@@ -6,11 +6,16 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
+import threading
+from contextlib import contextmanager
+
 from ..cache import get_cache
 
 
 cache = get_cache('redis')
 
+_local = threading.local()
+
 
 class NoRevision(Exception):
     pass
@@ -66,10 +71,71 @@ class Revision(object):
     def incr(cls):
         """Increments the revision number.
 
+        If a :func:`revision_block` is active in the current thread the
+        revision is handed out from its reserved block instead.
+
         :return: the new revision number after incrementing it, or the
             initial number if there's no revision stored yet.
         """
+        block = getattr(_local, "block", None)
+        if block is not None:
+            return block.next()
+        return cls.reserve(1)
+
+    @classmethod
+    def reserve(cls, count):
+        """Increments the revision number by `count`, reserving the
+        revisions in between for the caller.
+
+        :return: the first revision number of the reserved block.
+        """
         try:
-            return cache.incr(cls.CACHE_KEY)
+            return cache.incr(cls.CACHE_KEY, count) - count + 1
         except ValueError:
             raise NoRevision()
+
+
+class RevisionBlock(object):
+    """Hands out revisions in order from blocks reserved with a single
+    increment of the revision counter.
+
+    Revisions that are left unused are skipped, so revision numbers may have
+    gaps, but they are never reused.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.next_revision = self.end = None
+
+    def reserve(self):
+        self.next_revision = Revision.reserve(self.size)
+        self.end = self.next_revision + self.size - 1
+
+    def next(self):
+        if self.next_revision is None or self.next_revision > self.end:
+            self.reserve()
+        revision = self.next_revision
+        self.next_revision += 1
+        return revision
+
+
+@contextmanager
+def revision_block(size=100):
+    """Hand out revisions from blocks of `size` in the current thread.
+
+    Blocks should only be held for a single bounded operation, such as
+    updating a store. Revisions reserved by one process are handed out after
+    higher revisions may have been used by another, so holding a block for
+    longer widens the window in which syncing by revision can miss a unit.
+
+    Nested blocks use the outermost block.
+    """
+    block = getattr(_local, "block", None)
+    if block is not None:
+        yield block
+        return
+    _local.block = RevisionBlock(size)
+    try:
+        yield _local.block
+    finally:
+        _local.block = None
@@ -6,9 +6,11 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
-from .base import SearchBackend
+from .base import SearchBackend, SearchBackendError
 from .broker import SearchBroker
-from .backends import ElasticSearchBackend
+from .backends import ElasticSearchBackend, LocalTMBackend
 
 
-__all__ = ('SearchBackend', 'SearchBroker', 'ElasticSearchBackend')
+__all__ = (
+    'SearchBackend', 'SearchBackendError', 'SearchBroker',
+    'ElasticSearchBackend', 'LocalTMBackend')
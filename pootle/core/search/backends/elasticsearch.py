@@ -13,12 +13,12 @@ import logging
 import Levenshtein
 
 try:
-    from elasticsearch import Elasticsearch
+    from elasticsearch import Elasticsearch, helpers
     from elasticsearch.exceptions import ElasticsearchException
 except ImportError:
     Elasticsearch = None
 
-from ..base import SearchBackend
+from ..base import SearchBackend, SearchBackendError
 
 
 __all__ = ('ElasticSearchBackend',)
@@ -120,14 +120,15 @@ class ElasticSearchBackend(SearchBackend):
 
         if es_res is None:
             # ElasticsearchException - eg ConnectionError.
-            return []
+            raise SearchBackendError(
+                "Elasticsearch search (%s:%s) failed"
+                % (self._settings["HOST"], self._settings["PORT"]))
         elif es_res == "":
             # There seems to be an issue with urllib where an empty string is
             # returned
-            logger.error("Elasticsearch search (%s:%s) returned an empty "
-                         "string: %s", self._settings["HOST"],
-                         self._settings["PORT"], unit)
-            return []
+            raise SearchBackendError(
+                "Elasticsearch search (%s:%s) returned an empty string"
+                % (self._settings["HOST"], self._settings["PORT"]))
 
         hits = filter_hits_by_distance(
             es_res['hits']['hits'],
@@ -171,3 +172,17 @@ class ElasticSearchBackend(SearchBackend):
             body=obj,
             id=obj['id']
         )
+
+    def bulk_update(self, language, objs):
+        actions = [
+            {'_index': self._settings['INDEX_NAME'],
+             '_type': language,
+             '_id': obj['id'],
+             '_source': obj}
+            for obj in objs]
+        try:
+            helpers.bulk(self._es, actions)
+        except ElasticsearchException as e:
+            self._log_error(e)
+            return False
+        return True
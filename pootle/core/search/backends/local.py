@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+from __future__ import absolute_import
+
+import logging
+import os
+import sqlite3
+import unicodedata
+from contextlib import closing
+
+import Levenshtein
+
+from django.conf import settings
+from django.utils.encoding import force_text
+
+from ..base import SearchBackend, SearchBackendError
+from .elasticsearch import DEFAULT_MIN_SIMILARITY
+
+
+__all__ = ('LocalTMBackend',)
+
+
+logger = logging.getLogger(__name__)
+
+
+TM_FIELDS = (
+    'revision', 'source', 'target', 'project', 'path', 'username',
+    'fullname', 'email_md5', 'iso_submitted_on', 'display_submitted_on')
+
+
+class LocalTMIndex(object):
+    """On-disk trigram index of the translations of a language.
+
+    The index is an sqlite database, with a table of the indexed units and a
+    table of the trigrams found in their source text.
+    """
+
+    gram_size = 3
+    # the number of grams of a text that are looked up, which keeps queries
+    # for long texts within sqlite's limit of query parameters
+    max_grams = 500
+
+    def __init__(self, path):
+        self.path = path
+
+    def connect(self):
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def create(self):
+        with closing(self.connect()) as connection:
+            with connection:
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS units ("
+                    "id TEXT PRIMARY KEY, length INTEGER, grams INTEGER, %s)"
+                    % ", ".join(TM_FIELDS))
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS grams ("
+                    "gram TEXT, unit_id TEXT, PRIMARY KEY (gram, unit_id)) "
+                    "WITHOUT ROWID")
+                connection.execute(
+                    "CREATE INDEX IF NOT EXISTS grams_unit_id "
+                    "ON grams (unit_id)")
+
+    def normalize(self, text):
+        text = unicodedata.normalize("NFKD", force_text(text or ""))
+        return u"".join(
+            c for c
+            in text
+            if not unicodedata.combining(c)).lower()
+
+    def get_grams(self, text):
+        text = u" %s " % self.normalize(text)
+        return set(
+            text[i:i + self.gram_size]
+            for i
+            in range(len(text) - self.gram_size + 1))
+
+    def update(self, objs):
+        units = []
+        grams = []
+        for obj in objs:
+            unit_id = force_text(obj['id'])
+            source_grams = self.get_grams(obj['source'])
+            units.append(
+                [unit_id, len(obj['source'] or ""), len(source_grams)]
+                + [obj.get(field) for field in TM_FIELDS])
+            grams.extend((gram, unit_id) for gram in source_grams)
+        with closing(self.connect()) as connection:
+            with connection:
+                connection.executemany(
+                    "DELETE FROM grams WHERE unit_id = ?",
+                    [(unit[0], ) for unit in units])
+                connection.executemany(
+                    "INSERT OR REPLACE INTO units VALUES (%s)"
+                    % ", ".join(["?"] * (len(TM_FIELDS) + 3)),
+                    units)
+                connection.executemany(
+                    "INSERT OR IGNORE INTO grams VALUES (?, ?)",
+                    grams)
+
+    def search(self, text, min_similarity, limit):
+        """Returns units sharing most trigrams with `text` that can be at
+        least `min_similarity` similar to it.
+        """
+        grams = self.get_grams(text)
+        if not grams:
+            return []
+        lookup = sorted(grams)[:self.max_grams]
+        length = len(text)
+        # the similarity of strings can not be higher than the ratio of
+        # their lengths, and each edit changes at most ``gram_size`` grams,
+        # any of which may be looked up
+        min_length = length * min_similarity
+        max_length = length / min_similarity
+        min_matched = (
+            len(lookup)
+            - self.gram_size * (1 - min_similarity) * max_length)
+        query = (
+            "SELECT units.*, COUNT(*) AS matched FROM grams "
+            "JOIN units ON units.id = grams.unit_id "
+            "WHERE gram IN (%s) AND length BETWEEN ? AND ? "
+            "GROUP BY units.id HAVING matched >= ? "
+            "ORDER BY 2.0 * matched / (units.grams + ?) DESC LIMIT ?"
+            % ", ".join(["?"] * len(lookup)))
+        args = (
+            lookup
+            + [min_length, max_length, min_matched, len(grams), limit])
+        with closing(self.connect()) as connection:
+            return connection.execute(query, args).fetchall()
+
+    def max_revision(self):
+        with closing(self.connect()) as connection:
+            return connection.execute(
+                "SELECT MAX(revision) FROM units").fetchone()[0]
+
+
+class LocalTMBackend(SearchBackend):
+    """Translation memory kept in on-disk indexes, one for each language.
+
+    Candidates are looked up by shared trigrams, and only the best ranked
+    candidates are compared with the Levenshtein distance.
+    """
+
+    index_class = LocalTMIndex
+    candidates = 50
+
+    def __init__(self, config_name):
+        super(LocalTMBackend, self).__init__(config_name)
+        self.weight = min(max(self._settings.get('WEIGHT', self.weight),
+                              0.0), 1.0)
+        self.min_similarity = self._settings.get(
+            'MIN_SIMILARITY', DEFAULT_MIN_SIMILARITY)
+        if self.min_similarity <= 0 or self.min_similarity >= 1:
+            self.min_similarity = DEFAULT_MIN_SIMILARITY
+        self._indexes = {}
+
+    @property
+    def path(self):
+        return os.path.join(
+            self._settings.get('PATH', settings.POOTLE_TM_DIRECTORY),
+            self._settings['INDEX_NAME'])
+
+    def get_index(self, language):
+        if language not in self._indexes:
+            if not os.path.exists(self.path):
+                os.makedirs(self.path)
+            index = self.index_class(
+                os.path.join(self.path, "%s.db" % language))
+            index.create()
+            self._indexes[language] = index
+        return self._indexes[language]
+
+    def _log_error(self, e):
+        logger.error("Local TM error (%s): %s", self.path, e)
+
+    def search(self, unit):
+        language = unit.store.translation_project.language.code
+        source = force_text(unit.source)
+        try:
+            hits = self.get_index(language).search(
+                source, self.min_similarity, self.candidates)
+        except (OSError, sqlite3.Error) as e:
+            self._log_error(e)
+            raise SearchBackendError(
+                "Local TM search (%s) failed: %s" % (self.path, e))
+        counter = {}
+        res = []
+        for hit in hits:
+            if hit['id'] == str(unit.id):
+                continue
+            distance = Levenshtein.distance(source, hit['source'])
+            similarity = (
+                1 - distance / float(max(len(source), len(hit['source']))))
+            if similarity < self.min_similarity:
+                continue
+            translation_pair = hit['source'] + hit['target']
+            if translation_pair in counter:
+                counter[translation_pair] += 1
+                continue
+            counter[translation_pair] = 1
+            result = {
+                field: hit[field]
+                for field in TM_FIELDS
+                if field != 'revision'}
+            result.update({
+                'unit_id': hit['id'],
+                'score': similarity * 100 * self.weight})
+            res.append(result)
+
+        for item in res:
+            item['count'] = counter[item['source'] + item['target']]
+
+        return sorted(res, reverse=True, key=lambda item: item['score'])
+
+    def update(self, language, obj):
+        self.bulk_update(language, [obj])
+
+    def bulk_update(self, language, objs):
+        try:
+            self.get_index(language).update(objs)
+        except (OSError, sqlite3.Error) as e:
+            self._log_error(e)
+            return False
+        return True
+
+    def clear(self):
+        """Remove the indexes of all languages"""
+        self._indexes = {}
+        if not os.path.exists(self.path):
+            return
+        for filename in os.listdir(self.path):
+            if filename.endswith(".db"):
+                os.remove(os.path.join(self.path, filename))
+
+    def max_revision(self):
+        """The highest revision indexed in any language"""
+        if not os.path.exists(self.path):
+            return None
+        revisions = [
+            self.get_index(filename[:-3]).max_revision()
+            for filename in os.listdir(self.path)
+            if filename.endswith(".db")]
+        revisions = [
+            revision
+            for revision in revisions
+            if revision is not None]
+        return max(revisions) if revisions else None
@@ -12,6 +12,10 @@ from django.conf import settings
 SERVER_SETTINGS_NAME = 'POOTLE_TM_SERVER'
 
 
+class SearchBackendError(Exception):
+    """Raised by a backend when its server could not be searched"""
+
+
 class SearchBackend(object):
 
     def __init__(self, config_name=None):
@@ -41,10 +45,20 @@ class SearchBackend(object):
         """Search for TM results.
 
         :param unit: :cls:`~pootle_store.models.Unit`
-        :return: list of results or [] for no results or offline
+        :return: list of results or [] for no results
+        :raises SearchBackendError: if the server could not be searched
         """
         raise NotImplementedError
 
     def update(self, language, obj):
         """Add a unit to the backend"""
         pass
+
+    def bulk_update(self, language, objs):
+        """Add several units to the backend
+
+        :return: `True` if the units were added
+        """
+        for obj in objs:
+            self.update(language, obj)
+        return True
@@ -8,14 +8,82 @@
 
 import importlib
 import logging
+import threading
+import time
+from collections import defaultdict
+from hashlib import md5
+from multiprocessing import TimeoutError
+from multiprocessing.pool import ThreadPool
 
-from . import SearchBackend
+from django.utils.encoding import force_bytes
+
+from ..cache import get_cache
+from ..delegate import text_comparison
+from .base import SearchBackend, SearchBackendError
+
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker(object):
+    """Stops a TM server from being queried for ``reset_timeout`` seconds
+    after ``max_failures`` consecutive failures.
+
+    Once the timeout has passed the server is queried again, and a further
+    failure opens the circuit again.
+    """
+
+    max_failures = 3
+    reset_timeout = 30
+
+    def __init__(self):
+        self.failures = 0
+        self.opened_at = None
+
+    @property
+    def is_open(self):
+        return (
+            self.opened_at is not None
+            and time.time() - self.opened_at < self.reset_timeout)
+
+    def success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def failure(self):
+        self.failures += 1
+        if self.failures >= self.max_failures:
+            self.opened_at = time.time()
 
 
 class SearchBroker(SearchBackend):
+    """Queries all of the TM servers concurrently.
+
+    Servers that dont answer within their ``TIMEOUT`` are left out of the
+    results, and servers that keep failing are skipped for a while. Each
+    server has its own pool of ``max_pending`` threads, and is skipped while
+    that many of its searches are still running, so that a hung server can not
+    hold up the others. Complete results are cached for ``cache_timeout``
+    seconds.
+    """
+
+    breaker_class = CircuitBreaker
+    cache_ns = "pootle.tm.search"
+    cache_timeout = 300
+    max_pending = 2
+    timeout = 2
+
     def __init__(self, config_name=None):
         super(SearchBroker, self).__init__(config_name)
         self._servers = {}
+        self._pools = {}
+        self._lock = threading.Lock()
+        self.pending = defaultdict(int)
+        self.breakers = defaultdict(self.breaker_class)
+        self.metrics = defaultdict(
+            lambda: dict(
+                calls=0, failures=0, timeouts=0, skipped=0, busy=0,
+                total_latency=0.0, last_latency=None))
 
         if self._settings is None:
             return
@@ -43,14 +111,128 @@ class SearchBroker(SearchBackend):
                     logging.warning("Search backend '%s'. Cannot import '%s'",
                                     server, _module)
 
+    @property
+    def cache(self):
+        return get_cache("lru")
+
+    def get_pool(self, server):
+        # created on first use, as threads dont survive forking
+        with self._lock:
+            if server not in self._pools:
+                self._pools[server] = ThreadPool(self.max_pending)
+        return self._pools[server]
+
+    def get_cache_key(self, language, unit):
+        return "%s.%s" % (
+            self.cache_ns,
+            md5(force_bytes(
+                u"%s:%s" % (language, unit.source_f))).hexdigest())
+
+    def get_timeout(self, server):
+        return (self._settings or {}).get(server, {}).get(
+            'TIMEOUT', self.timeout)
+
+    def add_metric(self, server, **kwargs):
+        with self._lock:
+            metrics = self.metrics[server]
+            for k, v in kwargs.items():
+                metrics[k] += v
+
+    def submit(self, server, unit):
+        """Searches ``server`` in its pool, or returns ``None`` if it
+        already has ``max_pending`` searches running.
+        """
+        with self._lock:
+            if self.pending[server] >= self.max_pending:
+                return None
+            self.pending[server] += 1
+        return self.get_pool(server).apply_async(
+            self.search_server, (server, unit))
+
+    def search_server(self, server, unit):
+        start = time.time()
+        try:
+            return self._servers[server].search(unit)
+        finally:
+            with self._lock:
+                self.pending[server] -= 1
+            latency = time.time() - start
+            self.add_metric(server, calls=1, total_latency=latency)
+            self.metrics[server]["last_latency"] = latency
+            logger.debug(
+                "[tm] Server '%s' answered in %.3fs", server, latency)
+
+    def search_servers(self, unit):
+        """Returns the results of each server that answered in time, and
+        whether all of the servers did.
+        """
+        complete = True
+        pending = []
+        for server in self._servers:
+            if self.breakers[server].is_open:
+                self.add_metric(server, skipped=1)
+                complete = False
+                continue
+            pending_result = self.submit(server, unit)
+            if pending_result is None:
+                logger.warning(
+                    "[tm] Server '%s' is busy", server)
+                self.add_metric(server, busy=1)
+                complete = False
+                continue
+            pending.append(
+                (server,
+                 time.time() + self.get_timeout(server),
+                 pending_result))
+        results = []
+        for server, deadline, pending_result in pending:
+            try:
+                results.append(
+                    pending_result.get(max(deadline - time.time(), 0)))
+            except TimeoutError:
+                logger.warning(
+                    "[tm] Server '%s' timed out", server)
+                self.add_metric(server, timeouts=1)
+                self.breakers[server].failure()
+                complete = False
+            except SearchBackendError as e:
+                logger.error(
+                    "[tm] Server '%s' failed: %s", server, e)
+                self.add_metric(server, failures=1)
+                self.breakers[server].failure()
+                complete = False
+            except Exception:
+                logger.exception(
+                    "[tm] Server '%s' failed", server)
+                self.add_metric(server, failures=1)
+                self.breakers[server].failure()
+                complete = False
+            else:
+                self.breakers[server].success()
+        return results, complete
+
     def search(self, unit):
         if not self._servers:
             return []
 
+        # related objects are loaded here rather than in the pool threads
+        language = unit.store.translation_project.language.code
+        cache_key = self.get_cache_key(language, unit)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            # results are cached for the source text, so may have been found
+            # for another unit and include this unit's own translation
+            return [
+                result
+                for result
+                in cached
+                if result.get('unit_id') != str(unit.id)]
+        server_results, complete = self.search_servers(unit)
+
         results = []
         counter = {}
-        for server in self._servers:
-            for result in self._servers[server].search(unit):
+        for server_result in server_results:
+            for result in server_result:
                 translation_pair = result['source'] + result['target']
                 if translation_pair not in counter:
                     counter[translation_pair] = result['count']
@@ -61,14 +243,45 @@ class SearchBroker(SearchBackend):
         for item in results:
             item['count'] = counter[item['source']+item['target']]
 
-        # Results are in the order of the TM servers, so they must be sorted by
-        # score so the better matches are presented to the user.
-        results = sorted(results, reverse=True,
-                         key=lambda item: item['score'])
+        # Results are in the order of the TM servers, so they must be ranked
+        # so the better matches are presented to the user.
+        results = self.rank(unit, results)
 
+        # partial results are not cached, so that the servers that failed are
+        # queried again
+        if complete:
+            self.cache.set(cache_key, results, self.cache_timeout)
         return results
 
+    def rank(self, unit, results):
+        """Sorts results by score, and results with the same score by the
+        similarity of their source text to the unit's.
+        """
+        comparison = text_comparison.get()
+        if comparison is None:
+            return sorted(results, reverse=True,
+                          key=lambda item: item['score'])
+        similarities = comparison(unit.source_f).similarity_many(
+            result['source'] for result in results)
+        ranked = sorted(
+            zip(similarities, results),
+            reverse=True,
+            key=lambda ranking: (ranking[1]['score'], ranking[0]))
+        return [result for similarity_, result in ranked]
+
+    @property
+    def updatable_servers(self):
+        return [
+            self._servers[server]
+            for server in self._servers
+            if self._servers[server].is_auto_updatable]
+
     def update(self, language, obj):
-        for server in self._servers:
-            if self._servers[server].is_auto_updatable:
-                self._servers[server].update(language, obj)
+        for server in self.updatable_servers:
+            server.update(language, obj)
+
+    def bulk_update(self, language, objs):
+        updated = True
+        for server in self.updatable_servers:
+            updated = server.bulk_update(language, objs) and updated
+        return updated
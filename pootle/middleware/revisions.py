@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+from pootle_revision.contextmanagers import coalesce_revisions
+
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS", "TRACE")
+
+
+class CoalesceRevisionsMiddleware(object):
+    """Coalesce the revision updates made while handling a request that can
+    change data, and update each revision once after the view has run.
+
+    ``ATOMIC_REQUESTS`` only wraps the view, so its changes are committed by
+    the time the revisions are updated.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method in SAFE_METHODS:
+            return self.get_response(request)
+        with coalesce_revisions():
+            return self.get_response(request)
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import pytest
+
+from django.core.management import call_command
+
+from pootle_store.constants import UNIT_INDEX_GAP
+
+
+@pytest.mark.cmd
+@pytest.mark.django_db
+def test_rebalance_unit_indexes(capfd, store0):
+    units = list(store0.units)
+    for i, unit in enumerate(units):
+        store0.unit_set.filter(pk=unit.pk).update(index=i)
+    call_command(
+        "rebalance_unit_indexes",
+        "--project", store0.translation_project.project.code,
+        "--language", store0.translation_project.language.code)
+    out, err = capfd.readouterr()
+    assert (
+        "units for %s" % store0.translation_project
+        in out)
+    assert (
+        list(store0.units.values_list("pk", "index"))
+        == [(unit.pk, (i + 1) * UNIT_INDEX_GAP)
+            for i, unit in enumerate(units)])
+    # already balanced
+    assert not store0.rebalance_indexes()
@@ -11,8 +11,12 @@ from mock import patch
 import pytest
 
 from django.core.management import call_command
+from django.core.management.base import CommandError
 
+from pootle.core.signals import update_revisions
 from pootle_app.management.commands.refresh_scores import Command
+from pootle_app.models import Directory
+from pootle_revision.contextmanagers import CoalescedRevisions
 from pootle_translationproject.models import TranslationProject
 
 
@@ -26,6 +30,7 @@ DEFAULT_OPTIONS = {
     u'skip_checks': True,
     'no_rq': False,
     'atomic': 'tp',
+    'jobs': 1,
     'noinput': False,
     'no_color': False}
 
@@ -395,3 +400,51 @@ def test_cmd_refresh_scores_handle_all_stores(updater_mock, users_mock):
     assert (
         list(updater_mock.get.return_value.return_value.clear.call_args)
         == [(7,), {}])
+
+
+def _handle_all_stores_in_worker(self, tp, **options):
+    update_revisions.send(
+        Directory,
+        instance=tp.directory,
+        keys=["stats"])
+
+
+@pytest.mark.cmd
+@pytest.mark.django_db
+@patch.object(CoalescedRevisions, "flush", autospec=True)
+@patch(
+    'pootle_app.management.commands.refresh_scores.Command.handle_all_stores',
+    new=_handle_all_stores_in_worker)
+def test_cmd_refresh_scores_jobs(flush_mock):
+    """Refresh the scores of TPs in a pool of processes.
+
+    The TPs are handled in forked processes, so only the results returned to
+    the parent process can be checked here. The test db is in-memory
+    SQLite, so the workers share a copy of the parent's db rather than
+    opening their own connections.
+    """
+    tps = TranslationProject.objects.filter(project__code="project0")
+    call_command('refresh_scores', '--project=project0', '--jobs=2')
+    # the revisions of each TP are merged and flushed by the parent
+    assert flush_mock.call_count == 1
+    revisions = flush_mock.call_args[0][0]
+    assert revisions.requested == tps.count()
+    assert (
+        revisions.paths
+        == {("stats", ): set(tp.pootle_path for tp in tps)})
+
+
+@pytest.mark.cmd
+@pytest.mark.django_db
+@patch('pootle_app.management.commands.refresh_scores.Command.handle_all_stores')
+def test_cmd_refresh_scores_jobs_failed(handle_mock):
+    """Failures in the pool of processes are reported."""
+    handle_mock.side_effect = ValueError("Failed")
+    tps = TranslationProject.objects.filter(project__code="project0")
+    with pytest.raises(CommandError) as e:
+        call_command('refresh_scores', '--project=project0', '--jobs=2')
+    assert (
+        ("failed for %s translation projects" % tps.count())
+        in str(e.value))
+    for tp in tps:
+        assert tp.pootle_path in str(e.value)
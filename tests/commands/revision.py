@@ -10,6 +10,8 @@ import pytest
 
 from django.core.management import call_command
 
+from pootle_revision.contextmanagers import get_coalesced_counts
+
 
 @pytest.mark.cmd
 @pytest.mark.django_db
@@ -27,3 +29,15 @@ def test_revision_restore(capfd):
     call_command('revision', '--restore')
     out, err = capfd.readouterr()
     assert out.rstrip().isnumeric()
+
+
+@pytest.mark.cmd
+@pytest.mark.django_db
+def test_revision_coalesced(capfd):
+    """Print the number of coalesced revision updates."""
+    call_command('revision', '--coalesced')
+    out, err = capfd.readouterr()
+    assert (
+        out.rstrip()
+        == ("requested: %(requested)s, flushed: %(flushed)s, "
+            "coalesced: %(coalesced)s" % get_coalesced_counts()))
@@ -9,6 +9,9 @@
 import pytest
 
 from django.core.management import call_command
+from django.db.models import Sum
+
+from pootle_data.models import DirectoryData, StoreData
 
 
 @pytest.mark.cmd
@@ -78,3 +81,27 @@ def test_update_data_store(store0):
     store0.data.refresh_from_db()
     assert store0.data.total_words == total_words
     assert store0.data.critical_checks == critical_checks
+
+
+@pytest.mark.cmd
+@pytest.mark.django_db
+def test_update_data_store_rollups(store0):
+    """update_data rebuilds the rollups of the store's parent directories"""
+    directories = [store0.parent, store0.translation_project.directory]
+    for directory in directories:
+        directory.data_tool.update()
+    DirectoryData.objects.filter(directory__in=directories).update(
+        total_words=0)
+    call_command(
+        "update_data",
+        "--store",
+        store0.pootle_path)
+    for directory in directories:
+        total_words = StoreData.objects.filter(
+            store__translation_project_id=directory.tp_id,
+            store__pootle_path__startswith=directory.pootle_path,
+            store__obsolete=False).aggregate(
+                total=Sum("total_words"))["total"]
+        assert (
+            DirectoryData.objects.get(directory=directory).total_words
+            == total_words)
@@ -27,6 +27,7 @@ DEFAULT_OPTIONS = {
     u'skip_checks': True,
     'no_rq': False,
     'atomic': 'tp',
+    'jobs': 1,
     'noinput': False,
     'overwrite': False,
     'no_color': False}
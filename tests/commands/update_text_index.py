@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import pytest
+
+from django.core.management import call_command
+
+from pootle_store.models import UnitTrigram
+from pootle_store.unit.textindex import UnitTrigramIndex
+
+
+@pytest.mark.cmd
+@pytest.mark.django_db
+def test_update_text_index_noargs(capfd, tp0):
+    index = UnitTrigramIndex()
+    assert not index.ready
+    call_command("update_text_index")
+    out, err = capfd.readouterr()
+    assert "Indexing units for %s" % tp0 in out
+    assert index.ready
+    assert UnitTrigram.objects.filter(
+        unit__store__translation_project=tp0).exists()
+    call_command("update_text_index", "--disable")
+    assert not index.ready
+    assert not index.writable
+
+
+@pytest.mark.cmd
+@pytest.mark.django_db
+def test_update_text_index_project(capfd, tp0):
+    index = UnitTrigramIndex()
+    call_command(
+        "update_text_index",
+        "--project",
+        tp0.project.code)
+    out, err = capfd.readouterr()
+    assert "Partial index built" in out
+    assert not index.ready
+    assert index.writable
@@ -10,7 +10,7 @@ import pytest
 
 from django.http import Http404
 
-from pootle.core.cache import get_cache
+from pootle.core.cache import LocalLRUCache, get_cache
 from pootle.core.decorators import get_path_obj, persistent_property
 from pootle_language.models import Language
 from pootle_project.models import Project
@@ -226,3 +226,166 @@ def test_deco_persistent_property():
     assert get_cache("lru").get('pootle.foo.0.2.3.foo-cache.bar') == "Baz"
     # cached version this time
     assert foo.bar == "Baz"
+
+
+def test_deco_persistent_property_local_cache():
+    local_cache = LocalLRUCache(maxsize=2, timeout=60)
+    local_cache.set("a", 1)
+    local_cache.set("b", 2)
+    assert local_cache.get("a") == 1
+    local_cache.set("c", 3)
+    # b was the least recently used
+    assert local_cache.get("b") is None
+    assert local_cache.get("a") == 1
+    assert local_cache.get("c") == 3
+    local_cache.delete("a")
+    assert local_cache.get("a") is None
+    local_cache = LocalLRUCache(maxsize=2, timeout=-1)
+    local_cache.set("a", 1)
+    assert local_cache.get("a") is None
+    local_cache = LocalLRUCache(maxsize=0)
+    local_cache.set("a", 1)
+    assert local_cache.get("a") is None
+
+
+def test_deco_persistent_property_stale():
+    cache = get_cache("lru")
+
+    class Foo(object):
+        ns = "pootle.foo.stale"
+        cache_key = "foo-cache"
+        stale_cache_key = "foo"
+        result = "Baz"
+
+        @persistent_property
+        def bar(self):
+            return self.result
+
+    cache.delete("pootle.foo.stale..foo-cache.bar")
+    cache.delete("pootle.foo.stale..foo.bar.stale")
+    foo = Foo()
+    assert foo.bar == "Baz"
+    assert cache.get("pootle.foo.stale..foo.bar.stale") == "Baz"
+    assert not cache.get("pootle.foo.stale..foo-cache.bar.lock")
+
+    # another process is computing the new value, the stale one is served
+    foo.cache_key = "foo-cache-2"
+    foo.result = "Baz2"
+    cache.add("pootle.foo.stale..foo-cache-2.bar.lock", 1)
+    assert foo.bar == "Baz"
+    cache.delete("pootle.foo.stale..foo-cache-2.bar.lock")
+    assert foo.bar == "Baz2"
+    assert cache.get("pootle.foo.stale..foo.bar.stale") == "Baz2"
+    counters = persistent_property.counters["pootle.foo.stale.bar"]
+    assert counters["misses"] == 3
+    assert counters["stale"] == 1
+
+
+def test_deco_persistent_property_local_tier(settings):
+    settings.POOTLE_LOCAL_CACHE_SIZE = 10
+    cache = get_cache("lru")
+    persistent_property.local_cache.clear()
+
+    class Foo(object):
+        ns = "pootle.foo.local"
+        cache_key = "foo-cache"
+        result = "Baz"
+
+        @persistent_property
+        def bar(self):
+            return self.result
+
+    cache_key = "pootle.foo.local..foo-cache.bar"
+    cache.delete(cache_key)
+    foo = Foo()
+    assert foo.bar == "Baz"
+    counters = persistent_property.counters["pootle.foo.local.bar"]
+    local_hits = counters["local_hits"]
+
+    # served from the process without reading the shared cache
+    cache.set(cache_key, "Other")
+    assert foo.bar == "Baz"
+    assert counters["local_hits"] == local_hits + 1
+
+    # values are copies
+    foo.result = ["Baz"]
+    foo.cache_key = "foo-cache-list"
+    cache.delete("pootle.foo.local..foo-cache-list.bar")
+    foo.bar.append("Other")
+    assert foo.bar == ["Baz"]
+
+    # expired values are read from the shared cache again
+    settings.POOTLE_LOCAL_CACHE_TIMEOUT = -1
+    persistent_property.local_cache.clear()
+    foo.cache_key = "foo-cache"
+    assert foo.bar == "Other"
+    local_hits = counters["local_hits"]
+    hits = counters["hits"]
+    assert foo.bar == "Other"
+    assert counters["local_hits"] == local_hits
+    assert counters["hits"] == hits + 1
+    persistent_property.local_cache.clear()
+
+
+def test_deco_persistent_property_local_tier_stale(settings):
+    settings.POOTLE_LOCAL_CACHE_SIZE = 10
+    cache = get_cache("lru")
+    persistent_property.local_cache.clear()
+
+    class Foo(object):
+        ns = "pootle.foo.local.stale"
+        cache_key = "foo-cache"
+        stale_cache_key = "foo"
+        result = "Baz"
+
+        @persistent_property
+        def bar(self):
+            return self.result
+
+    cache.delete("pootle.foo.local.stale..foo-cache.bar")
+    cache.delete("pootle.foo.local.stale..foo.bar.stale")
+    foo = Foo()
+    assert foo.bar == "Baz"
+
+    # the new value is being computed elsewhere, the stale value is served
+    # and not kept in the process
+    foo.cache_key = "foo-cache-2"
+    foo.result = "Baz2"
+    lock_key = "pootle.foo.local.stale..foo-cache-2.bar.lock"
+    cache.add(lock_key, 1)
+    assert foo.bar == "Baz"
+    cache.set("pootle.foo.local.stale..foo-cache-2.bar", "Baz3")
+    assert foo.bar == "Baz3"
+    cache.delete(lock_key)
+    persistent_property.local_cache.clear()
+
+
+def test_deco_persistent_property_lease(settings):
+    settings.POOTLE_LOCAL_CACHE_SIZE = 10
+    cache = get_cache("lru")
+    persistent_property.local_cache.clear()
+
+    class Foo(object):
+        ns = "pootle.foo.lease"
+        cache_key = "foo-cache"
+
+        @persistent_property
+        def bar(self):
+            return "Baz"
+
+    cache_key = "pootle.foo.lease..foo-cache.bar"
+    lock_key = "%s.lock" % cache_key
+    cache.delete(cache_key)
+    cache.add(lock_key, 1)
+    wait_timeout = Foo.bar.wait_timeout
+    Foo.bar.wait_timeout = .1
+    try:
+        # the value is computed once the wait times out
+        assert Foo().bar == "Baz"
+    finally:
+        Foo.bar.wait_timeout = wait_timeout
+    assert cache.get(cache_key) == "Baz"
+    # the lease of the other process is left alone
+    assert cache.get(lock_key) == 1
+    cache.delete(lock_key)
+    persistent_property.local_cache.clear()
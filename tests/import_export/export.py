@@ -6,11 +6,18 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
+import os
+from zipfile import ZipFile
+
 import pytest
 
+from translate.storage import tmx
+
 from django.urls import reverse
 
 from import_export.utils import TPTMXExporter
+from pootle_store.constants import TRANSLATED
+from pootle_store.models import Unit
 
 
 @pytest.mark.django_db
@@ -57,3 +64,40 @@ def test_wrong_language_exported_tmx_url(client):
     args = ('language_foo', 'project0')
     response = client.get(reverse('pootle-offline-tm-tp', args=args))
     assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_export_tmx_fragments(tp0, settings, tmpdir):
+    settings.MEDIA_ROOT = str(tmpdir.mkdir("media"))
+    settings.POOTLE_TMX_FRAGMENTS_DIRECTORY = str(tmpdir.mkdir("fragments"))
+    exporter = TPTMXExporter(tp0)
+    exporter.export()
+    assert len(exporter.stale_stores) == len(exporter.store_revisions)
+    translated = Unit.objects.filter(
+        store__translation_project=tp0,
+        store__obsolete=False,
+        state=TRANSLATED)
+    with ZipFile(exporter.abs_filepath) as zf:
+        tmxfile = tmx.tmxfile(zf.read(zf.namelist()[0]))
+    assert len(tmxfile.units) == translated.count()
+
+    unit = translated.first()
+    unit.target_f += " CHANGED"
+    unit.save()
+    exporter = TPTMXExporter(tp0)
+    exporter.export()
+    assert list(exporter.stale_stores.keys()) == [unit.store_id]
+    with ZipFile(exporter.abs_filepath) as zf:
+        tmxfile = tmx.tmxfile(zf.read(zf.namelist()[0]))
+    assert len(tmxfile.units) == translated.count()
+    assert unit.target_f in [tmx_unit.target for tmx_unit in tmxfile.units]
+    assert (
+        sorted(os.listdir(exporter.fragments_directory))
+        == sorted(
+            os.path.basename(exporter.get_fragment_path(*store))
+            for store in exporter.store_revisions))
+    # fragments and temporary files are not kept in the media directory
+    assert not exporter.fragments_directory.startswith(settings.MEDIA_ROOT)
+    assert all(
+        fn.endswith(".tmx.zip")
+        for fn in os.listdir(exporter.directory))
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import pytest
+
+from django.http import HttpResponse
+
+from pootle.core.delegate import revision
+from pootle.core.signals import update_revisions
+from pootle.middleware.revisions import CoalesceRevisionsMiddleware
+from pootle_app.models import Directory
+from pootle_revision.contextmanagers import get_coalesced_counts
+
+
+@pytest.mark.django_db
+def test_middleware_coalesce_revisions(rf, tp0):
+    revisions = revision.get(Directory)
+    stores = list(tp0.stores.all()[:3])
+    parents = set(store.parent for store in stores)
+    original = {
+        parent.id: revisions(parent).get(key="stats")
+        for parent in parents}
+
+    def view(request):
+        for store in stores:
+            update_revisions.send(
+                store.__class__,
+                instance=store,
+                keys=["stats"])
+        # nothing is written while the view runs
+        for parent in parents:
+            assert (
+                revisions(parent).get(key="stats")
+                == original[parent.id])
+        return HttpResponse()
+
+    counts = get_coalesced_counts()
+    middleware = CoalesceRevisionsMiddleware(view)
+    middleware(rf.post("/"))
+    for parent in parents:
+        assert (
+            revisions(parent).get(key="stats")
+            != original[parent.id])
+    new_counts = get_coalesced_counts()
+    assert new_counts["requested"] == counts["requested"] + len(stores)
+    assert new_counts["flushed"] == counts["flushed"] + 1
+
+    # requests that dont change data are not coalesced
+    middleware(rf.get("/"))
+    assert get_coalesced_counts() == new_counts
@@ -8,7 +8,7 @@
 
 import pytest
 
-from pootle.core.models import Revision
+from pootle.core.models import Revision, revision_block
 from pootle_store.models import Unit
 
 
@@ -55,3 +55,25 @@ def test_revision_incr(store0):
     assert db_unit.revision != previous_revision
     assert Revision.get() != previous_revision
     assert db_unit.revision == Revision.get()
+
+
+@pytest.mark.django_db
+def test_revision_block(store0):
+    previous_revision = Revision.get()
+    with revision_block(size=5):
+        revisions = [Revision.incr() for i in range(7)]
+        # nested blocks use the outer block
+        with revision_block(size=100):
+            revisions.append(Revision.incr())
+    assert (
+        revisions
+        == list(range(previous_revision + 1, previous_revision + 9)))
+    # 2 blocks were reserved and the unused revisions are skipped
+    assert Revision.get() == previous_revision + 10
+    assert Revision.incr() == previous_revision + 11
+
+    with revision_block():
+        db_unit = store0.units.exclude(target_f="").first()
+        db_unit.target = "CHANGED"
+        db_unit.save()
+    assert db_unit.revision == previous_revision + 12
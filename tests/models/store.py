@@ -12,6 +12,7 @@ import os
 import six
 
 import pytest
+from mock import patch
 
 from pytest_pootle.factories import (
     LanguageDBFactory, ProjectDBFactory, StoreDBFactory,
@@ -910,6 +911,32 @@ def test_store_po_deserializer_custom(test_fs, store_po):
     assert checker.context == store_po
 
 
+@pytest.mark.django_db
+def test_store_serialize_cached(store0):
+    serialized = store0.serialize()
+    tostring = (
+        "pootle_store.store.serialize.StoreSerialization.tostring")
+    with patch(tostring) as tostring_mock:
+        tostring_mock.return_value = "SERIALIZED"
+        assert store0.serialize() == serialized
+        assert not tostring_mock.called
+        store0.serialize(include_obsolete=True)
+        assert tostring_mock.called
+
+    # reordering units changes the serialized store
+    units = list(store0.units[:2])
+    units[0].index, units[1].index = units[1].index, units[0].index
+    for unit in units:
+        store0.unit_set.filter(pk=unit.pk).update(index=unit.index)
+    reordered = store0.serialize()
+    assert reordered != serialized
+
+    unit = store0.units.first()
+    unit.target = "changed target"
+    unit.save()
+    assert "changed target" in store0.serialize()
+
+
 @pytest.mark.django_db
 def test_store_base_serializer(store_po):
     original_data = "SOME DATA"
@@ -27,6 +27,11 @@ from pootle_store.syncer import UnitSyncer
 User = get_user_model()
 
 
+def _file_position(db_unit):
+    # position of the unit in a synced file, after the header
+    return 1 + db_unit.store.units.filter(index__lt=db_unit.index).count()
+
+
 def _sync_translations(db_unit):
     store = db_unit.store
     tp = store.translation_project
@@ -110,12 +115,12 @@ def test_sync_plural_target(af_tutorial_po):
         db_unit.target.strings
         == file_unit.target.strings
         == [u'samaka', u'samak']
-        == file_store.units[db_unit.index].target.strings)
+        == file_store.units[_file_position(db_unit)].target.strings)
     assert (
         db_unit.target
         == file_unit.target
         == u'samaka'
-        == file_store.units[db_unit.index].target)
+        == file_store.units[_file_position(db_unit)].target)
 
 
 @pytest.mark.django_db
@@ -129,12 +134,12 @@ def test_sync_plural_target_dict(af_tutorial_po):
         db_unit.target.strings
         == file_unit.target.strings
         == [u'samaka', u'samak']
-        == file_store.units[db_unit.index].target.strings)
+        == file_store.units[_file_position(db_unit)].target.strings)
     assert (
         db_unit.target
         == file_unit.target
         == u'samaka'
-        == file_store.units[db_unit.index].target)
+        == file_store.units[_file_position(db_unit)].target)
 
 
 @pytest.mark.django_db
@@ -96,3 +96,50 @@ def test_store_qualitycheck_updater(tp0, store0):
     newest_revision = tp0.directory.revisions.filter(
         key="stats").values_list("value", flat=True).first()
     assert newest_revision == new_revision
+
+
+@pytest.mark.django_db
+def test_tp_qualitycheck_updater_parallel(tp0):
+    checks = QualityCheck.objects.filter(unit__store__translation_project=tp0)
+    original_checks = sorted(checks.values_list("unit_id", "name", "category"))
+    assert original_checks
+    checks.delete()
+    updater = TPQCUpdater(translation_project=tp0, jobs=2)
+    updater.chunk_size = 5
+    updater.update()
+    assert (
+        sorted(checks.values_list("unit_id", "name", "category"))
+        == original_checks)
+
+    # fix a check
+    check = checks.filter(name="printf")[0]
+    unit = check.unit
+    unit.__class__.objects.filter(pk=unit.pk).update(target_f=unit.source_f)
+    updated = TPQCUpdater(translation_project=tp0, jobs=2).update()
+    assert check.__class__.objects.filter(pk=check.pk).count() == 0
+    assert updated == {tp0.pk: set([unit.store_id])}
+
+
+@pytest.mark.django_db
+def test_qualitycheck_updater_parallel_stores(store0):
+    checks = QualityCheck.objects.filter(unit__store=store0)
+    original_checks = sorted(checks.values_list("unit_id", "name", "category"))
+    other_checks = QualityCheck.objects.exclude(unit__store=store0)
+    other_count = other_checks.count()
+    checks.delete()
+    updater = TPQCUpdater(stores=[store0.pk], jobs=2)
+    tps = []
+    update_tp_parallel = updater.update_tp_parallel
+
+    def _update_tp_parallel(pool, tp):
+        tps.append(tp)
+        return update_tp_parallel(pool, tp)
+
+    updater.update_tp_parallel = _update_tp_parallel
+    updater.update()
+    # only the TP of the selected stores is checked
+    assert tps == [store0.translation_project]
+    assert (
+        sorted(checks.values_list("unit_id", "name", "category"))
+        == original_checks)
+    assert other_checks.count() == other_count
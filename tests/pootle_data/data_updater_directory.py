@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import pytest
+
+from django.db.models import Sum
+
+from pootle_data.directory_data import DirectoryDataTool, DirectoryDataUpdater
+from pootle_data.models import DirectoryData, StoreData
+from pootle_data.utils import SUM_FIELDS, DirectoryDataRollup
+from pootle_store.constants import FUZZY, TRANSLATED
+
+
+def _directory_sums(directory):
+    return StoreData.objects.filter(
+        store__translation_project_id=directory.tp_id,
+        store__pootle_path__startswith=directory.pootle_path,
+        store__obsolete=False).aggregate(
+            **{k: Sum(k) for k in SUM_FIELDS})
+
+
+@pytest.mark.django_db
+def test_data_directory_updater(subdir0):
+    assert isinstance(subdir0.data_tool, DirectoryDataTool)
+    assert isinstance(subdir0.data_tool.updater, DirectoryDataUpdater)
+    DirectoryData.objects.filter(directory=subdir0).delete()
+    subdir0.data_tool.update()
+    rollup = DirectoryData.objects.get(directory=subdir0)
+    for k, v in _directory_sums(subdir0).items():
+        assert getattr(rollup, k) == (v or 0)
+
+
+@pytest.mark.django_db
+def test_data_directory_rollup_parent_paths(store0):
+    rollup = DirectoryDataRollup(store0)
+    parts = store0.pootle_path.split("/")
+    assert rollup.parent_paths[0] == store0.translation_project.pootle_path
+    assert rollup.parent_paths[-1] == store0.parent.pootle_path
+    assert len(rollup.parent_paths) == len(parts) - 3
+
+
+@pytest.mark.django_db
+def test_data_directory_rollup_delta(subdir0):
+    # materialize the rollups
+    subdir0.data_tool.update()
+    subdir0.parent.data_tool.update()
+    store = subdir0.child_stores.first()
+    unit = store.units.filter(state=TRANSLATED).first()
+    unit.state = FUZZY
+    unit.save()
+    for directory in [subdir0, subdir0.parent]:
+        rollup = DirectoryData.objects.get(directory=directory)
+        for k, v in _directory_sums(directory).items():
+            assert getattr(rollup, k) == (v or 0)
+
+
+@pytest.mark.django_db
+def test_data_directory_rollup_children_stats(tp0):
+    directory = tp0.directory
+    stats = directory.data_tool.get_children_stats(
+        directory.data_tool.child_stats_qs)
+    rollup_stats = directory.data_tool.get_rollup_children_stats()
+    for name, child in stats.items():
+        for k in ["total", "translated", "fuzzy", "critical", "suggestions"]:
+            assert rollup_stats[name][k] == child[k]
+
+
+@pytest.mark.django_db
+def test_data_directory_rollup_obsolete(subdir0):
+    subdir0.data_tool.update()
+    subdir0.parent.data_tool.update()
+    store = subdir0.child_stores.exclude(data__total_words=0).first()
+    store.makeobsolete()
+    for directory in [subdir0, subdir0.parent]:
+        rollup = DirectoryData.objects.get(directory=directory)
+        for k, v in _directory_sums(directory).items():
+            assert getattr(rollup, k) == (v or 0)
+    # updates to obsolete stores are not counted
+    store.data_tool.update()
+    rollup = DirectoryData.objects.get(directory=subdir0)
+    assert rollup.total_words == (_directory_sums(subdir0)["total_words"] or 0)
+    store.resurrect()
+    for directory in [subdir0, subdir0.parent]:
+        rollup = DirectoryData.objects.get(directory=directory)
+        for k, v in _directory_sums(directory).items():
+            assert getattr(rollup, k) == (v or 0)
+
+
+@pytest.mark.django_db
+def test_data_directory_rollup_missing(subdir0):
+    DirectoryData.objects.filter(directory=subdir0).delete()
+    directory = subdir0.parent
+    stats = directory.data_tool.get_children_stats(
+        directory.data_tool.child_stats_qs)
+    rollup_stats = directory.data_tool.get_rollup_children_stats()
+    assert rollup_stats.keys() == stats.keys()
+    assert (
+        subdir0.data_tool.get_rollup_object_stats()["total"]
+        == (_directory_sums(subdir0)["total_words"] or 0))
+    # missing rollups are not built when reading
+    assert not DirectoryData.objects.filter(directory=subdir0).exists()
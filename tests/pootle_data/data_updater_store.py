@@ -20,7 +20,8 @@ from pootle.core.delegate import crud, review
 from pootle.core.signals import update_checks, update_data
 from pootle_data.models import StoreChecksData
 from pootle_data.store_data import (
-    StoreChecksDataCRUD, StoreDataTool, StoreDataUpdater)
+    StoreChecksDataCRUD, StoreDataBulkUpdater, StoreDataTool,
+    StoreDataUnitDelta, StoreDataUpdater)
 from pootle_statistics.models import Submission
 from pootle_store.constants import FUZZY, OBSOLETE, TRANSLATED, UNTRANSLATED
 from pootle_store.models import Suggestion
@@ -396,3 +397,83 @@ def test_data_store_updater_defaults(tp0):
             assert (
                 aggregate_data[k]
                 == store.data_tool.updater.aggregate_defaults[k])
+
+
+@pytest.mark.django_db
+def test_data_store_bulk_updater(tp0):
+    stores = tp0.stores.all()
+    expected = {}
+    for store in stores:
+        data = store.data_tool.updater.get_store_data()
+        data["checks"] = sorted(
+            (check["category"], check["name"], check["count"])
+            for check in data["checks"])
+        expected[store.pk] = data
+    result = StoreDataBulkUpdater(stores).get_store_data()
+    assert set(store.pk for store in result) == set(expected)
+    for store, data in result.items():
+        data["checks"] = sorted(
+            (check["category"], check["name"], check["count"])
+            for check in data["checks"])
+        for k in StoreDataBulkUpdater.update_fields:
+            assert data[k] == expected[store.pk][k]
+
+    # nothing has changed
+    assert not StoreDataBulkUpdater(stores).update()
+
+    store = stores.first()
+    total_words = store.data.total_words
+    store.data.total_words = 0
+    store.data.save()
+    store.check_data.all().delete()
+    assert StoreDataBulkUpdater(stores).update() == set([tp0.pk])
+    store.data.refresh_from_db()
+    assert store.data.total_words == total_words
+    assert (
+        sorted(store.check_data.values_list("category", "name", "count"))
+        == expected[store.pk]["checks"])
+
+
+@pytest.mark.django_db
+def test_data_store_unit_delta(store0):
+    tp_data = store0.translation_project.data
+    total_words = tp_data.total_words
+    fuzzy_words = tp_data.fuzzy_words
+    unit = store0.units.filter(
+        state=UNTRANSLATED,
+        unit_source__source_wordcount__gt=0).first()
+    unit.target = "<foo></bar>;"
+    unit.state = FUZZY
+    unit.save()
+    assert unit._store_data_state == dict(
+        state=FUZZY,
+        wordcount=unit.unit_source.source_wordcount)
+
+    # the data matches a full recalculation
+    expected = store0.data_tool.updater.get_store_data()
+    store0.data.refresh_from_db()
+    for k in ["total_words", "translated_words", "fuzzy_words",
+              "critical_checks", "max_unit_revision", "last_submission"]:
+        assert getattr(store0.data, k) == expected[k]
+    assert (
+        sorted(store0.check_data.values_list("category", "name", "count"))
+        == sorted(
+            (check["category"], check["name"], check["count"])
+            for check in expected["checks"]))
+    tp_data.refresh_from_db()
+    assert tp_data.total_words == total_words
+    assert (
+        tp_data.fuzzy_words
+        == fuzzy_words + unit.unit_source.source_wordcount)
+
+    # subsequent saves of the same unit are counted from the last save
+    unit.state = TRANSLATED
+    unit.save()
+    store0.data.refresh_from_db()
+    expected = store0.data_tool.updater.get_store_data()
+    assert store0.data.fuzzy_words == expected["fuzzy_words"]
+    assert store0.data.translated_words == expected["translated_words"]
+
+    # obsoleting units is not handled by the delta
+    unit.makeobsolete()
+    assert not StoreDataUnitDelta(store0, unit).update()
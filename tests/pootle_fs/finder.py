@@ -9,6 +9,7 @@
 
 import os
 import sys
+import time
 
 import pytest
 
@@ -267,3 +268,64 @@ def test_finder_lang_codes():
         "/path/to/<dir_path>/<language_code>.<ext>")
     match = finder.match("/path/to/foo/bar@baz.po")
     assert match[1]["language_code"] == "bar@baz"
+
+
+@pytest.mark.django_db
+@pytest.mark.xfail(sys.platform == 'win32',
+                   reason="path mangling broken on windows")
+def test_finder_can_match_dir():
+    finder = TranslationFileFinder(
+        "/path/to/po-<filename>/<language_code>/<dir_path>/foo.<ext>",
+        exclude_languages=["foo"])
+    assert finder.file_root == "/path/to"
+    assert finder.can_match_dir("/path/to/po-bar")
+    assert finder.can_match_dir("/path/to/po-bar/de")
+    assert finder.can_match_dir("/path/to/po-bar/de/any/thing")
+    assert not finder.can_match_dir("/path/to/bar")
+    assert not finder.can_match_dir("/path/to/po-bar/foo")
+    finder = TranslationFileFinder("/path/to/po/<language_code>.<ext>")
+    assert finder.dir_patterns == []
+    assert not finder.can_match_dir("/path/to/po/bar")
+
+
+@pytest.mark.django_db
+@pytest.mark.xfail(sys.platform == 'win32',
+                   reason="path mangling broken on windows")
+def test_finder_walk_cached(tmpdir):
+    root = str(tmpdir)
+    for path in ["po/en.po", "po/fr.po", "po/skipped/de.po", "other/es.po"]:
+        file_path = os.path.join(root, path)
+        if not os.path.exists(os.path.dirname(file_path)):
+            os.makedirs(os.path.dirname(file_path))
+        open(file_path, "w").close()
+    # listings of recently changed directories are not cached
+    settled = time.time() - 60
+    os.utime(os.path.join(root, "po"), (settled, settled))
+    mapping = os.path.join(root, "po", "<language_code>.<ext>")
+    finder = TranslationFileFinder(mapping)
+    expected = sorted(
+        os.path.join(root, "po", path)
+        for path in ["en.po", "fr.po"])
+    assert sorted(x[0] for x in finder.find()) == expected
+    assert finder.stats == dict(found=2, skipped=1, cached=0, listed=1)
+
+    # stats are kept for each walk
+    assert sorted(x[0] for x in finder.find()) == expected
+    assert finder.stats == dict(found=2, skipped=1, cached=1, listed=0)
+
+    finder = TranslationFileFinder(mapping)
+    assert sorted(x[0] for x in finder.find()) == expected
+    assert finder.stats == dict(found=2, skipped=1, cached=1, listed=0)
+
+    open(os.path.join(root, "po", "it.po"), "w").close()
+    os.utime(os.path.join(root, "po"), (0, 0))
+    finder = TranslationFileFinder(mapping)
+    assert len(list(finder.find())) == 3
+    assert finder.stats["listed"] == 1
+    assert len(list(finder.find())) == 3
+    assert finder.stats["cached"] == 1
+
+    open(os.path.join(root, "po", "ru.po"), "w").close()
+    for i in range(2):
+        assert len(list(finder.find())) == 4
+        assert finder.stats["listed"] == 1
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import hashlib
+import os
+
+import pytest
+
+from pootle.core.cache import get_cache
+from pootle_fs.fingerprint import FileFingerprints
+
+
+class MockProject(object):
+    code = "fingerprint_project"
+
+    def __init__(self, local_fs_path):
+        self.local_fs_path = local_fs_path
+
+
+def _write(path, content):
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+@pytest.mark.django_db
+def test_fs_fingerprints(tmpdir):
+    project = MockProject(str(tmpdir))
+    paths = ["/a.po", "/b.po", "/missing.po"]
+    fingerprints = FileFingerprints(project)
+    get_cache("lru").delete_many(
+        [fingerprints.get_cache_key(path) for path in paths])
+    for name in ["a.po", "b.po"]:
+        _write(os.path.join(str(tmpdir), name), name)
+
+    result = fingerprints.get_fingerprints(paths)
+    assert sorted(result.keys()) == ["/a.po", "/b.po"]
+    assert result["/a.po"][2] == hashlib.sha1(b"a.po").hexdigest()
+    assert fingerprints.stats == dict(
+        found=2, cached=0, digested=2, missing=1)
+
+    # unchanged files are not read again
+    fingerprints = FileFingerprints(project)
+    assert fingerprints.get_fingerprints(paths) == result
+    assert fingerprints.stats["cached"] == 2
+    assert fingerprints.stats["digested"] == 0
+
+    # a touched file keeps its digest
+    a_path = os.path.join(str(tmpdir), "a.po")
+    stat = os.stat(a_path)
+    os.utime(a_path, (stat.st_atime, stat.st_mtime + 10))
+    fingerprints = FileFingerprints(project)
+    assert fingerprints.get_hash("/a.po") == result["/a.po"][2]
+    assert fingerprints.stats["digested"] == 1
+
+    _write(a_path, b"changed")
+    assert (
+        FileFingerprints(project).get_hash("/a.po")
+        == hashlib.sha1(b"changed").hexdigest())
+
+    # files are cached separately
+    cache = get_cache("lru")
+    assert (
+        cache.get(fingerprints.get_cache_key("/b.po"))
+        == result["/b.po"])
+    os.remove(a_path)
+    assert FileFingerprints(project).get_hash("/a.po") is None
+    assert cache.get(fingerprints.get_cache_key("/a.po")) is None
+
+
+@pytest.mark.django_db
+def test_fs_fingerprints_pool(tmpdir):
+    project = MockProject(str(tmpdir))
+    paths = []
+    for i in range(FileFingerprints.pool_threshold * 2):
+        _write(os.path.join(str(tmpdir), "%s.po" % i), str(i).encode())
+        paths.append("/%s.po" % i)
+    result = FileFingerprints(project).get_fingerprints(paths)
+    for i, path in enumerate(paths):
+        assert result[path][2] == hashlib.sha1(str(i).encode()).hexdigest()
@@ -763,3 +763,26 @@ def test_grouped_events(store_po):
         for x in GroupedEvents(store_log).sorted_events()]
 
     assert expected == result
+
+
+@pytest.mark.django_db
+def test_grouped_events_limit(store0):
+    store_log = log.get(store0.__class__)(store0)
+    _event = (
+        lambda x: (x.unit, x.user, x.timestamp, x.action, x.value, x.revision))
+    expected = [
+        _event(x)
+        for x in sorted([
+            ComparableLogEvent(ev)
+            for ev in store_log.get_events()])]
+    assert len(expected) > 5
+    grouped = GroupedEvents(store_log)
+    assert (
+        [_event(x) for x in grouped.sorted_events(reverse=True)]
+        == list(reversed(expected)))
+    assert (
+        [_event(x) for x in grouped.sorted_events(limit=5)]
+        == expected[:5])
+    assert (
+        [_event(x) for x in grouped.sorted_events(reverse=True, limit=5)]
+        == list(reversed(expected))[:5])
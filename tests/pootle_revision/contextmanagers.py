@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import pytest
+
+from pootle.core.delegate import revision
+from pootle.core.signals import update_revisions
+from pootle_app.models import Directory
+from pootle_revision.contextmanagers import (
+    coalesce_revisions, get_coalesced_counts)
+
+
+@pytest.mark.django_db
+def test_revision_coalesce_revisions(tp0):
+    revisions = revision.get(Directory)
+    stores = list(tp0.stores.all()[:3])
+    parents = set(store.parent for store in stores)
+    original = {
+        parent.id: revisions(parent).get(key="stats")
+        for parent in parents}
+    with coalesce_revisions() as coalesced:
+        for store in stores:
+            update_revisions.send(
+                store.__class__,
+                instance=store,
+                keys=["stats", "checks"])
+        # nothing is written until the context exits
+        for parent in parents:
+            assert (
+                revisions(parent).get(key="stats")
+                == original[parent.id])
+    assert coalesced.requested == len(stores)
+    assert coalesced.flushed == 1
+    assert coalesced.coalesced == len(stores) - 1
+    new_revisions = set()
+    for parent in parents:
+        assert (
+            revisions(parent).get(key="stats")
+            != original[parent.id])
+        new_revisions.add(revisions(parent).get(key="stats"))
+    # all paths were bumped in a single update
+    assert len(new_revisions) == 1
+
+
+@pytest.mark.django_db
+def test_revision_coalesce_revisions_merged(tp0):
+    revisions = revision.get(Directory)
+    stores = list(tp0.stores.all()[:3])
+    parents = set(store.parent for store in stores)
+    original = {
+        parent.id: revisions(parent).get(key="stats")
+        for parent in parents}
+    merged = None
+    for store in stores:
+        with coalesce_revisions(flush=False) as coalesced:
+            update_revisions.send(
+                store.__class__,
+                instance=store,
+                keys=["stats"])
+        if merged is None:
+            merged = coalesced
+        else:
+            merged.update(coalesced)
+    # nothing is written until the merged revisions are flushed
+    for parent in parents:
+        assert (
+            revisions(parent).get(key="stats")
+            == original[parent.id])
+    assert merged.requested == len(stores)
+    merged.flush()
+    assert merged.flushed == 1
+    for parent in parents:
+        assert (
+            revisions(parent).get(key="stats")
+            != original[parent.id])
+
+
+@pytest.mark.django_db
+def test_revision_coalesce_revisions_counts(tp0):
+    stores = list(tp0.stores.all()[:3])
+    counts = get_coalesced_counts()
+    with coalesce_revisions() as coalesced:
+        for store in stores:
+            update_revisions.send(
+                store.__class__,
+                instance=store,
+                keys=["stats"])
+    new_counts = get_coalesced_counts()
+    assert (
+        new_counts["requested"]
+        == counts["requested"] + coalesced.requested)
+    assert (
+        new_counts["flushed"]
+        == counts["flushed"] + coalesced.flushed)
+    assert (
+        new_counts["coalesced"]
+        == new_counts["requested"] - new_counts["flushed"])
+
+    # revisions that are not flushed are not counted
+    with coalesce_revisions(flush=False):
+        update_revisions.send(
+            stores[0].__class__,
+            instance=stores[0],
+            keys=["stats"])
+    assert get_coalesced_counts() == new_counts
@@ -6,6 +6,8 @@
 # or later license. See the LICENSE file for a copy of the license and the
 # AUTHORS file for copyright and authorship information.
 
+import logging
+import time
 from datetime import timedelta
 
 from mock import PropertyMock, patch
@@ -27,6 +29,8 @@ from pootle_store.models import Store
 from pootle_translationproject.models import TranslationProject
 
 
+logger = logging.getLogger(__name__)
+
 GET_EVENT_KWARGS = {
     'end': None,
     'users': None,
@@ -66,9 +70,12 @@ def test_score_store_updater(store0, admin):
 
 
 @pytest.mark.django_db
+@patch('pootle_score.updater.StoreScoreUpdater.aggregated_actions',
+       new_callable=PropertyMock)
 @patch('pootle_score.updater.StoreScoreUpdater.logs', new_callable=PropertyMock)
-def test_score_store_updater_event(logs_mock, store0, admin, member,
-                                   today, yesterday):
+def test_score_store_updater_event(logs_mock, aggregated_mock, store0, admin,
+                                   member, today, yesterday):
+    aggregated_mock.return_value = set()
     unit0 = store0.units[0]
     unit1 = store0.units[1]
     _events = [
@@ -113,11 +120,14 @@ def test_score_store_updater_event(logs_mock, store0, admin, member,
 
 
 @pytest.mark.django_db
+@patch('pootle_score.updater.StoreScoreUpdater.aggregated_actions',
+       new_callable=PropertyMock)
 @patch('pootle_score.updater.StoreScoreUpdater.logs', new_callable=PropertyMock)
-def test_score_store_updater_event_score(logs_mock, store0,
+def test_score_store_updater_event_score(logs_mock, aggregated_mock, store0,
                                          admin, member, member2,
                                          today, yesterday,
                                          dt_today, dt_yesterday):
+    aggregated_mock.return_value = set()
     unit0 = store0.units[0]
     unit1 = store0.units[1]
     _events = [
@@ -386,3 +396,67 @@ def test_score_tp_updater_clear_users(tp0, admin, member):
     assert (
         round(member.score, 2)
         == round(member_score - member_tp_score, 2))
+
+
+def _rounded_scores(calculated_scores):
+    return {
+        event_date: {
+            user: {k: round(v, 2) for k, v in user_scores.items()}
+            for user, user_scores in date_scores.items()}
+        for event_date, date_scores in calculated_scores.items()}
+
+
+def _event_scores(updater, **kwargs):
+    with patch('pootle_score.updater.StoreScoreUpdater.aggregated_actions',
+               new_callable=PropertyMock) as aggregated_mock:
+        aggregated_mock.return_value = set()
+        return updater.calculate(**kwargs)
+
+
+@pytest.mark.django_db
+def test_score_store_updater_aggregate(tp0, member, today, yesterday):
+    for store in tp0.stores.all():
+        updater = StoreScoreUpdater(store)
+        assert updater.aggregated_actions == set(updater.aggregator.scorers)
+        start = time.time()
+        aggregated = updater.calculate()
+        aggregated_time = time.time() - start
+        start = time.time()
+        scored = _event_scores(StoreScoreUpdater(store))
+        logger.info(
+            "[scores] %s aggregated in %.3fs, scored in %.3fs",
+            store.pootle_path,
+            aggregated_time,
+            time.time() - start)
+        assert _rounded_scores(aggregated) == _rounded_scores(scored)
+        kwargs = dict(users=[member.id], start=yesterday, end=today)
+        assert (
+            _rounded_scores(StoreScoreUpdater(store).calculate(**kwargs))
+            == _rounded_scores(
+                _event_scores(StoreScoreUpdater(store), **kwargs)))
+
+
+@pytest.mark.django_db
+def test_score_store_updater_aggregate_custom(store0):
+
+    class CustomTargetScore(object):
+
+        def __init__(self, event):
+            self.event = event
+
+        def get_score(self):
+            return dict(score=1)
+
+    @provider(event_score, sender=LogEvent)
+    def custom_event_score_provider(**kwargs_):
+        return dict(target_updated=CustomTargetScore)
+
+    updater = StoreScoreUpdater(store0)
+    # only the customized action is scored event by event
+    assert "target_updated" not in updater.aggregated_actions
+    assert "suggestion_created" in updater.aggregated_actions
+    assert (
+        _rounded_scores(updater.calculate())
+        == _rounded_scores(_event_scores(StoreScoreUpdater(store0))))
+    event_score.disconnect(
+        custom_event_score_provider, sender=LogEvent)
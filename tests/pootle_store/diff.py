@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import logging
+import random
+import time
+from collections import OrderedDict
+
+import pytest
+
+from django.utils.functional import cached_property
+
+from pootle_store.constants import OBSOLETE, TRANSLATED, UNIT_INDEX_GAP
+from pootle_store.diff import (
+    DBUnit, StoreDiff, UnitIndexPlan, UnitSequenceMatcher)
+
+
+logger = logging.getLogger(__name__)
+
+
+def _apply_opcodes(a, b, opcodes):
+    result = []
+    i = j = 0
+    for tag, i1, i2, j1, j2 in opcodes:
+        assert (i1, j1) == (i, j)
+        if tag == "equal":
+            assert a[i1:i2] == b[j1:j2]
+            result += a[i1:i2]
+        elif tag in ["insert", "replace"]:
+            result += b[j1:j2]
+        i, j = i2, j2
+    assert (i, j) == (len(a), len(b))
+    return result
+
+
+class _SyntheticDiffable(object):
+    target_unit_class = DBUnit
+    source_unit_class = DBUnit
+
+
+class _SyntheticStoreDiff(StoreDiff):
+
+    def __init__(self, target_units, source_units, source_revision):
+        self.target_store = self.source_store = None
+        self.source_revision = source_revision
+        self.target_revision = max(
+            unit["revision"] for unit in target_units.values())
+        self.__dict__["target_units"] = target_units
+        self.__dict__["source_units"] = source_units
+
+    @cached_property
+    def diffable(self):
+        return _SyntheticDiffable()
+
+
+def _synthetic_unit(i, unitid, **kwargs):
+    unit = dict(
+        unitid=unitid,
+        id=i + 1,
+        index=(i + 1) * UNIT_INDEX_GAP,
+        revision=i,
+        state=TRANSLATED,
+        source_f="Source %s" % unitid,
+        target_f="Target %s" % unitid,
+        context="",
+        locations="",
+        developer_comment="",
+        translator_comment="")
+    unit.update(kwargs)
+    return unit
+
+
+def _synthetic_stores(size, seed=1):
+    rand = random.Random(seed)
+    target_units = OrderedDict(
+        ("unit%s" % i, _synthetic_unit(i, "unit%s" % i))
+        for i in range(size))
+    unitids = list(target_units)
+    # move 5%, remove 2% and add 2% of the units
+    for __ in range(size // 20):
+        unitids.insert(
+            rand.randrange(size),
+            unitids.pop(rand.randrange(size)))
+    unitids = [uid for uid in unitids if rand.random() > .02]
+    for i in range(size // 50):
+        unitids.insert(rand.randrange(len(unitids)), "new%s" % i)
+    source_units = OrderedDict()
+    for i, uid in enumerate(unitids):
+        source_units[uid] = dict(
+            target_units.get(uid) or _synthetic_unit(i, uid))
+    return target_units, source_units
+
+
+@pytest.mark.parametrize(
+    "a, b",
+    [("", ""),
+     ("abc", "abc"),
+     ("abc", ""),
+     ("", "abc"),
+     ("abcdef", "abXYef"),
+     ("abcdef", "fedcba"),
+     ("abcdef", "bcadef"),
+     ("abcdef", "aXbcdeYf"),
+     ("aabbcc", "abcabc")])
+def test_unit_sequence_matcher(a, b):
+    opcodes = UnitSequenceMatcher(a, b).get_opcodes()
+    assert _apply_opcodes(list(a), list(b), opcodes) == list(b)
+
+
+def test_unit_sequence_matcher_moved():
+    a = ["unit%s" % i for i in range(10)]
+    b = a[:2] + a[3:8] + a[2:3] + a[8:]
+    opcodes = UnitSequenceMatcher(a, b).get_opcodes()
+    assert opcodes == [
+        ("equal", 0, 2, 0, 2),
+        ("delete", 2, 3, 2, 2),
+        ("equal", 3, 8, 2, 7),
+        ("insert", 8, 8, 7, 8),
+        ("equal", 8, 10, 8, 10)]
+
+
+def test_unit_sequence_matcher_random():
+    rand = random.Random(23)
+    for __ in range(200):
+        a = rand.sample(range(100), rand.randrange(50))
+        b = rand.sample(range(100), rand.randrange(50))
+        opcodes = UnitSequenceMatcher(a, b).get_opcodes()
+        assert _apply_opcodes(a, b, opcodes) == b
+
+
+def test_unit_index_plan_gaps():
+    indexes = [(i + 1) * UNIT_INDEX_GAP for i in range(5)]
+    plan = UnitIndexPlan(indexes)
+    # insert at the start, in the middle and at the end
+    plan.allocate(["a"], 0, indexes[0])
+    plan.allocate(["b", "c", "d"], indexes[1], indexes[2])
+    plan.allocate(["e", "f"], indexes[-1])
+    assert not plan.index_updates
+    assert plan.new_indexes["a"] == UNIT_INDEX_GAP // 2
+    assert (
+        indexes[1]
+        < plan.new_indexes["b"]
+        < plan.new_indexes["c"]
+        < plan.new_indexes["d"]
+        < indexes[2])
+    assert plan.new_indexes["e"] == indexes[-1] + UNIT_INDEX_GAP
+    assert plan.new_indexes["f"] == indexes[-1] + 2 * UNIT_INDEX_GAP
+
+
+def test_unit_index_plan_shift_local():
+    # the gap after 100 is exhausted, but 102 is followed by a big gap
+    plan = UnitIndexPlan([100, 101, 102, 200, 300])
+    plan.allocate(["a", "b"], 100, 101)
+    assert plan.new_indexes == {"a": 101, "b": 102}
+    assert plan.index_updates == [(101, 200, 2)]
+
+
+def test_unit_index_plan_shift_contiguous():
+    # stores without gaps shift all of the following units
+    plan = UnitIndexPlan([1, 2, 3, 4])
+    plan.allocate(["a"], 1, 2)
+    plan.allocate(["b"], 3, 4)
+    assert plan.new_indexes == {"a": 2, "b": 5}
+    # ranges are applied from the end of the store
+    assert plan.index_updates == [(4, None, 2), (2, 4, 1)]
+
+
+class _CountedId(object):
+
+    comparisons = 0
+
+    def __init__(self, uid):
+        self.uid = uid
+
+    def __hash__(self):
+        return hash(self.uid)
+
+    def __eq__(self, other):
+        _CountedId.comparisons += 1
+        return self.uid == other.uid
+
+    def __ne__(self, other):
+        return not self == other
+
+
+@pytest.mark.parametrize("size", [500, 5000])
+def test_unit_sequence_matcher_scaling(size):
+    target_units, source_units = _synthetic_stores(size)
+    a = [_CountedId(uid) for uid in target_units]
+    b = [_CountedId(uid) for uid in source_units]
+    _CountedId.comparisons = 0
+    opcodes = UnitSequenceMatcher(a, b).get_opcodes()
+    assert _apply_opcodes(a, b, opcodes) == b
+    # the number of comparisons grows linearly with the size of the stores
+    assert _CountedId.comparisons < 4 * (len(a) + len(b))
+
+
+@pytest.mark.parametrize("size", [500, 5000])
+def test_store_diff_synthetic(size):
+    target_units, source_units = _synthetic_stores(size)
+    differ = _SyntheticStoreDiff(target_units, source_units, size)
+    start = time.time()
+    diff = differ.diff()
+    logger.info(
+        "[diff] %s units diffed in %.3fs",
+        size,
+        time.time() - start)
+    added = set(unit.unitid for unit, __ in diff["add"])
+    assert added == set(
+        uid for uid in source_units
+        if uid not in target_units)
+    assert set(diff["obsolete"]) == set(
+        unit["id"] for uid, unit in target_units.items()
+        if uid not in source_units)
+    moved = set(diff["update"][1])
+    assert moved
+    assert not moved & added
+    assert all(uid in target_units for uid in moved)
+
+
+def test_store_diff_synthetic_obsolete():
+    target_units, source_units = _synthetic_stores(100)
+    obsolete_uid = list(source_units)[5]
+    target_units[obsolete_uid]["state"] = OBSOLETE
+    differ = _SyntheticStoreDiff(target_units, source_units, 200)
+    assert obsolete_uid not in differ.active_target_units
+    assert obsolete_uid in differ.new_unit_list
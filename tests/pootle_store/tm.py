@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import pytest
+
+from mock import patch
+
+from pootle.core.delegate import tm_updater
+from pootle_store.models import Unit
+from pootle_store.unit.tm import UnitTMQueue
+
+
+class DummyBroker(object):
+    updatable_servers = [None]
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.updates = []
+
+    def bulk_update(self, language, objs):
+        self.updates.append((language, objs))
+        return not self.fail
+
+
+def _clear_queue(queue):
+    queue.connection.delete(
+        queue.queue_key, queue.failed_key, queue.flush_key)
+
+
+@pytest.mark.django_db
+def test_unit_tm_queue_flush(store0):
+    assert tm_updater.get(Unit) is UnitTMQueue
+    broker = DummyBroker()
+    queue = UnitTMQueue(broker=broker)
+    _clear_queue(queue)
+    units = store0.units.exclude(target_f="")
+    unit_ids = list(units.values_list("pk", flat=True))
+    queue.connection.rpush(queue.queue_key, *(unit_ids + unit_ids[:2]))
+    assert queue.flush() == len(unit_ids)
+    assert not len(queue)
+    language = store0.translation_project.language.code
+    assert [update[0] for update in broker.updates] == [language]
+    documents = {
+        doc["id"]: doc
+        for doc in broker.updates[0][1]}
+    assert sorted(documents) == sorted(unit_ids)
+    unit = units.first()
+    assert documents[unit.pk]["target"] == unit.target_f
+    assert documents[unit.pk]["revision"] == unit.revision
+    assert documents[unit.pk]["path"] == store0.pootle_path
+
+
+@pytest.mark.django_db
+def test_unit_tm_queue_failed(store0):
+    queue = UnitTMQueue(broker=DummyBroker(fail=True))
+    _clear_queue(queue)
+    unit = store0.units.exclude(target_f="").first()
+    queue.connection.rpush(queue.queue_key, unit.pk)
+    queue.flush()
+    assert not len(queue)
+    assert queue.connection.lrange(queue.failed_key, 0, -1) == [
+        str(unit.pk)]
+    with patch("pootle_store.unit.tm.UnitTMQueue.schedule") as schedule:
+        assert queue.retry_failed() == 1
+    assert schedule.called
+    assert not queue.connection.llen(queue.failed_key)
+    assert queue.connection.lrange(queue.queue_key, 0, -1) == [
+        str(unit.pk)]
+    _clear_queue(queue)
+
+
+@pytest.mark.django_db
+def test_unit_tm_queue_full(store0):
+    queue = UnitTMQueue(broker=DummyBroker())
+    _clear_queue(queue)
+    queue.max_size = 1
+    queue.connection.rpush(queue.queue_key, 1)
+    assert not queue.enqueue([2])
+    _clear_queue(queue)
@@ -119,3 +119,51 @@ def test_store_update_conflict_pootle_wins(store0, caplog):
     assert unit0.target == "bar0"
     assert unit1.target == "foo1"
     assert unit2.target == "baz2"
+
+
+def _unit_rows(store):
+    return [
+        (unit.unitid,
+         unit.index,
+         unit.source_f,
+         unit.target_f,
+         unit.state,
+         unit.target_wordcount,
+         unit.unit_source.source_hash,
+         unit.unit_source.source_wordcount,
+         unit.unit_source.created_by_id,
+         unit.unit_source.created_with,
+         unit.unit_source.creation_revision == unit.revision,
+         (unit.changed and unit.change.submitted_by_id),
+         (unit.changed and unit.change.changed_with),
+         (unit.changed
+          and unit.change.submitted_on == unit.creation_time))
+        for unit
+        in store.unit_set.select_related(
+            "unit_source", "change").order_by("index")]
+
+
+@pytest.mark.django_db
+def test_store_update_bulk_add(store_po, tp0, monkeypatch):
+    from pytest_pootle.factories import StoreDBFactory
+
+    from pootle_store.updater import StoreUpdater
+
+    units = [
+        ('source%s' % i, 'target%s' % i if i % 3 else '', i % 5 == 0)
+        for i in range(12)]
+    other_store = StoreDBFactory(
+        parent=tp0.directory,
+        translation_project=tp0,
+        name="test_store_bulk.po")
+    file_store = create_store(store_po.pootle_path, units=units)
+    store_po.update(file_store)
+    monkeypatch.setattr(StoreUpdater, "bulk_add_threshold", 1)
+    monkeypatch.setattr(StoreUpdater, "bulk_add_chunk_size", 5)
+    file_store = create_store(other_store.pootle_path, units=units)
+    other_store.update(file_store)
+    assert _unit_rows(other_store) == _unit_rows(store_po)
+    assert other_store.data.total_words == store_po.data.total_words
+    assert (
+        other_store.data.translated_words
+        == store_po.data.translated_words)
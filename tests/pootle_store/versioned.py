@@ -96,3 +96,63 @@ def test_versioned_store(store0):
     assert old_unit.isfuzzy() == rev0["fuzzy"]
     assert old_unit.istranslated() == rev0["translated"]
     assert old_unit.isobsolete() == rev0["obsolete"]
+
+
+@pytest.mark.django_db
+def test_versioned_store_snapshots(store0):
+    versions = versioned.get(Store)(store0)
+    assert not versions.snapshots.revisions
+    unit = store0.units[0]
+    revision = store0.data.max_unit_revision
+    target = unit.target
+    unit.target = "changed target"
+    unit.save()
+    current_revision = versions.current_revision
+    old_unit = versions.at_revision(revision).findid(unit.getid())
+    assert old_unit.target == target
+    # the current store and the reconstructed store were both snapshotted
+    assert versions.snapshots.revisions == [revision, current_revision]
+
+    unit.target = "changed target again"
+    unit.save()
+    # the previous state is reconstructed from the snapshot
+    assert versions.snapshots.nearest(current_revision) == current_revision
+    old_unit = versions.at_revision(current_revision).findid(unit.getid())
+    assert old_unit.target == "changed target"
+    old_unit = versions.at_revision(revision).findid(unit.getid())
+    assert old_unit.target == target
+
+    # old snapshots are evicted
+    versions.snapshots.max_snapshots = 1
+    versions.snapshots.add(current_revision + 1, str(versions.current_store))
+    assert versions.snapshots.revisions == [current_revision + 1]
+    assert versions.snapshots.get(revision) is None
+    versions.snapshots.clear()
+    assert not versions.snapshots.revisions
+
+
+@pytest.mark.django_db
+def test_versioned_store_snapshot_changed(store0):
+    versions = versioned.get(Store)(store0)
+    unit = store0.units[0]
+    revision = store0.data.max_unit_revision
+    target = unit.target
+    unit.target = "changed target"
+    unit.save()
+    current_store = versions.current_store
+
+    class ChangedVersionedStore(versions.__class__):
+
+        @property
+        def current_store(self):
+            # a unit is saved while the store is serialized
+            unit.target = "changed target again"
+            unit.save()
+            return current_store
+
+    versions = ChangedVersionedStore(store0)
+    versions.snapshots.clear()
+    old_unit = versions.at_revision(revision).findid(unit.getid())
+    assert old_unit.target == target
+    # the current store was not snapshotted
+    assert versions.snapshots.revisions == [revision]
@@ -12,7 +12,7 @@ import pytest
 
 from pootle.core.delegate import (
     stemmer, stopwords, terminology, terminology_matcher)
-from pootle_terminology.utils import UnitTerminology
+from pootle_terminology.utils import TerminologyIndex, UnitTerminology
 
 
 @pytest.mark.django_db
@@ -121,3 +121,41 @@ def test_terminology_matcher(store0, terminology0):
     assert (
         matcher.matches
         == matcher.similar(results))
+
+
+@pytest.mark.django_db
+def test_terminology_index(store0, terminology0):
+    for store in terminology0.stores.all():
+        for unit in store.units.all():
+            terminology.get(unit.__class__)(unit).stem()
+
+    unit = store0.units.first()
+    matcher = terminology_matcher.get(unit.__class__)(unit)
+    index = TerminologyIndex(terminology0.language_id)
+    assert matcher.terminology_index.cache_key == index.cache_key
+    stems, terms = index.index
+    term_units = matcher.terminology_units.filter(stems__isnull=False)
+    assert sorted(terms.keys()) == sorted(
+        set(term_units.values_list("id", flat=True)))
+    for term_unit in term_units.distinct():
+        assert terms[term_unit.id][0] == term_unit.source_f
+        assert terms[term_unit.id][3] == matcher.get_stems(
+            terms[term_unit.id][2])
+        for stem in term_unit.stems.values_list("root", flat=True):
+            assert term_unit.id in stems[stem]
+    # the loaded index is reused until the revision changes
+    assert TerminologyIndex(terminology0.language_id).index is index.index
+    assert (
+        TerminologyIndex.loaded[terminology0.language_id][0]
+        == index.cache_key)
+    candidates = index.get_candidates(matcher.stems)
+    assert (
+        [unit_id for unit_id, term_ in candidates]
+        == sorted(
+            set(matcher.terminology_units.filter(
+                stems__root__in=matcher.stems).values_list("id", flat=True))))
+    assert (
+        matcher.matches
+        == matcher.similar(
+            matcher.terminology_units.filter(
+                stems__root__in=matcher.stems).order_by("id").distinct()))
@@ -17,7 +17,7 @@ import translate
 import pytest
 
 from pootle.core.delegate import stemmer, stopwords, text_comparison
-from pootle_word.utils import TextComparison
+from pootle_word.utils import TextComparison, text_analysis_cache
 
 
 def test_stemmer():
@@ -77,3 +77,30 @@ def test_text_comparer():
              + comparer.tokens_present(other)
              + comparer.stems_present(other))
             / 4))
+
+
+@pytest.mark.django_db
+def test_text_comparer_cached():
+    text_analysis_cache.clear()
+    comparer = text_comparison.get()("Cycling through the examples")
+    tokens = comparer.tokens
+    stems = comparer.stems
+    assert text_analysis_cache.misses == 1
+    assert comparer.analysis == (tuple(tokens), stems)
+    other = text_comparison.get()("Cycling through the examples")
+    assert other.tokens == tokens
+    assert other.stems == stems
+    assert text_analysis_cache.misses == 1
+    assert text_analysis_cache.hits >= 2
+
+
+@pytest.mark.django_db
+def test_text_comparer_similarity_many():
+    comparer = text_comparison.get()("Cycling through the examples")
+    candidates = ["cycle home", "example cycles", "cycle home"]
+    assert (
+        comparer.similarity_many(candidates)
+        == [comparer.similarity(candidate) for candidate in candidates])
+    assert comparer.similarity_many([]) == []
+    # texts without any words can be compared
+    assert len(comparer.similarity_many(["", "%s"])) == 2
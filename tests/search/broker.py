@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import time
+
+import pytest
+
+from pootle.core.search import (
+    LocalTMBackend, SearchBackendError, SearchBroker)
+
+
+class DummyTMServer(object):
+
+    def __init__(self, target, score, delay=0, fail=False, source=None,
+                 unit_id=None):
+        self.source = source
+        self.unit_id = unit_id
+        self.target = target
+        self.score = score
+        self.delay = delay
+        self.fail = fail
+        self.searches = 0
+
+    def search(self, unit):
+        self.searches += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise ValueError("Server is down")
+        if self.unit_id == str(unit.id):
+            return []
+        return [
+            {'unit_id': self.unit_id,
+             'source': self.source or unit.source_f,
+             'target': self.target,
+             'score': self.score,
+             'count': 1}]
+
+
+@pytest.fixture
+def tm_broker(settings, clear_cache):
+    settings.POOTLE_TM_SERVER = {}
+    broker = SearchBroker()
+    broker.timeout = 0.5
+    return broker
+
+
+@pytest.mark.django_db
+def test_search_broker_concurrent(tm_broker, store0):
+    unit = store0.units.first()
+    tm_broker._servers = dict(
+        slow=DummyTMServer("Slow", 1, delay=.3),
+        fast=DummyTMServer("Fast", 2),
+        other=DummyTMServer("Fast", 3, delay=.3))
+    start = time.time()
+    results = tm_broker.search(unit)
+    # servers are queried at the same time
+    assert time.time() - start < .6
+    assert (
+        [(result['target'], result['count']) for result in results]
+        == [("Fast", 2), ("Slow", 1)])
+    assert tm_broker.metrics["slow"]["calls"] == 1
+    assert tm_broker.metrics["slow"]["total_latency"] >= .3
+
+    # complete results are cached
+    assert tm_broker.search(unit) == results
+    assert tm_broker._servers["fast"].searches == 1
+
+
+@pytest.mark.django_db
+def test_search_broker_rank(tm_broker, store0):
+    unit = store0.units.first()
+    unit.source_f = "Cycling through the examples"
+    tm_broker._servers = dict(
+        unlike=DummyTMServer("Unlike", 2, source="Something else entirely"),
+        alike=DummyTMServer("Alike", 2, source="Cycle through examples"),
+        best=DummyTMServer("Best", 3, source="Nothing in common"))
+    results = tm_broker.search(unit)
+    # results are ranked by score, and then by similarity
+    assert (
+        [result['target'] for result in results]
+        == ["Best", "Alike", "Unlike"])
+
+
+@pytest.mark.django_db
+def test_search_broker_deadlines(tm_broker, store0):
+    unit = store0.units.first()
+    tm_broker._servers = dict(
+        slow=DummyTMServer("Slow", 1, delay=1),
+        broken=DummyTMServer("Broken", 1, fail=True),
+        fast=DummyTMServer("Fast", 2))
+    start = time.time()
+    results = tm_broker.search(unit)
+    assert time.time() - start < .9
+    # partial results are returned, and not cached
+    assert [result['target'] for result in results] == ["Fast"]
+    assert tm_broker.metrics["slow"]["timeouts"] == 1
+    assert tm_broker.metrics["broken"]["failures"] == 1
+    tm_broker.search(unit)
+    assert tm_broker._servers["fast"].searches == 2
+
+    # failing servers are skipped once the circuit is open
+    tm_broker.search(unit)
+    assert tm_broker.breakers["broken"].is_open
+    assert tm_broker._servers["broken"].searches == 3
+    tm_broker.search(unit)
+    assert tm_broker._servers["broken"].searches == 3
+    assert tm_broker.metrics["broken"]["skipped"] == 1
+
+
+@pytest.mark.django_db
+def test_search_broker_busy(tm_broker, store0):
+    unit = store0.units.first()
+    tm_broker.max_pending = 1
+    tm_broker._servers = dict(
+        hung=DummyTMServer("Hung", 1, delay=1.5),
+        fast=DummyTMServer("Fast", 2))
+    tm_broker.search(unit)
+    assert tm_broker.metrics["hung"]["timeouts"] == 1
+
+    # the hung server is skipped while its search is still running, and
+    # doesnt hold up the other servers
+    start = time.time()
+    results = tm_broker.search(unit)
+    assert time.time() - start < .4
+    assert [result['target'] for result in results] == ["Fast"]
+    assert tm_broker._servers["hung"].searches == 1
+    assert tm_broker.metrics["hung"]["busy"] == 1
+    assert tm_broker._servers["fast"].searches == 2
+
+
+@pytest.mark.django_db
+def test_search_broker_cache_source(tm_broker, store0):
+    unit, other_unit = store0.units[:2]
+    other_unit.source_f = unit.source_f
+    tm_broker._servers = dict(
+        other=DummyTMServer("Other", 1, unit_id=str(other_unit.id)))
+    assert (
+        [result['target'] for result in tm_broker.search(unit)]
+        == ["Other"])
+
+    # results are cached for the language and source, and the unit's own
+    # translation is left out of them
+    assert tm_broker.search(other_unit) == []
+    assert tm_broker._servers["other"].searches == 1
+
+
+@pytest.mark.django_db
+def test_search_broker_backend_errors(tm_broker, store0, settings, tmpdir):
+    unit = store0.units.first()
+    # the index directory can not be created beneath a file
+    tm_path = tmpdir.join("not_a_directory")
+    tm_path.write("")
+    settings.POOTLE_TM_SERVER = {
+        'local': {
+            'ENGINE': 'pootle.core.search.backends.LocalTMBackend',
+            'INDEX_NAME': 'translations',
+            'PATH': str(tm_path)}}
+    local_tm = LocalTMBackend('local')
+    with pytest.raises(SearchBackendError):
+        local_tm.search(unit)
+    tm_broker._servers = dict(
+        local=local_tm,
+        fast=DummyTMServer("Fast", 2))
+    results = tm_broker.search(unit)
+    assert [result['target'] for result in results] == ["Fast"]
+    assert tm_broker.metrics["local"]["failures"] == 1
+    # results are incomplete, and not cached
+    tm_broker.search(unit)
+    assert tm_broker._servers["fast"].searches == 2
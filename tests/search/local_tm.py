@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) Pootle contributors.
+#
+# This file is a part of the Pootle project. It is distributed under the GPL3
+# or later license. See the LICENSE file for a copy of the license and the
+# AUTHORS file for copyright and authorship information.
+
+import pytest
+
+from django.utils.encoding import force_text
+
+from pootle.core.search import LocalTMBackend
+
+
+def _tm_doc(unit_id, source, target, revision=1):
+    return {
+        'id': unit_id,
+        'revision': revision,
+        'project': 'Project',
+        'path': '/language0/project0/store0.po',
+        'username': 'member',
+        'fullname': 'Member',
+        'email_md5': None,
+        'source': source,
+        'target': target,
+        'iso_submitted_on': None,
+        'display_submitted_on': None}
+
+
+@pytest.fixture
+def local_tm(settings, tmpdir):
+    settings.POOTLE_TM_SERVER = {
+        'local': {
+            'ENGINE': 'pootle.core.search.backends.LocalTMBackend',
+            'INDEX_NAME': 'translations',
+            'PATH': str(tmpdir)}}
+    return LocalTMBackend('local')
+
+
+@pytest.mark.django_db
+def test_local_tm_search(local_tm, store0):
+    unit = store0.units.first()
+    language = store0.translation_project.language.code
+    source = force_text(unit.source)
+    assert local_tm.max_revision() is None
+    assert local_tm.bulk_update(
+        language,
+        [_tm_doc(unit.pk, source, "Own target", revision=3),
+         _tm_doc(-1, source, "Same source"),
+         _tm_doc(-2, "%s!" % source, "Similar source", revision=5),
+         _tm_doc(-3, source, "Same source"),
+         _tm_doc(-4, "Something else entirely", "Other")])
+    assert local_tm.is_auto_updatable
+    assert local_tm.max_revision() == 5
+    results = local_tm.search(unit)
+    # the unit itself is not matched, and duplicates are counted
+    assert (
+        [(result['target'], result['count']) for result in results]
+        == [("Same source", 2), ("Similar source", 1)])
+    assert results[0]['unit_id'] in ["-1", "-3"]
+    assert results[0]['score'] == 100
+    assert 0 < results[1]['score'] < 100
+
+    # documents are replaced when updated
+    local_tm.update(language, _tm_doc(-2, "Unrelated", "Unrelated"))
+    assert (
+        [result['target'] for result in local_tm.search(unit)]
+        == ["Same source"])
+
+    local_tm.clear()
+    assert local_tm.max_revision() is None
+    assert local_tm.search(unit) == []
+
+
+@pytest.mark.django_db
+def test_local_tm_search_long_source(local_tm, store0):
+    unit = store0.units.first()
+    language = store0.translation_project.language.code
+    # more distinct trigrams than sqlite allows query parameters
+    source = u" ".join(
+        u"word%s" % i
+        for i in range(1000))
+    index = local_tm.get_index(language)
+    assert len(index.get_grams(source)) > 999
+    local_tm.bulk_update(
+        language,
+        [_tm_doc(-1, source, "Long target"),
+         _tm_doc(-2, source + u" more", "Similar long target")])
+    hits = index.search(source, local_tm.min_similarity, 10)
+    assert (
+        sorted(hit['target'] for hit in hits)
+        == ["Long target", "Similar long target"])
+    unit.source = source
+    assert (
+        [result['target'] for result in local_tm.search(unit)]
+        == ["Long target", "Similar long target"])
@@ -19,6 +19,7 @@ from pootle_store.unit.filters import (
     FilterNotFound, UnitChecksFilter, UnitContributionFilter, UnitSearchFilter,
     UnitStateFilter, UnitTextSearch)
 from pootle_store.unit.search import DBSearchBackend
+from pootle_store.unit.textindex import UnitTrigramIndex
 
 
 def _expected_text_search_words(text, case):
@@ -225,6 +226,46 @@ def test_get_units_text_search(units_text_searches):
             qs, search["text"], search["sfields"], search["exact"], search["case"])
 
 
+@pytest.mark.django_db
+def test_get_units_text_search_trigram_index(units_text_searches):
+    search = units_text_searches
+    index = UnitTrigramIndex()
+    index.rebuild(Unit.objects.all())
+    qs = Unit.objects.all()
+    expected = list(
+        UnitTextSearch(qs).search(
+            search["text"], search["sfields"],
+            search["exact"], search["case"]).order_by("pk"))
+    result = list(
+        UnitTextSearch(qs, text_index=index).search(
+            search["text"], search["sfields"],
+            search["exact"], search["case"]).order_by("pk"))
+    assert result == expected
+
+
+@pytest.mark.django_db
+def test_get_units_text_search_trigram_index_common(store0):
+    index = UnitTrigramIndex()
+    index.rebuild(Unit.objects.all())
+    qs = store0.units
+    unit = qs.exclude(source_f="").first()
+    word = max(unit.source_f.split(" "), key=len)
+    candidates = index.filter_candidates(qs, "source_f", [word])
+    assert unit in candidates
+    # only units in the searched qs are candidates
+    assert not candidates.exclude(store=store0).exists()
+    index.max_rows = 1
+    assert index.filter_candidates(qs, "source_f", [word]) is None
+
+
+def test_unit_trigram_index_trigrams():
+    index = UnitTrigramIndex()
+    assert index.get_trigrams("") == set()
+    assert index.get_trigrams("ab") == set()
+    assert index.get_trigrams(u"CaFé") == set([u"caf", u"afe"])
+    assert index.filter_candidates(None, "not_a_field", ["foo"]) is None
+
+
 @pytest.mark.django_db
 def test_units_contribution_filter_none(units_contributor_searches):
     unit_filter = units_contributor_searches
@@ -334,3 +375,52 @@ def test_unit_search_backend_custom():
     search_backend.connect(get_search_backend, sender=Unit)
 
     assert search_backend.get(Unit) is CustomSearchBackend
+
+
+def _search_kwargs(**kwargs):
+    search_kwargs = {
+        "category": None,
+        "checks": None,
+        "soptions": [],
+        "modified-since": None,
+        "month": None,
+        "search": None,
+        "sfields": None,
+        "user": None}
+    search_kwargs.update(kwargs)
+    return search_kwargs
+
+
+@pytest.mark.django_db
+def test_unit_search_backend_find_unit_position(tp0, member):
+    backend = DBSearchBackend(
+        member,
+        **_search_kwargs(
+            language_code=tp0.language.code,
+            project_code=tp0.project.code))
+    uid_list = list(backend.results.values_list("pk", flat=True))
+    for uid in [uid_list[0], uid_list[len(uid_list) / 2], uid_list[-1]]:
+        assert backend.find_unit_position(uid) == uid_list.index(uid)
+    assert backend.find_unit_position(max(uid_list) + 1) is None
+
+
+@pytest.mark.django_db
+def test_unit_search_backend_keyset_next_slice(tp0, member):
+    kwargs = _search_kwargs(
+        language_code=tp0.language.code,
+        project_code=tp0.project.code,
+        count=2)
+    uid_list = list(
+        DBSearchBackend(member, **kwargs).results.values_list(
+            "pk", flat=True))
+    backend = DBSearchBackend(
+        member,
+        previous_uids=uid_list[:4],
+        offset=4,
+        **kwargs)
+    assert backend.keyset_ordered
+    total, start, end, uids = backend.search()
+    assert total == len(uid_list)
+    assert start == 4
+    assert end == 8
+    assert list(uids) == uid_list[4:8]
@@ -46,6 +46,8 @@ MIDDLEWARE = [
     #: Nice 500 and 403 pages (must be after locale to have translated versions)
     'pootle.middleware.errorpages.ErrorPagesMiddleware',
     'django.middleware.common.CommonMiddleware',
+    #: Updates revisions once for each request that changes data
+    'pootle.middleware.revisions.CoalesceRevisionsMiddleware',
     #: Must be early in the response cycle (close to bottom)
     'pootle.middleware.captcha.CaptchaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
@@ -77,6 +79,9 @@ CACHES = {
     },
 }
 
+# Tests flush the 'lru' cache, so dont keep cached values in process
+POOTLE_LOCAL_CACHE_SIZE = 0
+
 # Using synchronous mode for testing
 RQ_QUEUES = {
     'default': {